@@ -0,0 +1,356 @@
+"""Benchmark the plugin generator, and check for regressions against a baseline.
+
+Usage:
+$ python benchmarks/bench_generator.py
+$ python benchmarks/bench_generator.py --output results.json
+$ python benchmarks/bench_generator.py --save-baseline
+$ python benchmarks/bench_generator.py --threshold 0.10 --quick
+
+Every benchmark records the time for one operation, in milliseconds. Results are compared
+against a baseline for the current machine, and the run fails if any benchmark is slower
+than the baseline by more than the threshold. Comparisons use the fastest round of each
+benchmark, which is much less sensitive to noise from other processes than the median.
+
+Timings depend on the machine, so baselines are never shared. Each one is stored in
+benchmarks/baselines/, which isn't tracked by git, under a name made from the host,
+the Python version, and the platform.
+"""
+
+import argparse
+import contextlib
+from dataclasses import replace
+import io
+import json
+import os
+from pathlib import Path
+import platform
+import re
+import shutil
+import statistics
+import sys
+import tempfile
+import time
+
+path_root = Path(__file__).parents[1]
+path_baselines = Path(__file__).parent / "baselines"
+
+# A benchmark fails if it's this much slower than the baseline. (0.25 is 25% slower.)
+DEFAULT_THRESHOLD = 0.25
+
+# Benchmarks that write to disk. Their timings depend on how busy the filesystem is,
+# and vary by 2-3x between back-to-back runs, so they're reported but never fail a run.
+disk_benchmark_prefixes = ("generate_plugin", "phase_write_", "batch_")
+
+
+def main():
+    # Running this file as a script puts benchmarks/ on sys.path, not the project root.
+    sys.path.insert(0, str(path_root))
+
+    args = parse_cli()
+    rounds = 5 if args.quick else 20
+    path_baseline = get_baseline_path()
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        # Keep the template cache out of the project's own cache dir.
+        os.environ["DSD_GENERATOR_CACHE_DIR"] = str(Path(tmp_dir) / "cache")
+
+        benchmarks = {}
+        benchmarks.update(bench_generate_plugin(Path(tmp_dir), rounds))
+        benchmarks.update(bench_phases(Path(tmp_dir), rounds))
+        benchmarks.update(bench_render_throughput(rounds, args.quick))
+        benchmarks.update(bench_batch_scaling(Path(tmp_dir), args.quick))
+
+    results = {"machine": get_machine_info(), "benchmarks": benchmarks}
+    show_results(results)
+    show_cache_speedup(results)
+
+    if args.output:
+        write_results(results, Path(args.output))
+    if args.save_baseline:
+        path_baseline.parent.mkdir(exist_ok=True)
+        write_results(results, path_baseline)
+        print(f"\nSaved baseline: {path_baseline.as_posix()}")
+        return
+
+    if not path_baseline.exists():
+        print(f"\nNo baseline for this machine at {path_baseline.as_posix()}.")
+        print("  Run with --save-baseline to record one.")
+        return
+
+    baseline = json.loads(path_baseline.read_text())
+    regressions = compare_results(results, baseline, args.threshold)
+    show_comparison(results, baseline, regressions, args.threshold)
+    if regressions:
+        sys.exit(f"\n{len(regressions)} benchmarks are more than {args.threshold:.0%} slower than the baseline.")
+
+
+def parse_cli():
+    parser = argparse.ArgumentParser(description="Benchmark the plugin generator.")
+    parser.add_argument("--output", type=str, help="Write results to this JSON file.")
+    parser.add_argument(
+        "--save-baseline",
+        action="store_true",
+        help="Save these results as the new baseline for this machine.",
+    )
+    parser.add_argument(
+        "--threshold",
+        type=float,
+        default=DEFAULT_THRESHOLD,
+        help=f"Fail if any benchmark is slower than the baseline by more than this fraction. (Default: {DEFAULT_THRESHOLD})",
+    )
+    parser.add_argument(
+        "--quick",
+        action="store_true",
+        help="Run fewer rounds, and skip the largest templates and batches.",
+    )
+    return parser.parse_args()
+
+
+# --- Benchmarks ---
+
+def bench_generate_plugin(tmp_path, rounds):
+    """End-to-end latency of generate_plugin(), with and without the output cache."""
+    import generate_plugin as gp
+
+    plugin_config = get_plugin_config()
+    benchmarks = {}
+    for name, no_cache in [("generate_plugin", True), ("generate_plugin_cached", False)]:
+        def generate(path_target):
+            args = argparse.Namespace(target_dir=path_target, no_cache=no_cache)
+            gp.generate_plugin(replace(plugin_config), args)
+
+        benchmarks[name] = time_in_new_dirs(generate, tmp_path / name, rounds)
+
+    return benchmarks
+
+def bench_phases(tmp_path, rounds):
+    """Cost of each phase of generating a plugin."""
+    from utils import generator_utils
+    from utils import output_cache
+    from utils import plugin_tree
+    from utils import template_utils
+
+    plugin_config = get_plugin_config()
+    compiled_template = template_utils.load_compiled_template(generator_utils.path_template)
+    plugin_files = generator_utils.generate_plugin_tree(plugin_config, compiled_template)
+
+    # A plugin in the output cache, as a cache hit in generate_plugin() finds it.
+    platform_name_lower = generator_utils._get_platform_name_lower(plugin_config.platform_name)
+    replacements = generator_utils._get_replacements(plugin_config, platform_name_lower)
+    conditions = generator_utils._get_conditions(plugin_config)
+    cache_key = output_cache.get_cache_key(compiled_template.template_hash, replacements, conditions)
+    output_cache.store_plugin_files(cache_key, plugin_files.items())
+
+    def write(path_target):
+        plugin_tree.write_tree_to_dir(plugin_files.items(), path_target / "dsd-greenhost")
+
+    def write_archive(path_target):
+        path_archive = path_target / "dsd-greenhost.tar.gz"
+        plugin_tree.write_tree_to_archive(plugin_files.items(), path_archive, "dsd-greenhost")
+
+    return {
+        "phase_validate": time_calls(plugin_config.validate, rounds),
+        "phase_scan_template": time_calls(
+            lambda: template_utils.get_template_hash(generator_utils.path_template), rounds
+        ),
+        "phase_load_template": time_calls(
+            lambda: template_utils.load_compiled_template(generator_utils.path_template), rounds
+        ),
+        "phase_compile_template": time_calls(
+            lambda: template_utils.compile_template_tree(generator_utils.path_template), rounds
+        ),
+        "phase_render": time_calls(
+            lambda: generator_utils.generate_plugin_tree(plugin_config, compiled_template), rounds
+        ),
+        "phase_load_cached_plugin": time_calls(
+            lambda: output_cache.load_plugin_files(cache_key), rounds
+        ),
+        "phase_write_dir": time_in_new_dirs(write, tmp_path / "write_dir", rounds),
+        "phase_write_archive": time_in_new_dirs(write_archive, tmp_path / "write_archive", rounds),
+    }
+
+def bench_render_throughput(rounds, quick):
+    """Compile and render synthetic templates of growing size and placeholder density."""
+    from utils import template_utils
+
+    replacements = {"{{PlatformName}}": "Great Green Host", "{{PackageName}}": "dsd-greenhost"}
+
+    benchmarks = {}
+    sizes_kb = [1, 10, 100] if quick else [1, 10, 100, 1000]
+    for size_kb in sizes_kb:
+        for placeholders_per_kb in [1, 10]:
+            contents = get_synthetic_template(size_kb, placeholders_per_kb)
+
+            def render():
+                segments = template_utils.compile_template(contents)
+                template_utils.render_segments(segments, replacements)
+
+            result = time_calls(render, rounds)
+            result["mb_per_second"] = round(len(contents) / 1e6 / (result["min_ms"] / 1000), 1)
+            benchmarks[f"render_{size_kb}kb_{placeholders_per_kb}_per_kb"] = result
+
+    return benchmarks
+
+def bench_batch_scaling(tmp_path, quick):
+    """Throughput of --batch, from one worker up to one worker per CPU."""
+    from utils import batch
+
+    plugin_config = get_plugin_config()
+    num_plugins = 20 if quick else 100
+    max_jobs = os.cpu_count() or 1
+    jobs_counts = sorted({1, 2, 4, max_jobs} & set(range(1, max_jobs + 1)))
+
+    benchmarks = {}
+    for jobs in jobs_counts:
+        path_target = tmp_path / f"batch_{jobs}"
+        path_target.mkdir()
+        plugin_configs = [
+            replace(plugin_config, pkg_name=f"dsd-greenhost{num}", target_dir=path_target)
+            for num in range(num_plugins)
+        ]
+
+        results = batch.generate_batch(plugin_configs, jobs, {"no_cache": True})
+        assert not results["failures"], results["failures"]
+
+        ms_per_plugin = round(results["seconds"] / num_plugins * 1000, 4)
+        benchmarks[f"batch_{jobs}_jobs"] = {
+            "median_ms": ms_per_plugin,
+            "min_ms": ms_per_plugin,
+            "plugins_per_second": round(num_plugins / results["seconds"], 1),
+            "rounds": num_plugins,
+        }
+        shutil.rmtree(path_target)
+
+    return benchmarks
+
+
+# --- Timing and reporting ---
+
+def get_plugin_config():
+    """Get the config for the plugin that's generated in each benchmark."""
+    from utils.plugin_config import PluginConfig
+
+    return PluginConfig(
+        platform_name="Great Green Host",
+        pkg_name="dsd-greenhost",
+        support_automate_all=True,
+        license_name="Eric Matthes",
+    )
+
+def get_baseline_path():
+    """Get the path to the baseline for this machine and Python version."""
+    machine_key = "-".join([
+        platform.node() or "unknown-host",
+        platform.python_implementation(),
+        platform.python_version(),
+        platform.platform(),
+    ])
+    machine_key = re.sub(r"[^A-Za-z0-9._-]+", "_", machine_key)
+    return path_baselines / f"{machine_key}.json"
+
+def time_calls(func, rounds):
+    """Time a function that can be called repeatedly."""
+    func()
+    times = []
+    for _ in range(rounds):
+        start = time.perf_counter()
+        func()
+        times.append(time.perf_counter() - start)
+    return summarize_times(times)
+
+def time_in_new_dirs(func, path_dir, rounds):
+    """Time a function that writes to a new directory each time it's called."""
+    times = []
+    for num in range(rounds + 1):
+        path_target = path_dir / str(num)
+        path_target.mkdir(parents=True)
+
+        start = time.perf_counter()
+        with contextlib.redirect_stdout(io.StringIO()):
+            func(path_target)
+        elapsed = time.perf_counter() - start
+
+        # The first call warms up caches, and isn't counted.
+        if num:
+            times.append(elapsed)
+
+    return summarize_times(times)
+
+def summarize_times(times):
+    return {
+        "median_ms": round(statistics.median(times) * 1000, 4),
+        "min_ms": round(min(times) * 1000, 4),
+        "rounds": len(times),
+    }
+
+def get_synthetic_template(size_kb, placeholders_per_kb):
+    """Build a template of about size_kb KB, with evenly spaced placeholders."""
+    placeholders = ["{{PlatformName}}", "{{PackageName}}"]
+    chunk_size = 1024 // placeholders_per_kb
+    chunks = []
+    for num in range(size_kb * placeholders_per_kb):
+        placeholder = placeholders[num % len(placeholders)]
+        chunks.append("x" * (chunk_size - len(placeholder) - 1) + "\n" + placeholder)
+    return "".join(chunks)
+
+def get_machine_info():
+    return {
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpu_count": os.cpu_count(),
+    }
+
+def compare_results(results, baseline, threshold):
+    """Find benchmarks that are slower than the baseline by more than threshold.
+
+    Returns a dict mapping each regressed benchmark to its ratio of current to baseline time.
+    Benchmarks that are only in one set of results, and disk benchmarks, are ignored.
+    """
+    regressions = {}
+    for name, result in results["benchmarks"].items():
+        baseline_result = baseline["benchmarks"].get(name)
+        if not baseline_result or not baseline_result["min_ms"] or name.startswith(disk_benchmark_prefixes):
+            continue
+
+        ratio = result["min_ms"] / baseline_result["min_ms"]
+        if ratio > 1 + threshold:
+            regressions[name] = ratio
+
+    return regressions
+
+def show_results(results):
+    print("\nBenchmark results (milliseconds per operation):")
+    for name, result in results["benchmarks"].items():
+        print(f"  {name:<32} median {result['median_ms']:>10.3f}  min {result['min_ms']:>10.3f}")
+
+def show_cache_speedup(results):
+    """Show how much faster a cache hit is than rendering the plugin."""
+    benchmarks = results["benchmarks"]
+    print("\nOutput cache:")
+    for cached_name, uncached_name in [
+        ("generate_plugin_cached", "generate_plugin"),
+        ("phase_load_cached_plugin", "phase_render"),
+    ]:
+        speedup = benchmarks[uncached_name]["min_ms"] / benchmarks[cached_name]["min_ms"]
+        print(f"  {cached_name} is {speedup:.1f}x as fast as {uncached_name}")
+
+def show_comparison(results, baseline, regressions, threshold):
+    print(f"\nCompared with baseline (threshold: {threshold:.0%} slower):")
+    for name, result in results["benchmarks"].items():
+        baseline_result = baseline["benchmarks"].get(name)
+        if not baseline_result or not baseline_result["min_ms"]:
+            print(f"  {name:<32} no baseline")
+            continue
+
+        change = result["min_ms"] / baseline_result["min_ms"] - 1
+        flag = "  REGRESSION" if name in regressions else ""
+        if name.startswith(disk_benchmark_prefixes):
+            flag = "  (disk; not checked)"
+        print(f"  {name:<32} {change:>+8.1%}{flag}")
+
+def write_results(results, path):
+    path.write_text(json.dumps(results, indent=2) + "\n")
+
+
+if __name__ == "__main__":
+    main()
@@ -6,24 +6,97 @@ $ python configure_plugin.py
 That's all. You'll be asked a few questions, and this project will generate
 a plugin with passing tests, that you can customize to target a specific platform
 and deployment workflow.
+
+To write the new plugin to an archive instead of a directory:
+$ python generate_plugin.py --output-archive dsd-codered.tar.gz
+
+To add files from your own template layers, or override template files:
+$ python generate_plugin.py --template-dir ../ci-overlay --template-dir ../deployer-overlay
+
+To pull template changes into a plugin that's already been generated:
+$ python generate_plugin.py --update ../dsd-codered
+
+To generate many plugins without prompting:
+$ python generate_plugin.py --batch specs.toml
+
+To see every directory and file a new plugin would have, and any collisions with
+existing paths, without writing anything:
+$ python generate_plugin.py --plan
+$ python generate_plugin.py --batch specs.toml --plan --output-level json
+
+To see where generation time goes, stage by stage:
+$ python generate_plugin.py --timings
+
+To serve plugin generation over HTTP, for tools that generate many plugins:
+$ python generate_plugin.py --serve 8421
+
+To stream specs one at a time, with a journal that lets interrupted runs resume:
+$ python generate_plugin.py --stream specs.jsonl
 """
 
+from pathlib import Path
+import sys
+
+from utils import batch
 from utils import generator_utils
 from utils.plugin_config import PluginConfig
 from utils import cli
+from utils.events import get_event_log
+from utils import server
+from utils import timings as timings_utils
 
 
 def generate_plugin(plugin_config, args):
     """Generate a new plugin."""
     plugin_config.validate()
-    generator_utils.build_new_plugin(args, plugin_config)
-    generator_utils.show_summary()
+    if getattr(args, "plan", False):
+        plan_plugin(plugin_config, args)
+        return
+
+    timings = timings_utils.get_timings(args)
+    events = get_event_log(args)
+    try:
+        if getattr(args, "output_archive", None):
+            generator_utils.build_plugin_archive(args, plugin_config, timings, events)
+        else:
+            generator_utils.build_new_plugin(args, plugin_config, timings=timings, events=events)
+        generator_utils.show_summary(events)
+    finally:
+        # Show whatever happened before an error, too.
+        events.flush()
+    timings_utils.report_timings(args, timings)
+
+def plan_plugin(plugin_config, args):
+    """Show everything generating a new plugin would write, without writing anything."""
+    events = get_event_log(args)
+    plan = generator_utils.plan_new_plugin(args, plugin_config)
+    generator_utils.show_plan(plan, events)
+    events.flush()
+
+    if plan["collisions"]:
+        sys.exit(f"\nThe plan collides with {len(plan['collisions'])} existing paths.")
+
+def update_plugin(path_plugin, template_dirs=None):
+    """Update an existing plugin."""
+    path_templates = generator_utils.get_template_layers(template_dirs)
+    results = generator_utils.update_plugin(path_plugin, path_templates=path_templates)
+    generator_utils.show_update_summary(path_plugin, results)
 
 
 if __name__ == "__main__":
     # Parse cli, get required info, and generate plugin.
     args = cli.parse_cli()
-    plugin_config = PluginConfig()
-    generator_utils.get_plugin_info(args, plugin_config)
 
-    generate_plugin(plugin_config, args)
\ No newline at end of file
+    if args.update:
+        update_plugin(Path(args.update), args.template_dir)
+    elif args.serve:
+        server.run_server(args)
+    elif args.batch:
+        batch.run_batch(args)
+    elif args.stream:
+        batch.run_stream(args)
+    else:
+        plugin_config = PluginConfig()
+        generator_utils.get_plugin_info(args, plugin_config)
+
+        generate_plugin(plugin_config, args)
\ No newline at end of file
@@ -7,6 +7,7 @@ from textwrap import dedent
 from django.conf import settings
 
 
+{% if AutomateAllSupported %}
 confirm_automate_all = """
 The --automate-all flag means django-simple-deploy will:
 - ...
@@ -15,6 +16,7 @@ The --automate-all flag means django-simple-deploy will:
 - Open your deployed project in a new browser tab.
 """
 
+{% endif %}
 cancel_{{PlatformNameLower}} = """
 Okay, cancelling {{PlatformName}} configuration and deployment.
 """
@@ -73,6 +75,7 @@ def success_msg(log_output=""):
         )
 
     return msg
+{% if AutomateAllSupported %}
 
 
 def success_msg_automate_all(deployed_url):
@@ -94,3 +97,4 @@ def success_msg_automate_all(deployed_url):
     """
     )
     return msg
+{% endif %}
@@ -23,7 +23,9 @@ class PluginConfig:
 
     def __init__(self):
         self.automate_all_supported = {{AutomateAllSupported}}
+        {% if AutomateAllSupported %}
         self.confirm_automate_all_msg = platform_msgs.confirm_automate_all
+        {% endif %}
         self.platform_name = "{{PlatformName}}"
 
 
@@ -1,4 +1,4 @@
-"""Helper functions specific to {{PlatformmName}}.
+"""Helper functions specific to {{PlatformName}}.
 
 Some Fly.io functions are included as an example.
 """
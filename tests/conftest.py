@@ -0,0 +1,35 @@
+"""Options and fixtures shared by the test suite.
+
+Options have to be registered in a conftest.py that pytest loads before it parses the
+command line, so they're here instead of in the conftest.py that uses them.
+"""
+
+import pytest
+
+
+def pytest_addoption(parser):
+    parser.addoption(
+        "--update-golden",
+        action="store_true",
+        help="Rebuild the golden reference plugins from the current template.",
+    )
+    parser.addoption(
+        "--fuzz-count",
+        type=int,
+        default=200,
+        help="Number of random names to generate plugins for in test_name_fuzz.py.",
+    )
+
+
+@pytest.fixture(scope="session", autouse=True)
+def generator_cache_dir(tmp_path_factory):
+    """Start each test session with an empty generator cache.
+
+    Otherwise tests would load plugins cached by earlier runs from the repo's
+    .generator_cache/, and never exercise the renderer. The cache is set for the whole
+    session, so module-scoped fixtures use it too.
+    """
+    path_cache = tmp_path_factory.mktemp("generator_cache")
+    with pytest.MonkeyPatch.context() as mp:
+        mp.setenv("DSD_GENERATOR_CACHE_DIR", str(path_cache))
+        yield path_cache
@@ -1,12 +1,10 @@
 """Configuration for e2e test runs."""
 
-import json
-import subprocess
-import shlex
 from dataclasses import dataclass
 
 import pytest
 
+from tests.e2e_tests.utils import dev_env
 from tests.e2e_tests.utils import e2e_utils
 
 
@@ -27,56 +25,81 @@ def pytest_addoption(parser):
         action="store_true",
         help="Build full set of test dev env with test plugins, but don't run any tests."
     )
+    parser.addoption(
+        "--dsd-mirror",
+        action="store",
+        default=None,
+        help="Clone django-simple-deploy from this local mirror, instead of from GitHub. (Or set DSD_E2E_MIRROR.)",
+    )
+    parser.addoption(
+        "--rebuild-dev-env",
+        action="store_true",
+        help="Rebuild the cached dev env for django-simple-deploy, even if it's up to date.",
+    )
+    parser.addoption(
+        "--wheelhouse",
+        action="store",
+        default=None,
+        help="Make every install from the wheels in this directory, filling it first if it's missing any.",
+    )
 
 @dataclass
 class CLIOptions:
     run_core_tests: bool=False
     setup_plugins_only: bool=False
+    dsd_mirror: str=None
+    rebuild_dev_env: bool=False
+    wheelhouse: str=None
 
 @pytest.fixture(scope="session")
 def cli_options(request):
     return CLIOptions(
         run_core_tests=request.config.getoption("--run-core-tests"),
         setup_plugins_only=request.config.getoption("--setup-plugins-only"),
+        dsd_mirror=request.config.getoption("--dsd-mirror"),
+        rebuild_dev_env=request.config.getoption("--rebuild-dev-env"),
+        wheelhouse=request.config.getoption("--wheelhouse"),
     )
 
 
 # --- Fixtures ---
 
+@pytest.fixture(scope="session")
+def locked_dev_env(cli_options):
+    """Get the cached dev env for django-simple-deploy, and lock it for the whole session.
+
+    The env's venv is shared by every session that uses the env, and tests install and
+    uninstall plugins in it. Holding the lock keeps another session from changing it
+    mid-test; that session waits until this one ends. See utils/dev_env.py.
+    """
+    path_env, f_lock = dev_env.get_dev_env(cli_options)
+    path_dsd = path_env / "django-simple-deploy"
+    path_to_python = path_dsd / ".venv" / "bin" / "python"
+
+    with f_lock:
+        # A session that was interrupted may have left a plugin installed.
+        e2e_utils.uninstall_plugins(path_to_python)
+
+        if not cli_options.setup_plugins_only and not dev_env.core_tests_passed(path_env):
+            # Run core tests without a plugin installed, once for each env.
+            e2e_utils.run_dsd_core_tests(path_dsd, path_to_python, cli_options)
+            dev_env.record_core_tests_passed(path_env)
+
+        yield path_to_python, path_dsd
+
 @pytest.fixture(scope="module")
-def get_dev_env(tmp_path_factory, cli_options):
+def get_dev_env(tmp_path_factory, locked_dev_env):
     """Set up an env where plugins can be generated and tested within django-simple-deploy.
 
-    - Set up a temp dir.
-    - Install dev env for django-simple-deploy.
-    - We can generate plugins, with this temp dir as target location.
+    - Get the locked dev env for django-simple-deploy.
+    - Set up a temp dir, where plugins are generated.
     - Then install newly-generated plugins to dsd dev env, and run tests from dsd.
     """
-    # Make the temp directory for the dsd development env.
+    path_to_python, path_dsd = locked_dev_env
+
+    # Make the temp directory for new plugins.
     tmp_path = tmp_path_factory.mktemp("e2e_new_plugin_test")
-    print(f"\nBuilding e2e test env at: {tmp_path.as_posix()}")
-
-    # Clone django-simple-deploy in temp env.
-    path_dsd = tmp_path / "django-simple-deploy"
-    cmd = f"git clone https://github.com/django-simple-deploy/django-simple-deploy.git {path_dsd.as_posix()} --depth 1"
-    cmd_parts = shlex.split(cmd)
-    subprocess.run(cmd_parts)
-
-    # Build a venv in the django-simple-deploy temp dir.
-    venv_dir = path_dsd / ".venv"
-    cmd = f"uv venv {venv_dir}"
-    cmd_parts = shlex.split(cmd)
-    subprocess.run(cmd_parts)
-
-    # Make an editable install of django-simple-deploy in its environment.
-    path_to_python = venv_dir / "bin" / "python"
-    cmd = f'uv pip install --python {path_to_python} -e "{path_dsd.as_posix()}[dev]"'
-    cmd_parts = shlex.split(cmd)
-    subprocess.run(cmd_parts)
-
-    if not cli_options.setup_plugins_only:
-        # Run core tests without a plugin installed.
-        e2e_utils.run_dsd_core_tests(path_dsd, path_to_python, cli_options)
+    print(f"\nWriting e2e test plugins to: {tmp_path.as_posix()}")
 
     return tmp_path, path_to_python, path_dsd
 
@@ -91,13 +114,4 @@ def clear_plugins(get_dev_env):
     # Yield to let test function run, then clear any plugins that were installed.
     yield
 
-    cmd = f"uv pip list --python {path_to_python} --format=json"
-    cmd_parts = shlex.split(cmd)
-    package_dicts_str = subprocess.run(cmd_parts, capture_output=True).stdout
-    package_dicts = json.loads(package_dicts_str)
-    package_names = [pd["name"] for pd in package_dicts if pd["name"].startswith("dsd-")]
-
-    for pkg_name in package_names:
-        cmd = f"uv pip uninstall {pkg_name} --python {path_to_python}"
-        cmd_parts = shlex.split(cmd)
-        subprocess.run(cmd_parts)
\ No newline at end of file
+    e2e_utils.uninstall_plugins(path_to_python)
\ No newline at end of file
@@ -40,7 +40,7 @@ def test_simple_plugin(get_dev_env, cli_options):
         support_automate_all = True,
         license_name = "eric",
     )
-    e2e_utils.generate_plugin(get_dev_env, plugin_config)
+    e2e_utils.generate_plugin(get_dev_env, plugin_config, cli_options)
 
     if not cli_options.setup_plugins_only:
         e2e_utils.run_core_plugin_tests(path_dsd, plugin_config, cli_options)
@@ -55,7 +55,7 @@ def test_plugin_single_space_platform_name(get_dev_env, cli_options):
         support_automate_all = True,
         license_name = "eric",
     )
-    e2e_utils.generate_plugin(get_dev_env, plugin_config)
+    e2e_utils.generate_plugin(get_dev_env, plugin_config, cli_options)
 
     if not cli_options.setup_plugins_only:
         e2e_utils.run_core_plugin_tests(path_dsd, plugin_config, cli_options)
@@ -70,7 +70,7 @@ def test_plugin_different_plugin_platform_name(get_dev_env, cli_options):
         support_automate_all = True,
         license_name = "eric",
     )
-    e2e_utils.generate_plugin(get_dev_env, plugin_config)
+    e2e_utils.generate_plugin(get_dev_env, plugin_config, cli_options)
 
     if not cli_options.setup_plugins_only:
         e2e_utils.run_core_plugin_tests(path_dsd, plugin_config, cli_options)
\ No newline at end of file
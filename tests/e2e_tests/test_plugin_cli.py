@@ -47,7 +47,7 @@ def test_custom_cli_arg(get_dev_env, cli_options):
         support_automate_all = True,
         license_name = "eric",
     )
-    e2e_utils.generate_plugin(get_dev_env, plugin_config)
+    e2e_utils.generate_plugin(get_dev_env, plugin_config, cli_options)
 
     msg = "\n*** Modifying plugin code to use the custom CLI arg that's commented out by default. ***\n"
     print(msg)
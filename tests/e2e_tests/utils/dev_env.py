@@ -0,0 +1,335 @@
+"""Persistent dev environments for django-simple-deploy, shared by e2e test sessions.
+
+Building a dev env means cloning django-simple-deploy, making a venv, and installing
+core and its dependencies. That's most of the time an e2e run takes, so each env is
+built once, and kept in .generator_cache/e2e/ instead of in pytest's rotating temp dirs.
+
+An env is keyed by the core commit it was built from, and the dependency set resolved
+from that commit's pyproject.toml. A new commit, or a new release of any dependency,
+gives a new key, and a new env. An env is only reused once its completion marker has
+been written, so an interrupted build is thrown away and built again.
+
+Core is cloned from GitHub, or from a local mirror given with --dsd-mirror or
+DSD_E2E_MIRROR. If the source can't be reached, the most recently used env is reused,
+so e2e tests can run offline.
+
+A session holds an exclusive lock on its env from before the env is built until the
+session ends, because tests install and uninstall plugins in the env's venv. Another
+session that wants the same env waits for the lock, and envs that are locked are never
+pruned.
+
+With --wheelhouse DIR, every install is made from the wheels in DIR, with no index.
+The wheelhouse is checked every session, whether the env is built or reused, and filled
+whenever it's missing anything core or a generated plugin needs. So later builds run at
+local-disk speed, and can run on machines with no network access once the wheelhouse
+has been copied to them.
+"""
+
+import fcntl
+import hashlib
+import json
+import os
+from pathlib import Path
+import shlex
+import shutil
+import subprocess
+import time
+import tomllib
+
+import pytest
+
+from utils import template_utils
+
+
+dsd_repo_url = "https://github.com/django-simple-deploy/django-simple-deploy.git"
+
+# Written to an env once it's fully built.
+marker_name = ".dsd-e2e-complete"
+
+# Written to an env once core's own tests have passed in it.
+core_tests_marker_name = ".dsd-e2e-core-tests-passed"
+
+# Number of envs to keep. The least recently used envs are removed.
+MAX_CACHED_ENVS = 3
+
+path_plugin_pyproject = Path(__file__).parents[3] / "plugin_template" / "pyproject.toml"
+
+# Found when this module is imported, before tests/conftest.py points the generator cache
+# at an empty temp dir for the session, so envs are still shared across sessions.
+path_e2e_cache = template_utils.get_cache_dir() / "e2e"
+
+
+def get_cache_dir():
+    """Get the directory where e2e dev envs are kept."""
+    return path_e2e_cache
+
+def get_dev_env(cli_options):
+    """Get a dev env for the current core commit, building it only if needed.
+
+    Returns the path to the env, which holds the django-simple-deploy clone and its venv,
+    and the open lock file for the env. The env is locked until the lock file is closed.
+    """
+    path_cache = get_cache_dir()
+    source = cli_options.dsd_mirror or os.environ.get("DSD_E2E_MIRROR") or dsd_repo_url
+    path_wheelhouse = get_wheelhouse(cli_options)
+
+    commit = get_core_commit(source)
+    if commit is None:
+        path_env = get_latest_env(path_cache)
+        if path_env is None:
+            pytest.fail(f"Can't reach {source}, and there's no cached dev env to use.")
+        print(f"\nCan't reach {source}; reusing dev env: {path_env.as_posix()}")
+        f_lock = lock_env(path_env)
+        if path_wheelhouse is not None:
+            # The env's own clone of core stands in for the checkout it was built from.
+            requirements = (path_env / "requirements.txt").read_text()
+            path_dsd = path_env / "django-simple-deploy"
+            fill_wheelhouse(path_wheelhouse, path_env, path_dsd, requirements)
+        _touch_marker(path_env)
+        return path_env, f_lock
+
+    path_src, commit = get_core_checkout(path_cache, source, commit)
+    requirements = resolve_requirements(path_src, path_wheelhouse)
+    key = get_env_key(commit, requirements)
+    path_env = path_cache / "envs" / key[:16]
+
+    # Another session may be building or using this env, so check whether it's complete
+    # only once it's locked.
+    f_lock = lock_env(path_env)
+    if cli_options.rebuild_dev_env or not (path_env / marker_name).exists():
+        print(f"\nBuilding e2e dev env at: {path_env.as_posix()}")
+        build_dev_env(path_env, path_src, requirements, commit, key, path_wheelhouse)
+    else:
+        print(f"\nReusing e2e dev env at: {path_env.as_posix()}")
+        if path_wheelhouse is not None:
+            # Generated plugins may need wheels the env itself didn't.
+            fill_wheelhouse(path_wheelhouse, path_env, path_src, requirements)
+
+    _touch_marker(path_env)
+    prune_envs(path_cache)
+    return path_env, f_lock
+
+def lock_env(path_env):
+    """Take an exclusive lock on an env, waiting for any other session that holds it.
+
+    Returns the open lock file. The lock is released when the file is closed, or when
+    the process exits.
+    """
+    f_lock = open(_get_lock_path(path_env), "w")
+    try:
+        fcntl.flock(f_lock, fcntl.LOCK_EX | fcntl.LOCK_NB)
+    except BlockingIOError:
+        print(f"\nWaiting for another e2e session to finish with: {path_env.as_posix()}")
+        fcntl.flock(f_lock, fcntl.LOCK_EX)
+    return f_lock
+
+def get_core_commit(source):
+    """Get the commit at HEAD of the core repo, or None if it can't be reached."""
+    cmd = f"git ls-remote {shlex.quote(str(source))} HEAD"
+    output = subprocess.run(shlex.split(cmd), capture_output=True, text=True)
+    if output.returncode != 0 or not output.stdout.strip():
+        return None
+    return output.stdout.split()[0]
+
+def get_core_checkout(path_cache, source, commit):
+    """Get a checkout of core at commit, cloning it if there isn't one yet.
+
+    Returns the path to the checkout, and the commit it's at. That's normally the commit
+    that was asked for, unless the source moved on between looking it up and cloning it.
+    """
+    path_src = path_cache / "src" / commit
+    if (path_src / ".git").exists():
+        return path_src, commit
+
+    path_tmp = path_cache / "src" / f".{commit}.tmp"
+    shutil.rmtree(path_tmp, ignore_errors=True)
+    path_tmp.parent.mkdir(parents=True, exist_ok=True)
+    _run(f"git clone --depth 1 {shlex.quote(str(source))} {shlex.quote(path_tmp.as_posix())}")
+
+    cmd = f"git -C {shlex.quote(path_tmp.as_posix())} rev-parse HEAD"
+    commit = subprocess.run(shlex.split(cmd), capture_output=True, text=True).stdout.strip()
+    path_src = path_cache / "src" / commit
+    if path_src.exists():
+        shutil.rmtree(path_tmp)
+    else:
+        os.rename(path_tmp, path_src)
+
+    return path_src, commit
+
+def get_wheelhouse(cli_options):
+    """Get the path to the wheelhouse, or None if installs should use the index."""
+    if not cli_options.wheelhouse:
+        return None
+    path_wheelhouse = Path(cli_options.wheelhouse).expanduser().resolve()
+    path_wheelhouse.mkdir(parents=True, exist_ok=True)
+    return path_wheelhouse
+
+def get_install_args(path_wheelhouse):
+    """Get the args that make uv install only from the wheelhouse, if there is one."""
+    if path_wheelhouse is None:
+        return ""
+    return f" --offline --no-index --find-links {shlex.quote(path_wheelhouse.as_posix())}"
+
+def resolve_requirements(path_src, path_wheelhouse=None):
+    """Resolve the pinned dependency set for core, including its dev extras.
+
+    Resolves against the wheelhouse first, if there is one, so the same wheelhouse
+    always gives the same env. Falls back to the index, and then to uv's cache when
+    the index can't be reached.
+    """
+    path_pyproject = path_src / "pyproject.toml"
+    cmd = f"uv pip compile {shlex.quote(path_pyproject.as_posix())} --extra dev --no-header --quiet"
+    attempts = ["", " --offline"]
+    if path_wheelhouse is not None:
+        attempts.insert(0, get_install_args(path_wheelhouse))
+    for extra_args in attempts:
+        output = subprocess.run(shlex.split(cmd + extra_args), capture_output=True, text=True)
+        if output.returncode == 0:
+            return output.stdout
+
+    pytest.fail(f"Couldn't resolve dependencies for django-simple-deploy:\n{output.stderr}")
+
+def get_env_key(commit, requirements):
+    """Get the key for an env built from a core commit, with a resolved dependency set."""
+    hasher = hashlib.sha256(commit.encode())
+    hasher.update(requirements.encode())
+    return hasher.hexdigest()
+
+def build_dev_env(path_env, path_src, requirements, commit, key, path_wheelhouse=None):
+    """Build an env from a core checkout, and mark it complete."""
+    shutil.rmtree(path_env, ignore_errors=True)
+    path_env.mkdir(parents=True)
+
+    # The venv and the editable install record absolute paths, so everything is built
+    # in its final location, and only the completion marker says it's ready.
+    path_dsd = path_env / "django-simple-deploy"
+    _run(f"git clone {shlex.quote(path_src.as_posix())} {shlex.quote(path_dsd.as_posix())}")
+
+    path_requirements = path_env / "requirements.txt"
+    path_requirements.write_text(requirements)
+
+    if path_wheelhouse is not None:
+        fill_wheelhouse(path_wheelhouse, path_env, path_src, requirements)
+    install_args = get_install_args(path_wheelhouse)
+
+    venv_dir = path_dsd / ".venv"
+    path_to_python = venv_dir / "bin" / "python"
+    _run(f"uv venv {shlex.quote(venv_dir.as_posix())}")
+    _run(f"uv pip install --python {path_to_python}{install_args} -r {shlex.quote(path_requirements.as_posix())}")
+    _run(f'uv pip install --python {path_to_python}{install_args} --no-deps -e "{path_dsd.as_posix()}[dev]"')
+
+    marker = {"commit": commit, "key": key, "built": time.time()}
+    (path_env / marker_name).write_text(json.dumps(marker, indent=2) + "\n")
+
+def fill_wheelhouse(path_wheelhouse, path_env, path_src, requirements):
+    """Add any wheels core and generated plugins need that the wheelhouse doesn't have.
+
+    That's core's pinned requirements, the build backends for core and for generated
+    plugins, and the dependencies of generated plugins. If the wheelhouse can already
+    satisfy all of these, nothing is downloaded.
+    """
+    path_wheelhouse_requirements = path_env / "wheelhouse-requirements.txt"
+    extra_requirements = get_build_requirements(path_src / "pyproject.toml") + get_plugin_requirements()
+    path_wheelhouse_requirements.write_text(requirements + "".join(f"{req}\n" for req in extra_requirements))
+    quoted_requirements = shlex.quote(path_wheelhouse_requirements.as_posix())
+
+    cmd = f"uv pip compile {quoted_requirements} --no-header --quiet{get_install_args(path_wheelhouse)}"
+    if subprocess.run(shlex.split(cmd), capture_output=True).returncode == 0:
+        return
+
+    print(f"\nFilling wheelhouse at: {path_wheelhouse.as_posix()}")
+    quoted_wheelhouse = shlex.quote(path_wheelhouse.as_posix())
+    _run(f"uvx pip wheel --wheel-dir {quoted_wheelhouse} --find-links {quoted_wheelhouse} -r {quoted_requirements}")
+
+def get_build_requirements(path_pyproject):
+    """Get the packages needed to build a project, from its pyproject.toml."""
+    pyproject = tomllib.loads(path_pyproject.read_text())
+    return pyproject.get("build-system", {}).get("requires", [])
+
+def get_plugin_requirements():
+    """Get everything a generated plugin needs to build and install, except core.
+
+    Core is already installed in the env, from its own checkout.
+    """
+    pyproject = tomllib.loads(path_plugin_pyproject.read_text())
+    requirements = get_build_requirements(path_plugin_pyproject)
+    requirements += pyproject["project"]["dependencies"]
+    requirements += pyproject["project"].get("optional-dependencies", {}).get("dev", [])
+    return [req for req in requirements if not req.startswith("django-simple-deploy")]
+
+def core_tests_passed(path_env):
+    """Check whether core's own tests have already passed in an env."""
+    return (path_env / core_tests_marker_name).exists()
+
+def record_core_tests_passed(path_env):
+    """Mark an env as one where core's own tests have passed."""
+    (path_env / core_tests_marker_name).touch()
+
+def get_latest_env(path_cache):
+    """Get the most recently used complete env, or None if there isn't one."""
+    envs = _get_complete_envs(path_cache)
+    return envs[0] if envs else None
+
+def prune_envs(path_cache, max_envs=MAX_CACHED_ENVS):
+    """Remove the least recently used envs, and any incomplete envs and unused checkouts."""
+    path_envs = path_cache / "envs"
+    if not path_envs.exists():
+        return
+
+    keep_envs = _get_complete_envs(path_cache)[:max_envs]
+    for path_env in path_envs.iterdir():
+        if path_env in keep_envs or _is_recent(path_env):
+            continue
+        # Hold the env's lock while removing it, so no session starts using it meanwhile.
+        f_lock = open(_get_lock_path(path_env), "w")
+        try:
+            fcntl.flock(f_lock, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except BlockingIOError:
+            f_lock.close()
+            continue
+        with f_lock:
+            shutil.rmtree(path_env, ignore_errors=True)
+
+    keep_commits = {
+        json.loads((path_env / marker_name).read_text())["commit"] for path_env in keep_envs
+    }
+    path_srcs = path_cache / "src"
+    for path_src in path_srcs.iterdir() if path_srcs.exists() else []:
+        if path_src.name not in keep_commits and not _is_recent(path_src):
+            shutil.rmtree(path_src, ignore_errors=True)
+
+
+# --- Helper functions ---
+
+def _run(cmd):
+    """Run a command, and fail if it doesn't succeed."""
+    output = subprocess.run(shlex.split(cmd))
+    if output.returncode != 0:
+        pytest.fail(f"Building the e2e dev env failed: {cmd}")
+
+def _get_lock_path(path_env):
+    """Get the path to an env's lock file.
+
+    Lock files are kept outside the envs, so rebuilding or removing an env doesn't
+    remove its lock.
+    """
+    path_locks = path_env.parent.parent / "locks"
+    path_locks.mkdir(parents=True, exist_ok=True)
+    return path_locks / f"{path_env.name}.lock"
+
+def _touch_marker(path_env):
+    """Mark an env as just used, so it's the last to be pruned."""
+    (path_env / marker_name).touch()
+
+def _get_complete_envs(path_cache):
+    """Get every complete env, most recently used first."""
+    path_envs = path_cache / "envs"
+    if not path_envs.exists():
+        return []
+
+    envs = [path_env for path_env in path_envs.iterdir() if (path_env / marker_name).exists()]
+    return sorted(envs, key=lambda path_env: (path_env / marker_name).stat().st_mtime, reverse=True)
+
+def _is_recent(path, seconds=3600):
+    """Check whether a path was changed recently, so it might be in use by another session."""
+    return time.time() - path.stat().st_mtime < seconds
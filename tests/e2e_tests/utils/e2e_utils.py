@@ -2,6 +2,7 @@
 
 
 from argparse import Namespace
+import json
 import shlex
 import subprocess
 import re
@@ -11,6 +12,7 @@ import pytest
 import generate_plugin as gp
 from utils.plugin_config import PluginConfig
 from utils.generator_utils import _get_platform_name_lower
+from tests.e2e_tests.utils import dev_env as dev_env_utils
 
 
 def uv_available():
@@ -24,12 +26,13 @@ def uv_available():
         # This is the exception raised on macOS when the command uv is unavailable.
         return False
 
-def generate_plugin(dev_env, plugin_config):
+def generate_plugin(dev_env, plugin_config, cli_options):
     """Generate a new plugin, and install it to the django-simple-deploy dev env.
     """
     dev_env_dir, path_to_python, path_dsd = dev_env
 
-    args = Namespace(target_dir=dev_env_dir)
+    # Catch plugins that don't compile or import before spending time installing them.
+    args = Namespace(target_dir=dev_env_dir, check=True)
     gp.generate_plugin(plugin_config, args)
 
     # Make sure we have the correct path to the new plugin.
@@ -37,9 +40,25 @@ def generate_plugin(dev_env, plugin_config):
     assert path_new_plugin.exists()
 
     # Install plugin editable to django-simple-deploy env.
-    cmd = f'uv pip install --python {path_to_python} -e "{path_new_plugin.as_posix()}[dev]"'
+    install_args = dev_env_utils.get_install_args(dev_env_utils.get_wheelhouse(cli_options))
+    cmd = f'uv pip install --python {path_to_python}{install_args} -e "{path_new_plugin.as_posix()}[dev]"'
     cmd_parts = shlex.split(cmd)
-    subprocess.run(cmd_parts)
+    output = subprocess.run(cmd_parts)
+    if output.returncode != 0:
+        pytest.fail(f"Installing {plugin_config.pkg_name} to the dev env failed: {cmd}")
+
+def uninstall_plugins(path_to_python):
+    """Uninstall every dsd- plugin from the django-simple-deploy dev env."""
+    cmd = f"uv pip list --python {path_to_python} --format=json"
+    cmd_parts = shlex.split(cmd)
+    package_dicts_str = subprocess.run(cmd_parts, capture_output=True).stdout
+    package_dicts = json.loads(package_dicts_str)
+    package_names = [pd["name"] for pd in package_dicts if pd["name"].startswith("dsd-")]
+
+    for pkg_name in package_names:
+        cmd = f"uv pip uninstall {pkg_name} --python {path_to_python}"
+        cmd_parts = shlex.split(cmd)
+        subprocess.run(cmd_parts)
 
 
 def run_dsd_core_tests(path_dsd, path_to_python, cli_options):
@@ -0,0 +1,368 @@
+"""Golden reference plugins for generated plugins.
+
+One reference plugin, the base, is stored as a full tree in reference_files/<base>/,
+with a manifest in reference_files/<base>.manifest. The manifest has one line per
+file: its sha256, its mode, and its path. Every other variant in golden_variants is
+stored as a delta against the base, in reference_files/<name>.delta.json.
+
+A delta pairs each file with the base file generated from the same template file, and
+records only the lines that differ, as difflib opcodes. Base files the variant doesn't
+have are listed under "removed".
+
+The lock file is derived from the other files, so it's left out of the reference
+plugins. Each generated lock file is checked on its own, against a lock file rebuilt
+from the reference plugin's files and the current template.
+
+Generated plugins are compared against the rebuilt reference plugin in memory. On a
+mismatch, the test fails with a unified diff of the manifests, and a unified diff of
+each changed file.
+
+To rebuild the base and every delta from the current template, in one process, run:
+$ pytest --update-golden
+"""
+
+import difflib
+from functools import cache
+import hashlib
+import json
+from pathlib import Path
+import tarfile
+import zipfile
+
+import pytest
+
+from utils import generator_utils, lock_utils
+from utils.plugin_config import PluginConfig
+from utils.plugin_generator import PluginGenerator
+from utils.plugin_tree import PluginFile
+
+
+path_reference_files = Path(__file__).parent / "reference_files"
+
+# Config for each reference plugin. The first variant is the base.
+golden_variants = {
+    "dsd-newfly-no-space": {"platform_name": "NewFly", "pkg_name": "dsd-newfly"},
+    "dsd-newfly-single-space": {"platform_name": "New Fly", "pkg_name": "dsd-newfly"},
+    "dsd-greenhost-advanced": {"platform_name": "Great Green Host", "pkg_name": "dsd-greenhost-advanced"},
+}
+base_name = next(iter(golden_variants))
+
+# Files that are never part of a reference plugin.
+ignored_names = {".DS_Store", "__pycache__"}
+
+
+@pytest.fixture(scope="session", autouse=True)
+def update_golden(request):
+    """Rebuild the reference plugins before any test compares against them.
+
+    --update-golden is registered in tests/conftest.py, so pytest accepts it from the
+    project root.
+    """
+    if request.config.getoption("--update-golden"):
+        write_goldens()
+
+
+@pytest.fixture
+def assert_matches_golden():
+    """Check a generated plugin against a golden reference plugin.
+
+    Takes a dict of paths to PluginFile objects, or the path to a plugin directory or
+    archive.
+    """
+
+    def _assert_matches_golden(plugin, name):
+        if isinstance(plugin, Path) and plugin.is_dir():
+            plugin_files = read_plugin_dir(plugin)
+        elif isinstance(plugin, Path):
+            plugin_files = read_plugin_archive(plugin)
+        else:
+            plugin_files = plugin
+        files = get_files(plugin_files)
+        lock_contents, _ = files.pop(lock_utils.lock_file_name, (b"", None))
+
+        expected_files = load_golden(name)
+        expected_lines = get_manifest_lines(expected_files)
+        actual_lines = get_manifest_lines(files)
+        if actual_lines != expected_lines:
+            msg = get_mismatch_msg(name, expected_files, files, expected_lines, actual_lines)
+            pytest.fail(msg, pytrace=False)
+
+        expected_lock = get_expected_lock(name, expected_files)
+        if lock_contents != expected_lock:
+            msg = f"Lock file for {name} doesn't match the reference plugin's files.\n"
+            msg += "".join(
+                difflib.unified_diff(
+                    expected_lock.decode().splitlines(keepends=True),
+                    lock_contents.decode().splitlines(keepends=True),
+                    f"{name}/{lock_utils.lock_file_name}",
+                    f"generated/{lock_utils.lock_file_name}",
+                )
+            )
+            pytest.fail(msg, pytrace=False)
+
+    return _assert_matches_golden
+
+
+def read_plugin_dir(path_plugin):
+    """Read a plugin directory into a dict of paths to PluginFile objects."""
+    return {
+        path.relative_to(path_plugin).as_posix(): PluginFile(
+            path.read_bytes(), 0o755 if path.stat().st_mode & 0o111 else 0o644
+        )
+        for path in path_plugin.rglob("*")
+        if path.is_file() and not ignored_names.intersection(path.relative_to(path_plugin).parts)
+    }
+
+
+def read_plugin_archive(path_archive):
+    """Read a plugin archive into a dict of paths to PluginFile objects.
+
+    The plugin's root directory is left out of each path.
+    """
+    plugin_files = {}
+    if path_archive.name.endswith(".zip"):
+        with zipfile.ZipFile(path_archive) as zf:
+            for info in zf.infolist():
+                target_file = info.filename.split("/", 1)[1]
+                plugin_files[target_file] = PluginFile(zf.read(info), (info.external_attr >> 16) & 0o777)
+    else:
+        with tarfile.open(path_archive) as tf:
+            for member in tf.getmembers():
+                target_file = member.name.split("/", 1)[1]
+                plugin_files[target_file] = PluginFile(tf.extractfile(member).read(), member.mode)
+
+    return plugin_files
+
+
+def get_files(plugin_files):
+    """Get a dict of paths to (contents, mode) pairs."""
+    return {
+        target_file: (b"".join(plugin_file.chunks()), plugin_file.mode)
+        for target_file, plugin_file in plugin_files.items()
+    }
+
+
+def get_manifest_lines(files):
+    """Get a manifest line for each file, sorted by path."""
+    return [
+        f"{hashlib.sha256(contents).hexdigest()} {mode:o} {target_file}"
+        for target_file, (contents, mode) in sorted(files.items())
+    ]
+
+
+def get_golden_config(name):
+    """Get the PluginConfig a reference plugin is generated from."""
+    return PluginConfig(**golden_variants[name], support_automate_all=True, license_name="eric")
+
+
+def get_expected_lock(name, files):
+    """Rebuild a reference plugin's lock file from its files and the current template."""
+    plugin_config = get_golden_config(name)
+    manifest, replacements, conditions = generator_utils._get_render_inputs(plugin_config)
+
+    locked_files = {}
+    for target_file, target_file_new, compiled_file in manifest:
+        contents, mode = files.get(target_file_new, (b"", 0o644))
+        locked_files[target_file_new] = lock_utils.get_locked_file(
+            target_file, compiled_file, PluginFile(contents, mode)
+        )
+
+    inputs_hash = lock_utils.get_inputs_hash(replacements, conditions)
+    return lock_utils.get_lock_contents(plugin_config, inputs_hash, locked_files)
+
+
+def get_mismatch_msg(name, expected_files, files, expected_lines, actual_lines):
+    """Describe how a generated plugin differs from its reference plugin."""
+    msg = f"Generated plugin doesn't match {name}. (Run pytest --update-golden to accept.)\n"
+    msg += "".join(
+        difflib.unified_diff(
+            [f"{line}\n" for line in expected_lines],
+            [f"{line}\n" for line in actual_lines],
+            f"{name}.manifest",
+            "generated",
+        )
+    )
+
+    # Show how each changed file differs from its reference copy.
+    changed_files = {line.split(" ", 2)[2] for line in set(actual_lines) - set(expected_lines)}
+    for target_file in sorted(changed_files & expected_files.keys()):
+        try:
+            expected_text = expected_files[target_file][0].decode()
+            actual_text = files[target_file][0].decode()
+        except UnicodeDecodeError:
+            continue
+        msg += "".join(
+            difflib.unified_diff(
+                expected_text.splitlines(keepends=True),
+                actual_text.splitlines(keepends=True),
+                f"{name}/{target_file}",
+                f"generated/{target_file}",
+            )
+        )
+
+    return msg
+
+
+# --- Loading reference plugins ---
+
+@cache
+def load_golden(name):
+    """Load a reference plugin into a dict of paths to (contents, mode) pairs."""
+    base_files = load_base()
+    if name == base_name:
+        return base_files
+
+    delta = json.loads((path_reference_files / f"{name}.delta.json").read_text())
+    return apply_delta(base_files, delta)
+
+
+def load_base():
+    """Load the base reference plugin, with the modes recorded in its manifest."""
+    path_base = path_reference_files / base_name
+    manifest_lines = (path_reference_files / f"{base_name}.manifest").read_text().splitlines()
+
+    files = {}
+    for line in manifest_lines:
+        _, mode, target_file = line.split(" ", 2)
+        files[target_file] = ((path_base / target_file).read_bytes(), int(mode, 8))
+
+    if get_manifest_lines(files) != manifest_lines:
+        pytest.fail(
+            f"reference_files/{base_name}/ doesn't match its manifest. (Run pytest --update-golden to rebuild it.)",
+            pytrace=False,
+        )
+    return files
+
+
+def apply_delta(base_files, delta):
+    """Rebuild a variant from the base files and its delta."""
+    files = {
+        target_file: base_file
+        for target_file, base_file in base_files.items()
+        if target_file not in delta["removed"]
+    }
+    for target_file, file_delta in delta["files"].items():
+        base_contents, mode = base_files.get(file_delta.get("base", target_file), (b"", 0o644))
+        base_lines = split_lines(base_contents)
+
+        lines = []
+        pos = 0
+        for i1, i2, new_text in file_delta["ops"]:
+            lines.extend(base_lines[pos:i1])
+            lines.append(new_text)
+            pos = i2
+        lines.extend(base_lines[pos:])
+
+        contents = "".join(lines).encode("utf-8", "surrogateescape")
+        files[target_file] = (contents, int(file_delta.get("mode", f"{mode:o}"), 8))
+
+    return files
+
+
+def split_lines(contents):
+    """Split contents into lines, keeping any bytes that aren't valid UTF-8."""
+    return contents.decode("utf-8", "surrogateescape").splitlines(keepends=True)
+
+
+# --- Writing reference plugins ---
+
+def write_goldens():
+    """Rebuild the base reference plugin, and every variant's delta, from the current template."""
+    generator = PluginGenerator()
+    plugins = {
+        name: {
+            target_file: plugin_file
+            for target_file, plugin_file in generator.generate(get_golden_config(name)).items()
+            if target_file != lock_utils.lock_file_name
+        }
+        for name in golden_variants
+    }
+
+    base_plugin = plugins.pop(base_name)
+    base_files = get_files(base_plugin)
+    write_base(base_files)
+
+    for name, plugin_files in plugins.items():
+        delta = get_delta(base_plugin, base_files, plugin_files)
+        path_delta = path_reference_files / f"{name}.delta.json"
+        path_delta.write_text(format_delta(delta))
+
+    load_golden.cache_clear()
+
+
+def write_base(files):
+    """Write the base reference plugin, and its manifest."""
+    path_base = path_reference_files / base_name
+    for path in sorted(path_base.rglob("*"), reverse=True):
+        if path.is_file() and path.relative_to(path_base).as_posix() not in files:
+            path.unlink()
+        elif path.is_dir() and not any(path.iterdir()):
+            path.rmdir()
+
+    for target_file, (contents, mode) in files.items():
+        path = path_base / target_file
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_bytes(contents)
+        path.chmod(mode)
+
+    lines = get_manifest_lines(files)
+    (path_reference_files / f"{base_name}.manifest").write_text("".join(f"{line}\n" for line in lines))
+
+
+def get_delta(base_plugin, base_files, plugin_files):
+    """Encode a variant as the lines that differ from the base.
+
+    Each file is paired with the base file generated from the same template file, or
+    else with the base file at the same path.
+    """
+    base_paths = {
+        plugin_file.template_path: target_file
+        for target_file, plugin_file in base_plugin.items()
+        if plugin_file.template_path
+    }
+
+    delta = {"files": {}, "removed": sorted(set(base_files) - set(plugin_files))}
+    for target_file, (contents, mode) in sorted(get_files(plugin_files).items()):
+        base_path = base_paths.get(plugin_files[target_file].template_path, target_file)
+        if base_path not in base_files:
+            base_path = None
+
+        base_contents, base_mode = base_files.get(base_path, (b"", 0o644))
+        if base_path == target_file and (base_contents, base_mode) == (contents, mode):
+            continue
+
+        file_delta = {}
+        if base_path != target_file:
+            file_delta["base"] = base_path
+        if mode != base_mode:
+            file_delta["mode"] = f"{mode:o}"
+
+        base_lines = split_lines(base_contents)
+        lines = split_lines(contents)
+        matcher = difflib.SequenceMatcher(None, base_lines, lines, autojunk=False)
+        file_delta["ops"] = [
+            [i1, i2, "".join(lines[j1:j2])]
+            for tag, i1, i2, j1, j2 in matcher.get_opcodes()
+            if tag != "equal"
+        ]
+        delta["files"][target_file] = file_delta
+
+    return delta
+
+
+def format_delta(delta):
+    """Format a delta as JSON, with one line for each op so changes are easy to review."""
+    lines = ["{", '  "files": {']
+    for num, (target_file, file_delta) in enumerate(delta["files"].items()):
+        lines.append(f"    {json.dumps(target_file)}: {{")
+        for key in ("base", "mode"):
+            if key in file_delta:
+                lines.append(f"      {json.dumps(key)}: {json.dumps(file_delta[key])},")
+        lines.append('      "ops": [')
+        lines.append(",\n".join(f"        {json.dumps(op)}" for op in file_delta["ops"]))
+        lines.append("      ]")
+        lines.append("    }," if num < len(delta["files"]) - 1 else "    }")
+    lines.append("  },")
+    lines.append(f'  "removed": {json.dumps(delta["removed"])}')
+    lines.append("}")
+    return "".join(f"{line}\n" for line in lines)
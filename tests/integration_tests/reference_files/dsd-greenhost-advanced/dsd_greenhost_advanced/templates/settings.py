@@ -1,3 +0,0 @@
-{{current_settings}}
-
-# Great Green Host settings.
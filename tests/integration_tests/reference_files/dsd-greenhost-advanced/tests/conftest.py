@@ -1,3 +0,0 @@
-"""tests/conftest.py for dsd_greenhost_advanced."""
-
-collect_ignore = ["e2e_tests"]
\ No newline at end of file
@@ -1 +0,0 @@
-# This file is needed to support importing helper functions from utils/.
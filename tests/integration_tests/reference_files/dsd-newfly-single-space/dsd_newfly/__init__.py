@@ -1,2 +0,0 @@
-from .deploy import dsd_get_plugin_config
-from .deploy import dsd_deploy
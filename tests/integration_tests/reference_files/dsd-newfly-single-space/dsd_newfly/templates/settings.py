@@ -1,3 +0,0 @@
-{{current_settings}}
-
-# New Fly settings.
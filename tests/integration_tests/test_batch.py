@@ -0,0 +1,154 @@
+"""Test generating many plugins from a spec file."""
+
+from argparse import Namespace
+import json
+
+import pytest
+
+from utils import batch
+
+
+def test_batch_jsonl(tmp_path, assert_matches_golden):
+    """Generate several plugins in parallel, and check one against a reference plugin."""
+    specs = [
+        {"platform_name": "NewFly", "pkg_name": "dsd-newfly", "support_automate_all": True, "license_name": "eric"},
+        {"platform_name": "Great Green Host", "pkg_name": "dsd-greenhost-advanced", "support_automate_all": True, "license_name": "eric"},
+        {"platform_name": "CodeRed", "pkg_name": "dsd-codered", "support_automate_all": False, "license_name": "eric"},
+    ]
+    path_specs = tmp_path / "specs.jsonl"
+    path_specs.write_text("\n".join(json.dumps(spec) for spec in specs))
+
+    plugin_configs = batch.load_specs(path_specs, tmp_path)
+    batch.validate_specs(plugin_configs)
+    results = batch.generate_batch(plugin_configs, max_workers=2, build_options={"record_timings": True})
+
+    assert results["num_plugins"] == 3
+    assert not results["failures"]
+    assert results["bytes_written"] > 0
+    assert results["timings"].stages["validate_target"]["seconds"] > 0
+
+    assert_matches_golden(tmp_path / "dsd-greenhost-advanced", "dsd-greenhost-advanced")
+
+def test_batch_toml_rejects_invalid_specs(tmp_path):
+    """Every spec is validated before any plugin is written."""
+    path_specs = tmp_path / "specs.toml"
+    path_specs.write_text(
+        '[[plugin]]\nplatform_name = "NewFly"\npkg_name = "dsd-newfly"\n\n'
+        '[[plugin]]\nplatform_name = "NewFly"\npkg_name = "newfly"\n\n'
+        '[[plugin]]\nplatform_name = "NewFly"\npkg_name = "dsd-newfly"\nvm_size = "large"\n\n'
+        '[[plugin]]\nplatform_name = "NewFly"\npkg_name = 5\nsupport_automate_all = "false"\n'
+    )
+
+    plugin_configs = batch.load_specs(path_specs, tmp_path)
+    with pytest.raises(SystemExit) as e:
+        batch.validate_specs(plugin_configs)
+
+    assert "Spec 2 (newfly): The package name must start with `dsd-`." in str(e.value)
+    assert "Spec 3: Unknown keys: vm_size" in str(e.value)
+    assert "Spec 4: Wrong types: pkg_name must be a string, support_automate_all must be true or false" in str(e.value)
+    assert not (tmp_path / "dsd-newfly").exists()
+
+def test_batch_plan(tmp_path, capsys):
+    """Planning a batch reports every problem and collision, and writes nothing."""
+    specs = [
+        {"platform_name": "NewFly", "pkg_name": "dsd-newfly", "license_name": "eric"},
+        {"platform_name": "CodeRed", "pkg_name": "dsd-codered", "license_name": "eric"},
+        {"platform_name": "Other Fly", "pkg_name": "dsd-newfly", "license_name": "eric"},
+        {"platform_name": "NewFly", "pkg_name": "newfly"},
+        {"platform_name": "NewFly", "pkg_name": "dsd-newfly", "vm_size": "small"},
+        {"platform_name": "Blue", "pkg_name": "dsd-blue", "target_dir": str(tmp_path / "missing")},
+    ]
+    path_specs = tmp_path / "specs.jsonl"
+    path_specs.write_text("\n".join(json.dumps(spec) for spec in specs))
+    (tmp_path / "dsd-codered").mkdir()
+
+    plugin_configs = batch.load_specs(path_specs, tmp_path)
+    args = Namespace(target_dir=tmp_path, plan=True, output_level="json")
+    with pytest.raises(SystemExit) as e:
+        batch.plan_batch(plugin_configs, args)
+
+    assert "Spec 4 (newfly): The package name must start with `dsd-`." in str(e.value)
+    assert "Spec 5: Unknown keys: vm_size" in str(e.value)
+    assert f"Spec 6 (dsd-blue): The path {(tmp_path / 'missing').as_posix()} does not exist." in str(e.value)
+    assert "2 planned paths collide" in str(e.value)
+    assert sorted(path.name for path in tmp_path.iterdir()) == ["dsd-codered", "specs.jsonl"]
+
+    events = [json.loads(line) for line in capsys.readouterr().out.splitlines()]
+    plans = [event for event in events if event["event"] == "plan"]
+    assert [plan["plugin"] for plan in plans] == ["dsd-newfly", "dsd-codered", "dsd-newfly"]
+    assert [len(plan["collisions"]) for plan in plans] == [0, 1, 1]
+    assert events[-1]["event"] == "plan_summary"
+    assert events[-1]["num_planned"] == 3
+
+def test_batch_plan_requires_target_dir(tmp_path):
+    """A spec without a target_dir is rejected by a plan, just as it is by a real run."""
+    path_specs = tmp_path / "specs.jsonl"
+    path_specs.write_text(json.dumps({"platform_name": "NewFly", "pkg_name": "dsd-newfly"}))
+
+    plugin_configs = batch.load_specs(path_specs)
+    args = Namespace(target_dir=None, plan=True)
+    with pytest.raises(SystemExit) as e:
+        batch.plan_batch(plugin_configs, args)
+
+    assert "Spec 1 (dsd-newfly): A target_dir is required" in str(e.value)
+
+def test_stream_resumes_from_journal(tmp_path):
+    """A rerun skips completed plugins, and records plugins written just before an interruption."""
+    specs = [
+        {"platform_name": "NewFly", "pkg_name": "dsd-newfly", "support_automate_all": True, "license_name": "eric"},
+        {"platform_name": "CodeRed", "pkg_name": "dsd-codered", "support_automate_all": True, "license_name": "eric"},
+    ]
+    path_specs = tmp_path / "specs.jsonl"
+    path_specs.write_text("\n".join(json.dumps(spec) for spec in specs))
+    path_journal = tmp_path / "journal.jsonl"
+    args = Namespace(stream=path_specs.as_posix(), journal=path_journal, target_dir=tmp_path, fsync=False)
+
+    # Simulate a run that was interrupted after dsd-codered was written, but before it
+    # was recorded as completed.
+    batch.run_stream(args)
+    lines = path_journal.read_text().splitlines()
+    path_journal.write_text("\n".join(lines[:3]) + "\n")
+    readme = (tmp_path / "dsd-codered" / "README.md").read_text()
+
+    batch.run_stream(args)
+
+    completed_keys, started_keys = batch.read_journal(path_journal)
+    assert len(completed_keys) == 2
+    assert (tmp_path / "dsd-codered" / "README.md").read_text() == readme
+
+    # Completed entries are skipped by checking the journal, not the target directory.
+    (tmp_path / "dsd-newfly" / "README.md").write_text("edited")
+    batch.run_stream(args)
+    assert (tmp_path / "dsd-newfly" / "README.md").read_text() == "edited"
+
+def test_stream_keeps_existing_directories(tmp_path):
+    """A directory that was already there is reported on every run, and never removed."""
+    spec = {"platform_name": "NewFly", "pkg_name": "dsd-newfly", "license_name": "eric"}
+    path_specs = tmp_path / "specs.jsonl"
+    path_specs.write_text(json.dumps(spec) + "\n")
+    path_user_file = tmp_path / "out" / "dsd-newfly" / "notes.txt"
+    path_user_file.parent.mkdir(parents=True)
+    path_user_file.write_text("mine")
+    args = Namespace(stream=path_specs.as_posix(), journal=None, target_dir=tmp_path / "out", fsync=False)
+
+    for _ in range(2):
+        with pytest.raises(SystemExit) as e:
+            batch.run_stream(args)
+        assert "dsd-newfly" in str(e.value)
+
+    assert path_user_file.read_text() == "mine"
+    assert batch.read_journal(tmp_path / "specs.jsonl.journal") == (set(), set())
+
+def test_stream_requires_target_dir(tmp_path, monkeypatch):
+    """A streamed spec without a target_dir fails, instead of prompting for one."""
+    spec = {"platform_name": "NewFly", "pkg_name": "dsd-newfly", "license_name": "eric"}
+    path_specs = tmp_path / "specs.jsonl"
+    path_specs.write_text(json.dumps(spec) + "\n")
+    monkeypatch.setattr("builtins.input", lambda msg="": pytest.fail("Prompted for input."))
+    args = Namespace(stream=path_specs.as_posix(), journal=None, target_dir=None, fsync=False)
+
+    with pytest.raises(SystemExit) as e:
+        batch.run_stream(args)
+
+    assert "dsd-newfly: A target_dir is required" in str(e.value)
+    assert batch.read_journal(tmp_path / "specs.jsonl.journal") == (set(), set())
@@ -3,15 +3,17 @@
 import argparse
 from argparse import Namespace
 from pathlib import Path
-from filecmp import dircmp
+import json
 
 import pytest
 
 from utils.plugin_config import PluginConfig
+from utils import generator_utils
+from utils import template_utils
 import generate_plugin as gp
 
 
-def test_no_spaces_anywhere(tmp_path_factory):
+def test_no_spaces_anywhere(tmp_path_factory, assert_matches_golden):
     tmp_path = tmp_path_factory.mktemp("sample_plugin_no_space")
     print(f"\nWriting plugin to: {tmp_path.as_posix()}")
 
@@ -25,14 +27,11 @@ def test_no_spaces_anywhere(tmp_path_factory):
     args = Namespace(target_dir=tmp_path)
     gp.generate_plugin(plugin_config, args)
 
-    path_ref_dir = Path(__file__).parent / "reference_files" / "dsd-newfly-no-space"
     path_test_plugin = tmp_path / "dsd-newfly"
     assert path_test_plugin.exists()
+    assert_matches_golden(path_test_plugin, "dsd-newfly-no-space")
 
-    dc = dircmp(path_test_plugin, path_ref_dir, ignore=[".DS_Store", "__pycache__"])
-    assert_dirs_match(dc)
-
-def test_single_space_platform_name(tmp_path_factory):
+def test_single_space_platform_name(tmp_path_factory, assert_matches_golden):
     tmp_path = tmp_path_factory.mktemp("sample_plugin_one_space")
     print(f"\nWriting plugin to: {tmp_path.as_posix()}")
 
@@ -46,13 +45,10 @@ def test_single_space_platform_name(tmp_path_factory):
     args = Namespace(target_dir=tmp_path)
     gp.generate_plugin(plugin_config, args)
 
-    path_ref_dir = Path(__file__).parent / "reference_files" / "dsd-newfly-single-space"
     path_test_plugin = tmp_path / "dsd-newfly"
+    assert_matches_golden(path_test_plugin, "dsd-newfly-single-space")
 
-    dc = dircmp(path_test_plugin, path_ref_dir, ignore=[".DS_Store", "__pycache__"])
-    assert_dirs_match(dc)
-
-def test_three_part_platform_name(tmp_path_factory):
+def test_three_part_platform_name(tmp_path_factory, assert_matches_golden):
     tmp_path = tmp_path_factory.mktemp("sample_plugin_three_part")
     print(f"\nWriting plugin to: {tmp_path.as_posix()}")
 
@@ -66,11 +62,276 @@ def test_three_part_platform_name(tmp_path_factory):
     args = Namespace(target_dir=tmp_path)
     gp.generate_plugin(plugin_config, args)
 
-    path_ref_dir = Path(__file__).parent / "reference_files" / "dsd-greenhost-advanced"
     path_test_plugin = tmp_path / "dsd-greenhost-advanced"
+    assert_matches_golden(path_test_plugin, "dsd-greenhost-advanced")
+
+def test_in_memory_plugin_tree(assert_matches_golden):
+    """Generate a plugin without writing anything, and compare it to a reference plugin."""
+    plugin_config = PluginConfig(
+        platform_name = "Great Green Host",
+        pkg_name = "dsd-greenhost-advanced",
+        support_automate_all = True,
+        license_name = "eric",
+    )
+    plugin_files = generator_utils.generate_plugin_tree(plugin_config)
+    assert_matches_golden(plugin_files, "dsd-greenhost-advanced")
+
+def test_golden_mismatch_shows_diff(assert_matches_golden):
+    """A plugin that doesn't match its reference plugin fails with a readable diff."""
+    plugin_config = PluginConfig(
+        platform_name = "Great Green Host",
+        pkg_name = "dsd-greenhost-advanced",
+        support_automate_all = True,
+        license_name = "eric",
+    )
+    plugin_files = generator_utils.generate_plugin_tree(plugin_config)
+    plugin_files["README.md"].contents += b"An extra line.\n"
+    plugin_files["setup.cfg"] = plugin_files.pop("pyproject.toml")
 
-    dc = dircmp(path_test_plugin, path_ref_dir, ignore=[".DS_Store", "__pycache__"])
-    assert_dirs_match(dc)
+    with pytest.raises(pytest.fail.Exception) as exc_info:
+        assert_matches_golden(plugin_files, "dsd-greenhost-advanced")
+
+    msg = str(exc_info.value)
+    assert "--- dsd-greenhost-advanced.manifest" in msg
+    assert "\n+" in msg and " setup.cfg\n" in msg
+    assert "--- dsd-greenhost-advanced/README.md" in msg
+    assert "+An extra line." in msg
+
+def test_golden_lock_mismatch(assert_matches_golden):
+    """A lock file that doesn't match the reference plugin's files fails on its own."""
+    plugin_config = PluginConfig(
+        platform_name = "Great Green Host",
+        pkg_name = "dsd-greenhost-advanced",
+        support_automate_all = True,
+        license_name = "eric",
+    )
+    plugin_files = generator_utils.generate_plugin_tree(plugin_config)
+    lock_file = plugin_files[".dsd-generator.lock"]
+    lock = json.loads(lock_file.contents)
+    lock["files"]["README.md"]["sha256"] = "0" * 64
+    lock_file.contents = (json.dumps(lock, indent=2, sort_keys=True) + "\n").encode()
+
+    with pytest.raises(pytest.fail.Exception) as exc_info:
+        assert_matches_golden(plugin_files, "dsd-greenhost-advanced")
+
+    msg = str(exc_info.value)
+    assert "--- dsd-greenhost-advanced/.dsd-generator.lock" in msg
+    assert f'+      "sha256": "{"0" * 64}"' in msg
+
+@pytest.mark.parametrize("archive_name", ["dsd-newfly.zip", "dsd-newfly.tar.gz"])
+def test_output_archive(tmp_path, archive_name, assert_matches_golden):
+    """Archives match the reference plugin, and are byte-for-byte reproducible."""
+    plugin_config = PluginConfig(
+        platform_name = "NewFly",
+        pkg_name = "dsd-newfly",
+        support_automate_all = True,
+        license_name = "eric",
+    )
+
+    path_archives = []
+    for run_dir in ("run_1", "run_2"):
+        path_archive = tmp_path / run_dir / archive_name
+        path_archive.parent.mkdir()
+        args = Namespace(target_dir=None, output_archive=path_archive)
+        gp.generate_plugin(plugin_config, args)
+        path_archives.append(path_archive)
+
+    assert path_archives[0].read_bytes() == path_archives[1].read_bytes()
+    assert_matches_golden(path_archives[0], "dsd-newfly-no-space")
+
+@pytest.mark.parametrize("link_mode", ["hardlink", "reflink", "auto"])
+def test_link_modes(tmp_path, link_mode, assert_matches_golden):
+    """Verbatim files written with any link mode match the reference plugin."""
+    plugin_config = PluginConfig(
+        platform_name = "NewFly",
+        pkg_name = "dsd-newfly",
+        support_automate_all = True,
+        license_name = "eric",
+    )
+
+    args = Namespace(target_dir=tmp_path, link_mode=link_mode)
+    gp.generate_plugin(plugin_config, args)
+
+    path_test_plugin = tmp_path / "dsd-newfly"
+    assert_matches_golden(path_test_plugin, "dsd-newfly-no-space")
+
+    # Hardlinks are only used when the template and new plugin share a filesystem.
+    path_gitignore = path_test_plugin / ".gitignore"
+    path_template = Path(gp.__file__).parent / "plugin_template"
+    if link_mode == "hardlink" and path_template.stat().st_dev == tmp_path.stat().st_dev:
+        assert path_gitignore.samefile(path_template / ".gitignore")
+
+def test_output_cache(tmp_path, monkeypatch, capsys, assert_matches_golden):
+    """A plugin read from the output cache matches the reference plugin."""
+    monkeypatch.setenv("DSD_GENERATOR_CACHE_DIR", str(tmp_path / "cache"))
+    plugin_config = PluginConfig(
+        platform_name = "NewFly",
+        pkg_name = "dsd-newfly",
+        support_automate_all = True,
+        license_name = "eric",
+    )
+
+    for run_dir, no_cache, cache_used in [("run_1", False, False), ("run_2", False, True), ("run_3", True, False)]:
+        path_target = tmp_path / run_dir
+        path_target.mkdir()
+        args = Namespace(target_dir=path_target, no_cache=no_cache)
+        gp.generate_plugin(plugin_config, args)
+
+        assert ("Using cached plugin" in capsys.readouterr().out) == cache_used
+        assert_matches_golden(path_target / "dsd-newfly", "dsd-newfly-no-space")
+
+def test_streamed_template_files(tmp_path, monkeypatch, assert_matches_golden):
+    """Plugins with files streamed from large templates match the reference plugin."""
+    monkeypatch.setenv("DSD_GENERATOR_CACHE_DIR", str(tmp_path / "cache"))
+    monkeypatch.setattr(template_utils, "STREAM_MIN_BYTES", 1024)
+    monkeypatch.setattr(template_utils, "CHUNK_SIZE", 100)
+    plugin_config = PluginConfig(
+        platform_name = "NewFly",
+        pkg_name = "dsd-newfly",
+        support_automate_all = True,
+        license_name = "eric",
+    )
+
+    compiled_template = template_utils.load_compiled_template(generator_utils.path_template)
+    kinds = {compiled_file[0] for compiled_file in compiled_template.values()}
+    assert template_utils.STREAMED in kinds
+
+    args = Namespace(target_dir=tmp_path)
+    gp.generate_plugin(plugin_config, args)
+    assert_matches_golden(tmp_path / "dsd-newfly", "dsd-newfly-no-space")
+
+    for archive_name in ("dsd-newfly.zip", "dsd-newfly.tar.gz"):
+        path_archive = tmp_path / archive_name
+        args = Namespace(target_dir=None, output_archive=path_archive)
+        gp.generate_plugin(plugin_config, args)
+        assert_matches_golden(path_archive, "dsd-newfly-no-space")
+
+def test_template_layers(tmp_path, monkeypatch, capsys):
+    """Files in a template layer are added to the plugin, or override the base template."""
+    monkeypatch.setenv("DSD_GENERATOR_CACHE_DIR", str(tmp_path / "cache"))
+    path_overlay = tmp_path / "overlay"
+    (path_overlay / ".github" / "workflows").mkdir(parents=True)
+    (path_overlay / ".github" / "workflows" / "ci.yml").write_text("name: {{PackageName}} CI\n")
+    (path_overlay / "plugin_pkg_name").mkdir()
+    (path_overlay / "plugin_pkg_name" / "platform_deployer.py").write_text("# Deploys to {{PlatformName}}.\n")
+    plugin_config = PluginConfig(
+        platform_name = "NewFly",
+        pkg_name = "dsd-newfly",
+        support_automate_all = True,
+        license_name = "eric",
+    )
+    readme = generator_utils.generate_plugin_tree(plugin_config)["README.md"].contents
+
+    for run_dir, cache_used in [("run_1", False), ("run_2", True)]:
+        path_target = tmp_path / run_dir
+        path_target.mkdir()
+        args = Namespace(target_dir=path_target, template_dir=[str(path_overlay)])
+        gp.generate_plugin(plugin_config, args)
+        assert ("Using cached plugin" in capsys.readouterr().out) == cache_used
+
+        path_plugin = path_target / "dsd-newfly"
+        assert (path_plugin / ".github/workflows/ci.yml").read_text() == "name: dsd-newfly CI\n"
+        assert (path_plugin / "dsd_newfly/platform_deployer.py").read_text() == "# Deploys to NewFly.\n"
+        assert (path_plugin / "README.md").read_bytes() == readme
+
+def test_plan(tmp_path, tmp_path_factory, monkeypatch, capsys):
+    """A plan lists every file in the plugin, and collisions, without writing anything."""
+    plugin_config = PluginConfig(
+        platform_name = "NewFly",
+        pkg_name = "dsd-newfly",
+        support_automate_all = True,
+        license_name = "eric",
+    )
+    plugin_files = generator_utils.generate_plugin_tree(plugin_config)
+    ref_files = {target_file: plugin_file.size for target_file, plugin_file in plugin_files.items()}
+
+    # Not even the template cache or the output cache is written.
+    path_cache = tmp_path_factory.mktemp("plan") / "cache"
+    monkeypatch.setenv("DSD_GENERATOR_CACHE_DIR", str(path_cache))
+
+    args = Namespace(target_dir=tmp_path, plan=True, output_level="json")
+    gp.generate_plugin(plugin_config, args)
+    assert not list(tmp_path.iterdir())
+    assert not path_cache.exists()
+
+    plan = json.loads(capsys.readouterr().out)
+    assert plan["event"] == "plan"
+    assert {planned["path"]: planned["bytes"] for planned in plan["files"]} == ref_files
+    assert plan["bytes"] == sum(ref_files.values())
+    assert "dsd_newfly/templates" in plan["dirs"]
+    assert not plan["collisions"]
+
+    path_plugin = tmp_path / "dsd-newfly"
+    path_plugin.mkdir()
+    (path_plugin / "README.md").write_text("# Existing plugin\n")
+    with pytest.raises(SystemExit, match="The plan collides with 2 existing paths."):
+        gp.generate_plugin(plugin_config, args)
+
+    plan = json.loads(capsys.readouterr().out)
+    assert plan["collisions"] == [path_plugin.as_posix(), (path_plugin / "README.md").as_posix()]
+    assert [path.name for path in path_plugin.iterdir()] == ["README.md"]
+
+def test_timings_json(tmp_path):
+    """Timings account for every file in the new plugin."""
+    plugin_config = PluginConfig(
+        platform_name = "NewFly",
+        pkg_name = "dsd-newfly",
+        support_automate_all = True,
+        license_name = "eric",
+    )
+    path_json = tmp_path / "timings.json"
+    args = Namespace(target_dir=tmp_path, no_cache=True, timings_json=path_json)
+    gp.generate_plugin(plugin_config, args)
+
+    timings = json.loads(path_json.read_text())
+    path_plugin = tmp_path / "dsd-newfly"
+    plugin_paths = [path for path in path_plugin.rglob("*") if path.is_file()]
+    write_stages = [stage for name, stage in timings["stages"].items() if name.startswith("write_")]
+    assert sum(stage["files"] for stage in write_stages) == len(plugin_paths)
+    assert sum(stage["bytes"] for stage in write_stages) == sum(p.stat().st_size for p in plugin_paths)
+    assert timings["stages"]["validate_target"]["seconds"] > 0
+    assert len(timings["slowest_files"]) == 10
+
+@pytest.mark.parametrize("output_level", ["quiet", "json"])
+def test_output_levels(tmp_path, capsys, output_level):
+    plugin_config = PluginConfig(
+        platform_name = "NewFly",
+        pkg_name = "dsd-newfly",
+        support_automate_all = True,
+        license_name = "eric",
+    )
+    args = Namespace(target_dir=tmp_path, no_cache=True, output_level=output_level)
+    gp.generate_plugin(plugin_config, args)
+    output = capsys.readouterr().out
+
+    if output_level == "quiet":
+        assert output == ""
+        return
+
+    records = [json.loads(line) for line in output.splitlines()]
+    paths = {record["path"] for record in records if record["event"] in ("copy_file", "render_file")}
+    assert "dsd_newfly/deploy_messages.py" in paths
+    assert records[-1]["event"] == "finished"
+
+def test_no_automate_all_support():
+    """Automate-all messages are left out of plugins that don't support --automate-all."""
+    plugin_config = PluginConfig(
+        platform_name = "NewFly",
+        pkg_name = "dsd-newfly",
+        support_automate_all = False,
+        license_name = "eric",
+    )
+    plugin_files = generator_utils.generate_plugin_tree(plugin_config)
+
+    deploy_messages = plugin_files["dsd_newfly/deploy_messages.py"].contents.decode()
+    assert "automate_all" not in deploy_messages
+    assert "{%" not in deploy_messages
+    assert "platform_msgs.confirm_automate_all" not in plugin_files["dsd_newfly/plugin_config.py"].contents.decode()
+    assert "self.automate_all_supported = False" in plugin_files["dsd_newfly/plugin_config.py"].contents.decode()
+
+    for target_file, plugin_file in plugin_files.items():
+        if target_file.endswith(".py"):
+            compile(plugin_file.contents, target_file, "exec")
 
 def test_reject_not_start_dsd_dash(tmp_path_factory):
     """Test that a package name not starting with dsd- is rejected."""
@@ -90,15 +351,3 @@ def test_reject_not_start_dsd_dash(tmp_path_factory):
         gp.generate_plugin(plugin_config, args)
 
 
-
-# --- Helper functions ---
-
-def assert_dirs_match(dc):
-    """Check there are no differences in the dircmp object, and recurse all subdirs."""
-    assert not dc.diff_files
-    assert not dc.left_only
-    assert not dc.right_only
-    assert not dc.funny_files
-
-    for dirname, dc in dc.subdirs.items():
-        assert_dirs_match(dc)
\ No newline at end of file
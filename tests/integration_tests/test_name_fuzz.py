@@ -0,0 +1,134 @@
+"""Generate many plugins in memory from random platform and package names.
+
+Each generated plugin must be importable as written: every .py file compiles, no
+generator token survives rendering, every package path is a valid identifier, and
+imports of the plugin's own package point at its main directory.
+
+The number of names defaults to a quick run. For a longer run:
+$ pytest tests/integration_tests/test_name_fuzz.py --fuzz-count 5000
+"""
+
+import hashlib
+import keyword
+import random
+import re
+
+import pytest
+
+from utils import template_utils
+from utils.plugin_config import PluginConfig
+from utils.plugin_generator import PluginGenerator
+
+
+# Characters for random names. Letters include non-ASCII letters, and letters whose
+# lowercase forms change length or gain combining marks.
+ascii_chars = "abcdefghijklmnopqrstuvwxyzABCDEFGHIJKLMNOPQRSTUVWXYZ0123456789"
+unicode_letters = "éüßΩЖ漢İıÅ"
+name_separators = [" ", ".", "-", "_", "  ", " - "]
+pkg_separators = ["-", "_", ".", "--"]
+
+# Imports of the plugin's own package, such as `from dsd_newfly.platform_deployer import ...`.
+re_own_import = re.compile(rb"^(?:from|import) (dsd_\w+)", re.MULTILINE)
+
+# Names that must be rejected, because they'd break the generated code.
+invalid_platform_names = ["", " ", "Fly\"Host", "Fly'Host", "Fly\\Host", "{{PlatformName}}", "Fly{Host}", "Fly\nHost", "Fly²", "Fly!"]
+invalid_pkg_names = ["dsd-", "dsd-fly-", "dsd-fly.", "dsd-café", "dsd-fly!", "dsd-{{PluginName}}", "dsd-fly host"]
+
+
+def test_random_names(request):
+    """Every plugin generated from a valid random name compiles and imports its own package."""
+    num_names = request.config.getoption("--fuzz-count")
+    rng = random.Random(num_names)
+    generator = PluginGenerator()
+
+    # Verbatim files are the same in every plugin, so each distinct file is compiled once.
+    parsed_hashes = set()
+    for _ in range(num_names):
+        plugin_config = PluginConfig(
+            platform_name=get_random_platform_name(rng),
+            pkg_name=get_random_pkg_name(rng),
+            support_automate_all=rng.choice([True, False]),
+            license_name="eric",
+        )
+        plugin_files = generator.generate(plugin_config)
+        check_plugin(plugin_files, plugin_config, parsed_hashes)
+
+@pytest.mark.parametrize("platform_name", invalid_platform_names)
+def test_invalid_platform_names(platform_name):
+    plugin_config = PluginConfig(platform_name=platform_name, pkg_name="dsd-newfly")
+    with pytest.raises(AssertionError, match="platform name"):
+        plugin_config.validate()
+
+@pytest.mark.parametrize("pkg_name", invalid_pkg_names)
+def test_invalid_pkg_names(pkg_name):
+    plugin_config = PluginConfig(platform_name="NewFly", pkg_name=pkg_name)
+    with pytest.raises(AssertionError, match="package name"):
+        plugin_config.validate()
+
+def test_mixed_case_pkg_name():
+    """The plugin imports its own package by the lowercase name of its main directory."""
+    plugin_config = PluginConfig(platform_name="NewFly", pkg_name="dsd-New.Fly", license_name="eric")
+    plugin_files = PluginGenerator().generate(plugin_config)
+
+    assert "dsd_new_fly/deploy.py" in plugin_files
+    assert b"from dsd_new_fly.platform_deployer import" in plugin_files["dsd_new_fly/deploy.py"].contents
+    check_plugin(plugin_files, plugin_config, set())
+
+
+# --- Helper functions ---
+
+def get_random_word(rng):
+    """Get a keyword, a word with a leading number, or a random run of letters."""
+    kind = rng.randrange(4)
+    if kind == 0:
+        return rng.choice(keyword.kwlist)
+    if kind == 1:
+        return str(rng.randrange(100)) + rng.choice(ascii_chars[:52])
+    return "".join(rng.choice(ascii_chars + unicode_letters) for _ in range(rng.randint(1, 8)))
+
+def get_random_platform_name(rng):
+    words = [get_random_word(rng) for _ in range(rng.randint(1, 3))]
+    name = words[0]
+    for word in words[1:]:
+        name += rng.choice(name_separators) + word
+    return name
+
+def get_random_pkg_name(rng):
+    words = ["".join(rng.choice(ascii_chars) for _ in range(rng.randint(1, 8))) for _ in range(rng.randint(1, 3))]
+    name = "dsd-" + words[0]
+    for word in words[1:]:
+        name += rng.choice(pkg_separators) + word
+    return name
+
+def check_plugin(plugin_files, plugin_config, parsed_hashes):
+    """Check that a generated plugin can be imported as written."""
+    label = f"{plugin_config.platform_name!r}, {plugin_config.pkg_name!r}"
+    plugin_config.validate()
+    top_level_dirs = {target_file.split("/")[0] for target_file in plugin_files if "/" in target_file}
+
+    for target_file, plugin_file in plugin_files.items():
+        contents = b"".join(plugin_file.chunks())
+        if b"{{" in contents or b"{%" in contents:
+            token = template_utils.re_render_token.search(contents.decode())
+            assert not token, f"{label}: {token[0]} left in {target_file}"
+
+        if not target_file.endswith(".py"):
+            continue
+        parts = target_file.removesuffix(".py").split("/")
+        assert all(part.isidentifier() and not keyword.iskeyword(part) for part in parts), (
+            f"{label}: {target_file} can't be imported"
+        )
+
+        file_hash = hashlib.sha256(contents).digest()
+        if file_hash in parsed_hashes:
+            continue
+        try:
+            compile(contents, target_file, "exec", dont_inherit=True)
+        except SyntaxError as e:
+            pytest.fail(f"{label}: {target_file} doesn't compile: {e}")
+        parsed_hashes.add(file_hash)
+
+        for pkg_name in re_own_import.findall(contents):
+            assert pkg_name.decode() in top_level_dirs, (
+                f"{label}: {target_file} imports missing package {pkg_name.decode()}"
+            )
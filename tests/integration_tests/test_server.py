@@ -0,0 +1,89 @@
+"""Test generating plugins from a long-lived process, and over HTTP."""
+
+import io
+import json
+import threading
+import urllib.error
+import urllib.request
+import zipfile
+
+import pytest
+
+from utils import generator_utils
+from utils import server
+from utils.plugin_config import PluginConfig
+from utils.plugin_generator import PluginGenerator
+
+
+spec = {
+    "platform_name": "Great Green Host",
+    "pkg_name": "dsd-greenhost-advanced",
+    "support_automate_all": True,
+    "license_name": "eric",
+}
+
+
+@pytest.fixture(scope="module")
+def url():
+    """Run a server on a free port for the tests in this module."""
+    generator_server = server.make_server(port=0, max_workers=4)
+    thread = threading.Thread(target=generator_server.serve_forever, args=(0.01,), daemon=True)
+    thread.start()
+
+    host, port = generator_server.server_address[:2]
+    yield f"http://{host}:{port}/generate"
+
+    generator_server.shutdown()
+    generator_server.server_close()
+
+def test_plugin_generator(assert_matches_golden):
+    """A long-lived generator matches the reference plugin, every time."""
+    generator = PluginGenerator()
+    for _ in range(2):
+        plugin_files = generator.generate(PluginConfig(**spec))
+        assert_matches_golden(plugin_files, "dsd-greenhost-advanced")
+
+def test_generate_over_http(url):
+    request = urllib.request.Request(url, data=json.dumps(spec).encode())
+    with urllib.request.urlopen(request) as response:
+        assert response.headers["Content-Type"] == "application/zip"
+        contents = response.read()
+
+    with zipfile.ZipFile(io.BytesIO(contents)) as zf:
+        archive_files = {
+            name.removeprefix("dsd-greenhost-advanced/"): zf.read(name) for name in zf.namelist()
+        }
+    plugin_files = generator_utils.generate_plugin_tree(PluginConfig(**spec))
+    assert archive_files == {name: f.contents for name, f in plugin_files.items()}
+
+@pytest.mark.parametrize(
+    "body, error",
+    [
+        (b"[]", "must be a JSON object"),
+        (b"{not json", "Expecting property name"),
+        (json.dumps({**spec, "target_dir": "/tmp"}).encode(), "Unknown keys: target_dir"),
+        (json.dumps({**spec, "pkg_name": "greenhost"}).encode(), "must start with `dsd-`"),
+        (json.dumps({**spec, "platform_name": 5}).encode(), "Wrong types: platform_name must be a string"),
+        (json.dumps({**spec, "pkg_name": 'dsd-x"\r\nX-Evil: 1'}).encode(), "The package name can only contain"),
+    ],
+)
+def test_bad_requests(url, body, error):
+    request = urllib.request.Request(url, data=body)
+    with pytest.raises(urllib.error.HTTPError) as exc_info:
+        urllib.request.urlopen(request)
+
+    assert exc_info.value.code == 400
+    assert error in json.loads(exc_info.value.read())["error"]
+
+def test_generator_errors(url, monkeypatch):
+    """An unexpected error gets a 500 response, instead of a dropped connection."""
+    def fail(self, plugin_config):
+        raise RuntimeError("template missing")
+
+    monkeypatch.setattr(PluginGenerator, "generate_zip", fail)
+    request = urllib.request.Request(url, data=json.dumps(spec).encode())
+    with pytest.raises(urllib.error.HTTPError) as exc_info:
+        urllib.request.urlopen(request)
+
+    assert exc_info.value.code == 500
+    assert "RuntimeError: template missing" in json.loads(exc_info.value.read())["error"]
@@ -0,0 +1,75 @@
+"""Test compiling and importing generated plugins against a stub django-simple-deploy."""
+
+from argparse import Namespace
+import sys
+
+import pytest
+
+from utils import smoke_check
+from utils.plugin_config import PluginConfig
+from utils.plugin_generator import PluginGenerator
+import generate_plugin as gp
+
+
+@pytest.fixture(scope="module")
+def generator():
+    return PluginGenerator()
+
+
+@pytest.mark.parametrize("support_automate_all", [True, False])
+@pytest.mark.parametrize(
+    "platform_name, pkg_name",
+    [("NewFly", "dsd-newfly"), ("New Fly", "dsd-New.Fly"), ("Great Green Host", "dsd-greenhost-advanced")],
+)
+def test_generated_plugins_pass(generator, platform_name, pkg_name, support_automate_all):
+    plugin_config = PluginConfig(platform_name, pkg_name, support_automate_all, "eric")
+    plugin_files = generator.generate(plugin_config)
+    main_dir_name = pkg_name.lower().replace("-", "_").replace(".", "_")
+    modules_before = set(sys.modules)
+
+    assert smoke_check.check_plugin(plugin_files, plugin_config, main_dir_name) == []
+    assert set(sys.modules) == modules_before
+
+@pytest.mark.parametrize(
+    "target_file, old, new, problem",
+    [
+        ("dsd_newfly/cli.py", "class PluginCLI:", "class PluginCLI", "dsd_newfly/cli.py doesn't compile"),
+        ("dsd_newfly/deploy.py", "PluginCLI, validate_cli", "PluginCLI, validate_options", "dsd_newfly doesn't import: ImportError"),
+        ("dsd_newfly/deploy.py", "def dsd_validate_cli(options):", "def dsd_validate_cli(opts):", "doesn't register with pluggy"),
+        ("dsd_newfly/cli.py", "    pass\n", "    options['vm_size']\n", "A hook in dsd_newfly raised KeyError"),
+        ("dsd_newfly/plugin_config.py", 'self.platform_name = "NewFly"', 'self.platform_name = "Fly"', "platform_name 'Fly'"),
+    ],
+)
+def test_broken_plugins_fail(generator, target_file, old, new, problem):
+    plugin_config = PluginConfig("NewFly", "dsd-newfly", True, "eric")
+    plugin_files = generator.generate(plugin_config)
+    contents = plugin_files[target_file].contents
+    assert old.encode() in contents
+    plugin_files[target_file].contents = contents.replace(old.encode(), new.encode(), 1)
+
+    problems = smoke_check.check_plugin(plugin_files, plugin_config, "dsd_newfly")
+    assert len(problems) == 1
+    assert problem in problems[0]
+
+def test_check_before_writing(tmp_path, capsys):
+    """--check writes a plugin that passes, and writes nothing for a plugin that fails."""
+    plugin_config = PluginConfig("NewFly", "dsd-newfly", True, "eric")
+    path_target = tmp_path / "plugins"
+    path_target.mkdir()
+    args = Namespace(target_dir=path_target, check=True, no_cache=True)
+    gp.generate_plugin(plugin_config, args)
+
+    assert (path_target / "dsd-newfly" / "dsd_newfly" / "deploy.py").exists()
+    assert "Checked plugin: dsd_newfly compiles" in capsys.readouterr().out
+
+    # A template layer that breaks the plugin.
+    path_layer = tmp_path / "layer" / "plugin_pkg_name"
+    path_layer.mkdir(parents=True)
+    (path_layer / "__init__.py").write_text("from .deploy import dsd_missing_hook\n")
+    plugin_config.pkg_name = "dsd-newfly2"
+    args = Namespace(target_dir=path_target, check=True, template_dir=[str(tmp_path / "layer")])
+    with pytest.raises(SystemExit) as exc_info:
+        gp.generate_plugin(plugin_config, args)
+
+    assert "dsd_newfly2 doesn't import: ImportError" in str(exc_info.value)
+    assert not (path_target / "dsd-newfly2").exists()
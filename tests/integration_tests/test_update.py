@@ -0,0 +1,73 @@
+"""Test updating an existing plugin from a newer template."""
+
+import json
+
+import pytest
+
+from utils import generator_utils
+from utils import plugin_tree
+from utils import template_utils
+from utils.plugin_config import PluginConfig
+
+
+def test_update_plugin(tmp_path):
+    """Unedited files are updated, edited files are left alone, and the lock is rewritten."""
+    path_template = generator_utils.path_template
+    compiled_template = template_utils.compile_template_tree(path_template)
+    plugin_config = PluginConfig(
+        platform_name = "NewFly",
+        pkg_name = "dsd-newfly",
+        support_automate_all = True,
+        license_name = "eric",
+    )
+    plugin_files = generator_utils.generate_plugin_tree(plugin_config, compiled_template)
+    path_plugin = tmp_path / "dsd-newfly"
+    plugin_tree.write_tree_to_dir(plugin_files.items(), path_plugin)
+
+    # Nothing has changed yet.
+    results = generator_utils.update_plugin(path_plugin, compiled_template)
+    assert not any(results.values())
+
+    # Edit the plugin, and then change the template.
+    path_readme = path_plugin / "README.md"
+    path_readme.write_text(path_readme.read_text() + "\nLocal notes.\n")
+    (path_plugin / "CHANGELOG.md").unlink()
+
+    new_template = dict(compiled_template)
+    new_template["README.md"] = (
+        "rendered", ["# ", "{{PackageName}}", "\n\nNew readme.\n"], 0o644, str(path_template / "README.md")
+    )
+    new_template["plugin_pkg_name/platform_deployer.py"] = (
+        "rendered", ["# Deploys to ", "{{PlatformName}}", ".\n"], 0o644, "overlay/platform_deployer.py"
+    )
+    new_template["CHANGELOG.md"] = ("verbatim", b"# Changelog\n", 0o644, "overlay/CHANGELOG.md")
+    new_template["plugin_pkg_name/py.typed"] = ("verbatim", b"", 0o644, "overlay/plugin_pkg_name/py.typed")
+    del new_template["MANIFEST.in"]
+
+    results = generator_utils.update_plugin(path_plugin, new_template)
+    assert results == {
+        "updated": ["dsd_newfly/platform_deployer.py"],
+        "added": ["dsd_newfly/py.typed"],
+        "removed": ["MANIFEST.in"],
+        "conflicts": ["README.md"],
+        "skipped": ["CHANGELOG.md"],
+    }
+
+    assert (path_plugin / "dsd_newfly/platform_deployer.py").read_text() == "# Deploys to NewFly.\n"
+    assert (path_plugin / "dsd_newfly/py.typed").exists()
+    assert not (path_plugin / "MANIFEST.in").exists()
+    assert not (path_plugin / "CHANGELOG.md").exists()
+    assert path_readme.read_text().endswith("Local notes.\n")
+    assert (path_plugin / "README.md.dsd-new").read_text() == "# dsd-newfly\n\nNew readme.\n"
+
+    lock = json.loads((path_plugin / ".dsd-generator.lock").read_text())
+    assert "MANIFEST.in" not in lock["files"]
+    assert lock["files"]["dsd_newfly/py.typed"]["template"] == "plugin_pkg_name/py.typed"
+
+    # Running the update again doesn't report the same changes again.
+    results = generator_utils.update_plugin(path_plugin, new_template)
+    assert not any(results.values())
+
+def test_update_without_lock_file(tmp_path):
+    with pytest.raises(SystemExit, match="No .dsd-generator.lock file found"):
+        generator_utils.update_plugin(tmp_path)
@@ -0,0 +1,29 @@
+"""Tests for comparing benchmark results against a baseline."""
+
+import platform
+
+from benchmarks import bench_generator
+
+
+def test_compare_results():
+    baseline = {"benchmarks": {
+        "render": {"median_ms": 1.2, "min_ms": 1.0},
+        "write": {"median_ms": 12.0, "min_ms": 10.0},
+        "removed": {"median_ms": 1.0, "min_ms": 1.0},
+        "phase_write_dir": {"median_ms": 10.0, "min_ms": 10.0},
+    }}
+    results = {"benchmarks": {
+        "render": {"median_ms": 1.5, "min_ms": 1.2},
+        "write": {"median_ms": 20.0, "min_ms": 13.0},
+        "new": {"median_ms": 1.0, "min_ms": 1.0},
+        "phase_write_dir": {"median_ms": 30.0, "min_ms": 30.0},
+    }}
+
+    assert bench_generator.compare_results(results, baseline, 0.25) == {"write": 1.3}
+    assert bench_generator.compare_results(results, baseline, 0.1) == {"render": 1.2, "write": 1.3}
+
+def test_baseline_path():
+    """Each machine and Python version has its own baseline, outside of version control."""
+    path_baseline = bench_generator.get_baseline_path()
+    assert path_baseline.parent == bench_generator.path_baselines
+    assert platform.python_version() in path_baseline.name
@@ -0,0 +1,19 @@
+"""Tests for parsing the generator's CLI."""
+
+import sys
+
+import pytest
+
+from utils import cli
+
+
+@pytest.mark.parametrize(
+    "option_args", [["--update", "."], ["--stream", "specs.jsonl"], ["--serve", "8421"]]
+)
+def test_plan_rejected_with_writing_modes(monkeypatch, option_args):
+    """--plan is rejected by modes that can't plan, instead of being ignored."""
+    monkeypatch.setattr(sys, "argv", ["generate_plugin.py", "--plan", *option_args])
+    with pytest.raises(SystemExit) as e:
+        cli.parse_cli()
+
+    assert f"--plan can't be used with {option_args[0]}." in str(e.value)
@@ -0,0 +1,54 @@
+"""Tests for buffered, leveled output."""
+
+import io
+import json
+
+import pytest
+
+from utils.events import EventLog
+
+
+def add_events(events):
+    events.info("copy_file", "  Copying file: README.md", path="README.md")
+    events.detail("cache_miss", "No cached plugin: abc", key="abc")
+
+@pytest.mark.parametrize(
+    "level, output",
+    [
+        ("quiet", ""),
+        ("normal", "  Copying file: README.md\n"),
+        ("verbose", "  Copying file: README.md\nNo cached plugin: abc\n"),
+    ],
+)
+def test_levels(level, output):
+    events = EventLog(level)
+    add_events(events)
+    assert events.render() == output
+
+def test_json_lines():
+    events = EventLog("json", plugin="dsd-newfly")
+    add_events(events)
+
+    records = [json.loads(line) for line in events.render().splitlines()]
+    assert records == [
+        {"event": "copy_file", "plugin": "dsd-newfly", "path": "README.md"},
+        {"event": "cache_miss", "plugin": "dsd-newfly", "key": "abc"},
+    ]
+
+def test_flush_writes_once():
+    class CountingStream(io.StringIO):
+        num_writes = 0
+
+        def write(self, text):
+            self.num_writes += 1
+            return super().write(text)
+
+    stream = CountingStream()
+    events = EventLog()
+    for _ in range(20):
+        add_events(events)
+    events.flush(stream)
+
+    assert stream.num_writes == 1
+    assert stream.getvalue().count("Copying file") == 20
+    assert not events.events
@@ -1,10 +1,70 @@
 """Tests for generator utility functions."""
 
+import pytest
+
 from utils import generator_utils as gu
+from utils import plugin_tree
+from utils.plugin_config import PluginConfig
 
 def test_get_platform_name_lower():
     name = "NewFly"
     assert gu._get_platform_name_lower(name) == "newfly"
 
     name = "New Fly"
-    assert gu._get_platform_name_lower(name) == "newfly"
\ No newline at end of file
+    assert gu._get_platform_name_lower(name) == "newfly"
+
+def test_get_main_dir_name():
+    assert gu._get_main_dir_name("dsd-newfly") == "dsd_newfly"
+    assert gu._get_main_dir_name("dsd-New.Fly") == "dsd_new_fly"
+    assert gu._get_main_dir_name("dsd-new--fly_host") == "dsd_new_fly_host"
+
+def test_get_manifest():
+    compiled_template = {
+        "README.md": ("rendered", ["# ", "{{PackageName}}", "\n"], 0o644, "plugin_template/README.md"),
+        "plugin_pkg_name/__init__.py": ("verbatim", b"", 0o644, "plugin_template/plugin_pkg_name/__init__.py"),
+        "requirements.in": ("verbatim", b"pytest\n", 0o644, "plugin_template/requirements.in"),
+        "tests/integration_tests/test_platformname_config.py": ("rendered", ["", "{{PlatformName}}", ""], 0o644, "plugin_template/tests/integration_tests/test_platformname_config.py"),
+    }
+    manifest = gu._get_manifest(compiled_template, "dsd_greenhost", "greatgreenhost")
+
+    target_files_new = [target_file_new for _, target_file_new, _ in manifest]
+    assert target_files_new == [
+        "README.md",
+        "dsd_greenhost/__init__.py",
+        "tests/integration_tests/test_greatgreenhost_config.py",
+    ]
+
+def test_generate_plugin_tree():
+    """Generate a plugin in memory, from an in-memory compiled template."""
+    compiled_template = {
+        "README.md": ("rendered", ["# ", "{{PackageName}}", "\n"], 0o644, "plugin_template/README.md"),
+        "plugin_pkg_name/__init__.py": ("verbatim", b"", 0o644, "plugin_template/plugin_pkg_name/__init__.py"),
+        "plugin_pkg_name/bin/run.sh": ("verbatim", b"#!/bin/sh\n", 0o755, "plugin_template/plugin_pkg_name/bin/run.sh"),
+    }
+    plugin_config = PluginConfig(platform_name="Green Host", pkg_name="dsd-greenhost")
+    plugin_files = gu.generate_plugin_tree(plugin_config, compiled_template)
+    lock_file = plugin_files.pop(".dsd-generator.lock")
+    assert lock_file.kind == "lock"
+
+    assert plugin_files == {
+        "README.md": plugin_tree.PluginFile(b"# dsd-greenhost\n", 0o644, "README.md", "rendered", 1),
+        "dsd_greenhost/__init__.py": plugin_tree.PluginFile(b"", 0o644, "plugin_pkg_name/__init__.py"),
+        "dsd_greenhost/bin/run.sh": plugin_tree.PluginFile(b"#!/bin/sh\n", 0o755, "plugin_pkg_name/bin/run.sh"),
+    }
+    assert plugin_tree.get_new_dirs(plugin_files.items()) == ["dsd_greenhost/bin"]
+
+def test_write_tree_to_dir_is_atomic(tmp_path):
+    """A failure partway through leaves nothing behind, not even the staging directory."""
+    def failing_plugin_files():
+        yield "README.md", plugin_tree.PluginFile(b"# dsd-greenhost\n")
+        yield "dsd_greenhost/__init__.py", plugin_tree.PluginFile(b"")
+        raise OSError("Disk full")
+
+    path_root_new = tmp_path / "dsd-greenhost"
+    with pytest.raises(OSError, match="Disk full"):
+        plugin_tree.write_tree_to_dir(failing_plugin_files(), path_root_new)
+    assert not list(tmp_path.iterdir())
+
+    plugin_files = {"README.md": plugin_tree.PluginFile(b"# dsd-greenhost\n")}
+    assert plugin_tree.write_tree_to_dir(plugin_files.items(), path_root_new, fsync=True) == 16
+    assert [path.name for path in tmp_path.iterdir()] == ["dsd-greenhost"]
@@ -0,0 +1,44 @@
+"""Tests for the output cache."""
+
+import os
+
+from utils import output_cache
+from utils.plugin_tree import PluginFile
+
+
+def test_round_trip(tmp_path):
+    plugin_files = {
+        "README.md": PluginFile(b"# dsd-newfly\n", 0o644, "README.md", "rendered", 1),
+        "dsd_newfly/bin/run.sh": PluginFile(b"#!/bin/sh\n", 0o755, "plugin_pkg_name/bin/run.sh"),
+    }
+    assert output_cache.load_plugin_files("key", tmp_path) is None
+
+    output_cache.store_plugin_files("key", plugin_files.items(), tmp_path)
+    assert output_cache.load_plugin_files("key", tmp_path) == plugin_files
+
+def test_cache_key():
+    replacements = {"{{PlatformName}}": "NewFly"}
+    conditions = {"AutomateAllSupported": True}
+    key = output_cache.get_cache_key("abc", replacements, conditions)
+
+    assert key == output_cache.get_cache_key("abc", replacements, conditions)
+    assert key != output_cache.get_cache_key("abd", replacements, conditions)
+    assert key != output_cache.get_cache_key("abc", {"{{PlatformName}}": "New Fly"}, conditions)
+    assert key != output_cache.get_cache_key("abc", replacements, {"AutomateAllSupported": False})
+
+def test_lru_eviction(tmp_path):
+    """The least recently used plugins are evicted first, and old .tar entries are removed."""
+    plugin_files = {"README.md": PluginFile(b"x" * 1000)}
+    (tmp_path / "plugins").mkdir()
+    (tmp_path / "plugins" / "old-format.tar").write_bytes(b"x")
+    for num, key in enumerate(["a", "b", "c"]):
+        output_cache.store_plugin_files(key, plugin_files.items(), tmp_path)
+        path_cache = tmp_path / "plugins" / f"{key}.marshal"
+        os.utime(path_cache, ns=(num * 10**9, num * 10**9))
+
+    # Using "a" makes "b" the least recently used plugin.
+    assert output_cache.load_plugin_files("a", tmp_path)
+    size = (tmp_path / "plugins" / "a.marshal").stat().st_size
+    output_cache.store_plugin_files("d", plugin_files.items(), tmp_path, max_bytes=3 * size)
+
+    assert sorted(path.stem for path in (tmp_path / "plugins").iterdir()) == ["a", "c", "d"]
@@ -0,0 +1,267 @@
+"""Tests for template rendering functions."""
+
+import hashlib
+import pickle
+import time
+import tracemalloc
+
+import pytest
+
+from utils import template_utils as tu
+
+
+replacements = {
+    "{{PlatformName}}": "New Fly",
+    "{{PlatformNameLower}}": "newfly",
+}
+
+def test_render_single_pass():
+    contents = "cancel_{{PlatformNameLower}} = 'Cancelling {{PlatformName}}.'"
+    rendered, num_placeholders = tu.render(contents, replacements)
+    assert rendered == "cancel_newfly = 'Cancelling New Fly.'"
+    assert num_placeholders == 2
+
+def test_replacement_not_rescanned():
+    """A replacement value that looks like a placeholder is not rendered again."""
+    rendered, num_placeholders = tu.render("{{PlatformName}}", {"{{PlatformName}}": "{{PlatformNameLower}}"})
+    assert rendered == "{{PlatformNameLower}}"
+    assert num_placeholders == 1
+
+def test_non_generator_tokens_pass_through():
+    contents = '{{current_settings}}\nCMD ["{{ django_project_name }}.wsgi"]'
+    rendered, num_placeholders = tu.render(contents, replacements)
+    assert rendered == contents
+    assert num_placeholders == 0
+
+def test_unknown_placeholder():
+    with pytest.raises(tu.TemplateError, match=r"Unknown placeholder \{\{PlatformmName\}\} in utils.py"):
+        tu.render('"""Helper functions specific to {{PlatformmName}}."""', replacements, "utils.py")
+
+def test_conditional_blocks():
+    """Tags alone on a line are removed with their line; only the active branch is rendered."""
+    contents = (
+        "x = 1\n"
+        "{% if AutomateAllSupported %}\n"
+        "msg = 'Deploy to {{PlatformName}}.'\n"
+        "{% else %}\n"
+        "msg = None\n"
+        "{% endif %}\n"
+        "y = {% if not AutomateAllSupported %}'{{PlatformNameLower}}'{% endif %}\n"
+    )
+    rendered, num_placeholders = tu.render(contents, replacements, conditions={"AutomateAllSupported": True})
+    assert rendered == "x = 1\nmsg = 'Deploy to New Fly.'\ny = \n"
+    assert num_placeholders == 1
+
+    rendered, num_placeholders = tu.render(contents, replacements, conditions={"AutomateAllSupported": False})
+    assert rendered == "x = 1\nmsg = None\ny = 'newfly'\n"
+    assert num_placeholders == 1
+
+def test_django_tags_pass_through():
+    """Django tags in the plugin's own templates aren't treated as generator blocks."""
+    contents = "{% if debug %}\nDEBUG = True\n{% else %}\nDEBUG = False\n{% endif %}\n"
+    assert tu.render(contents, replacements) == (contents, 0)
+
+@pytest.mark.parametrize("automate_all", [True, False])
+def test_django_tags_inside_conditional_blocks(automate_all):
+    """Django's {% else %} and {% endif %} inside a generator block stay with Django's {% if %}."""
+    contents = (
+        "{% if AutomateAllSupported %}\n"
+        "{% if user %}hi{% else %}bye{% endif %}\n"
+        "{% if not debug %}\n"
+        "x\n"
+        "{% else %}\n"
+        "y\n"
+        "{% endif %}\n"
+        "{% else %}\n"
+        "none\n"
+        "{% endif %}\n"
+    )
+    expected = (
+        "{% if user %}hi{% else %}bye{% endif %}\n{% if not debug %}\nx\n{% else %}\ny\n{% endif %}\n"
+        if automate_all else "none\n"
+    )
+    conditions = {"AutomateAllSupported": automate_all}
+    assert tu.render(contents, replacements, conditions=conditions) == (expected, 0)
+
+    renderer = tu.StreamRenderer(replacements, conditions=conditions)
+    assert "".join(renderer.render_chunks([contents[:30], contents[30:]])) == expected
+
+def test_conditional_block_errors():
+    with pytest.raises(tu.TemplateError, match=r"Unknown condition AutomateAll in deploy.py"):
+        tu.render("{% if AutomateAll %}x{% endif %}", replacements, "deploy.py", {"AutomateAllSupported": True})
+
+    with pytest.raises(tu.TemplateError, match=r"Missing \{% endif %\} in deploy.py"):
+        tu.render("{% if AutomateAllSupported %}x", replacements, "deploy.py", {"AutomateAllSupported": True})
+
+def test_compiled_template_cache(tmp_path):
+    """Compiled templates are cached, and the cache is invalidated when a file changes."""
+    path_template = tmp_path / "plugin_template"
+    (path_template / "docs").mkdir(parents=True)
+    path_readme = path_template / "README.md"
+    path_readme.write_text("# {{PackageName}}\n")
+    (path_template / "docs" / "logo.png").write_bytes(b"\x89PNG\xff")
+    (path_template / "docs" / "index.md").write_text("{{ not_a_placeholder }}\n")
+    path_cache_dir = tmp_path / "cache"
+
+    compiled_template = tu.load_compiled_template(path_template, path_cache_dir)
+    source = path_template.resolve()
+    assert compiled_template == {
+        "README.md": (tu.RENDERED, ["# ", "{{PackageName}}", "\n"], 0o644, str(source / "README.md")),
+        "docs/index.md": (tu.VERBATIM, b"{{ not_a_placeholder }}\n", 0o644, str(source / "docs/index.md")),
+        "docs/logo.png": (tu.VERBATIM, b"\x89PNG\xff", 0o644, str(source / "docs/logo.png")),
+    }
+    assert len(list(path_cache_dir.glob("template-*.marshal"))) == 1
+
+    # A second load is served from the cache. Both loads keep the template's hash, and so
+    # do copies sent to batch workers.
+    cached_template = tu.load_compiled_template(path_template, path_cache_dir)
+    assert cached_template == compiled_template
+    assert cached_template.template_hash == compiled_template.template_hash == tu.get_template_hash(path_template)
+    assert pickle.loads(pickle.dumps(cached_template)).template_hash == cached_template.template_hash
+
+    # Editing a template file invalidates the cache. The old entry is kept until it's
+    # among the least recently used.
+    path_readme.write_text("# {{PackageName}}\n\nA plugin for {{PlatformName}}.\n")
+    compiled_template = tu.load_compiled_template(path_template, path_cache_dir)
+    assert compiled_template["README.md"][1][3] == "{{PlatformName}}"
+    assert len(list(path_cache_dir.glob("template-*.marshal"))) == 2
+
+def test_compiled_template_cache_eviction(tmp_path, monkeypatch):
+    """Alternating template layers reuse their own entries; the least recently used are removed."""
+    monkeypatch.setattr(tu, "MAX_CACHED_TEMPLATES", 2)
+    path_base = tmp_path / "plugin_template"
+    path_overlay = tmp_path / "overlay"
+    path_other = tmp_path / "other"
+    for path_layer in (path_base, path_overlay, path_other):
+        path_layer.mkdir()
+        (path_layer / f"{path_layer.name}.md").write_text("{{PackageName}}\n")
+    path_cache_dir = tmp_path / "cache"
+
+    compiled = []
+    monkeypatch.setattr(tu, "_compile_template_entries", lambda entries: compiled.append(1) or {})
+    for layers in [[path_base], [path_base, path_overlay]] * 3:
+        tu.load_compiled_template(layers, path_cache_dir)
+    assert len(compiled) == 2
+
+    # The entry used least recently, for [path_base], is removed first. (The pauses keep
+    # each use's timestamp distinct on filesystems with coarse timestamps.)
+    for layers in [[path_base, path_overlay], [path_base, path_other], [path_base, path_overlay], [path_base]]:
+        time.sleep(0.02)
+        tu.load_compiled_template(layers, path_cache_dir)
+    assert len(compiled) == 4
+    assert len(list(path_cache_dir.glob("template-*.marshal"))) == 2
+
+def test_template_layers(tmp_path):
+    """Later layers add files and override earlier ones, and the merged index is cached."""
+    path_base = tmp_path / "plugin_template"
+    path_overlay = tmp_path / "overlay"
+    (path_base / "pkg").mkdir(parents=True)
+    (path_overlay / "pkg").mkdir(parents=True)
+    (path_base / "README.md").write_text("# {{PackageName}}\n")
+    (path_base / "pkg" / "deployer.py").write_text("base = True\n")
+    (path_overlay / "pkg" / "deployer.py").write_text("overlay = '{{PlatformName}}'\n")
+    (path_overlay / "gunicorn.conf.py").write_text("workers = 2\n")
+    path_cache_dir = tmp_path / "cache"
+
+    layers = [path_base, path_overlay]
+    compiled_template = tu.load_compiled_template(layers, path_cache_dir)
+    assert list(compiled_template) == ["README.md", "gunicorn.conf.py", "pkg/deployer.py"]
+    assert compiled_template["pkg/deployer.py"][0] == tu.RENDERED
+    assert compiled_template["pkg/deployer.py"][3] == str(path_overlay.resolve() / "pkg/deployer.py")
+    assert compiled_template["README.md"][3] == str(path_base.resolve() / "README.md")
+
+    # The merged index is keyed by every layer, and served from the cache.
+    assert tu.get_template_hash(layers) != tu.get_template_hash(path_base)
+    assert tu.load_compiled_template(layers, path_cache_dir) == compiled_template
+    assert len(list(path_cache_dir.glob("template-*.marshal"))) == 1
+
+    # Changing a file in any layer changes the combined hash.
+    template_hash = tu.get_template_hash(layers)
+    (path_overlay / "gunicorn.conf.py").write_text("workers = 4\n")
+    assert tu.get_template_hash(layers) != template_hash
+
+@pytest.mark.parametrize("conditions", [{"AutomateAllSupported": True}, {"AutomateAllSupported": False}])
+def test_stream_renderer_chunk_boundaries(conditions):
+    """Streamed rendering matches render(), wherever chunk boundaries fall."""
+    contents = (
+        "x = 1\n"
+        "  {% if AutomateAllSupported %}  \n"
+        "msg = 'Deploy to {{PlatformName}}.'\n"
+        "{% else %}\n"
+        "msg = None\n"
+        "{% endif %}\n"
+        "{% if debug %}{{ django_project_name }}{% endif %}\n"
+        "y = {% if not AutomateAllSupported %}'{{PlatformNameLower}}'{% endif %}"
+    )
+    expected = tu.render(contents, replacements, conditions=conditions)
+
+    for chunk_size in range(1, len(contents) + 1):
+        chunks = [contents[i : i + chunk_size] for i in range(0, len(contents), chunk_size)]
+        renderer = tu.StreamRenderer(replacements, conditions=conditions)
+        rendered = "".join(renderer.render_chunks(chunks))
+        assert (rendered, renderer.num_placeholders) == expected, chunk_size
+
+def test_stream_renderer_long_lines(monkeypatch):
+    """Lines longer than a chunk are split between tokens, not inside them."""
+    monkeypatch.setattr(tu, "CHUNK_SIZE", 16)
+    contents = "var a={b:1};" * 20 + "{{PlatformName}}{{PlatformNameLower}}" * 10
+    expected = tu.render(contents, replacements)
+
+    for chunk_size in (1, 5, 16, 17):
+        chunks = [contents[i : i + chunk_size] for i in range(0, len(contents), chunk_size)]
+        renderer = tu.StreamRenderer(replacements)
+        pieces = list(renderer.render_chunks(chunks))
+        assert ("".join(pieces), renderer.num_placeholders) == expected
+        assert max(len(piece) for piece in pieces) < 100
+
+def test_large_template_files(tmp_path, monkeypatch):
+    """Large files are hashed and classified in chunks, and binary files are never decoded."""
+    monkeypatch.setattr(tu, "STREAM_MIN_BYTES", 64)
+    monkeypatch.setattr(tu, "CHUNK_SIZE", 16)
+    path_template = tmp_path / "plugin_template"
+    path_template.mkdir()
+    files = {
+        "app.js": b"x" * 90 + b"{{PlatformName}}",
+        "static.css": b"body {}\n" * 20,
+        "logo.png": b"\x89PNG\0" + b"{{PlatformName}}" * 10,
+        "notes.txt": b"{{PlatformName}}\n",
+    }
+    for name, contents in files.items():
+        (path_template / name).write_bytes(contents)
+
+    compiled_template = tu.compile_template_tree(path_template)
+    assert compiled_template["app.js"][:3] == (tu.STREAMED, (sha256(files["app.js"]), True), 0o644)
+    assert compiled_template["static.css"][:3] == (tu.STREAMED, (sha256(files["static.css"]), False), 0o644)
+    assert compiled_template["logo.png"][:3] == (tu.STREAMED, (sha256(files["logo.png"]), False), 0o644)
+    assert compiled_template["notes.txt"][0] == tu.RENDERED
+
+    renderer = tu.StreamRenderer(replacements)
+    rendered = b"".join(renderer.render_file(path_template / "app.js"))
+    assert rendered == b"x" * 90 + b"New Fly"
+    assert renderer.num_placeholders == 1
+
+def test_stream_renderer_memory(tmp_path):
+    """Peak memory while rendering a streamed file doesn't depend on the file's size."""
+    path_source = tmp_path / "bundle.js"
+    line = "const host = '{{PlatformName}}'; const slug = '{{PlatformNameLower}}';\n"
+    with open(path_source, "w") as f:
+        for _ in range(30):
+            f.write(line * 1000)
+
+    renderer = tu.StreamRenderer(replacements)
+    tracemalloc.start()
+    try:
+        num_bytes = sum(len(chunk) for chunk in renderer.render_file(path_source))
+        _, peak_bytes = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+
+    assert num_bytes > 1_000_000
+    assert renderer.num_placeholders == 60_000
+    assert peak_bytes < 10 * tu.CHUNK_SIZE
+
+
+# --- Helper functions ---
+
+def sha256(contents):
+    return hashlib.sha256(contents).hexdigest()
@@ -0,0 +1,20 @@
+"""Tests for recording timings."""
+
+from utils.timings import Timings
+
+
+def test_stages_and_slowest_files():
+    timings = Timings()
+    timings.add_file("render_rendered", "README.md", 0.002, 100)
+    timings.add_file("render_rendered", "pyproject.toml", 0.001, 50)
+    timings.add_file("write_rendered", "pyproject.toml", 0.003, 50)
+    timings.add("mkdir", 0.001, 2)
+
+    assert timings.stages["render_rendered"] == {"seconds": 0.003, "files": 2, "bytes": 150}
+    assert timings.stages["mkdir"]["files"] == 2
+    assert timings.get_slowest_files(1) == [("pyproject.toml", 0.004)]
+
+    # Timings from a batch worker are added to the totals.
+    timings.merge(timings.to_dict())
+    assert timings.stages["mkdir"] == {"seconds": 0.002, "files": 4, "bytes": 0}
+    assert [path for path, _ in timings.get_slowest_files()] == ["pyproject.toml", "README.md"]
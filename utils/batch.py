@@ -0,0 +1,493 @@
+"""Generate many plugins from a single spec file.
+
+A spec file is either a TOML file with one [[plugin]] table per plugin:
+
+    [[plugin]]
+    platform_name = "CodeRed"
+    pkg_name = "dsd-codered"
+    support_automate_all = true
+    license_name = "Eric Matthes"
+    target_dir = "plugins/"
+
+or a JSONL file with one JSON object per line, using the same keys.
+
+JSONL specs can also be streamed, one plugin at a time, with progress recorded in an
+append-only journal. If a streaming run is interrupted, running it again skips every
+plugin the journal records as completed.
+"""
+
+from argparse import Namespace
+from concurrent.futures import ProcessPoolExecutor
+import contextlib
+from dataclasses import asdict, fields
+import hashlib
+import io
+import json
+from pathlib import Path
+import sys
+import time
+
+from utils import generator_utils
+from utils import template_utils
+from utils import timings as timings_utils
+from utils.events import EventLog, get_event_log
+from utils.plugin_config import PluginConfig, get_type_errors
+
+
+def run_batch(args):
+    """Validate every spec in the batch file, and then generate all the plugins."""
+    plugin_configs = load_specs(args.batch, args.target_dir)
+    if getattr(args, "plan", False):
+        plan_batch(plugin_configs, args)
+        return
+    validate_specs(plugin_configs)
+
+    events = get_event_log(args)
+    msg = f"Generating {len(plugin_configs)} plugins..."
+    events.info("batch_start", msg, num_plugins=len(plugin_configs))
+    events.flush()
+
+    results = generate_batch(plugin_configs, args.jobs, get_build_options(args))
+    show_batch_summary(results, events)
+    timings_utils.report_timings(args, results.get("timings"))
+
+
+def plan_batch(plugin_configs, args):
+    """Show everything a batch would write, without writing anything.
+
+    Every spec is planned, so all problems and collisions are reported at once, before
+    a batch run stops partway through. Specs that would write to the same place
+    collide with each other, too.
+    """
+    events = get_event_log(args)
+    path_templates = generator_utils.get_template_layers(getattr(args, "template_dir", None))
+    compiled_template = template_utils.load_compiled_template(path_templates, read_only=True)
+
+    errors = []
+    num_collisions = 0
+    total_bytes = 0
+    paths_new = set()
+    for num, plugin_config in enumerate(plugin_configs, start=1):
+        # Existing paths and specs that write to the same place are planned as collisions.
+        error = get_spec_error(plugin_config)
+        if error:
+            errors.append(f"{_get_spec_label(num, plugin_config)}: {error}")
+            continue
+
+        plan = generator_utils.plan_new_plugin(args, plugin_config, compiled_template)
+        path_new = Path(plan["path"]).resolve()
+        if path_new in paths_new:
+            plan["collisions"].append(f"{plan['path']} (another spec also writes here)")
+        paths_new.add(path_new)
+
+        generator_utils.show_plan(plan, events)
+        num_collisions += len(plan["collisions"])
+        total_bytes += plan["bytes"]
+
+    msg = f"\nPlanned {len(plugin_configs) - len(errors)} of {len(plugin_configs)} plugins"
+    msg += f", {total_bytes:,} bytes. Collisions: {num_collisions}"
+    events.info(
+        "plan_summary",
+        msg,
+        num_plugins=len(plugin_configs),
+        num_planned=len(plugin_configs) - len(errors),
+        bytes=total_bytes,
+        num_collisions=num_collisions,
+        errors=errors,
+    )
+    events.flush()
+
+    if errors or num_collisions:
+        msg = "\nThe batch can't be generated as planned:"
+        for error in errors:
+            msg += f"\n  {error}"
+        if num_collisions:
+            msg += f"\n  {num_collisions} planned paths collide with existing paths, or with other specs."
+        sys.exit(msg)
+
+
+def run_stream(args):
+    """Generate plugins one at a time from a JSONL file, or from stdin.
+
+    Only one spec is held in memory at a time. Each plugin is generated through
+    generate_plugin.generate_plugin(), and recorded in the journal when it's complete.
+    """
+    if args.journal:
+        path_journal = Path(args.journal)
+    elif args.stream == "-":
+        path_journal = Path("generator-journal.jsonl")
+    else:
+        path_journal = Path(f"{args.stream}.journal")
+
+    completed_keys, started_keys = read_journal(path_journal)
+    print(f"Streaming plugin specs; recording progress in {path_journal.as_posix()}.")
+    if completed_keys:
+        print(f"  Skipping {len(completed_keys)} plugins already recorded as completed.")
+
+    if args.stream == "-":
+        stream_context = contextlib.nullcontext(sys.stdin)
+    else:
+        path_specs = Path(args.stream)
+        if not path_specs.exists():
+            sys.exit(f"The spec file {path_specs.as_posix()} does not exist.")
+        stream_context = path_specs.open()
+
+    start = time.perf_counter()
+    results = {"num_plugins": 0, "num_skipped": 0, "bytes_written": 0, "failures": []}
+    try:
+        with stream_context as f_specs, path_journal.open("a") as f_journal:
+            for num, line in enumerate(f_specs, start=1):
+                if not line.strip():
+                    continue
+
+                results["num_plugins"] += 1
+                _stream_plugin(num, line, args, f_journal, completed_keys, started_keys, results)
+    except KeyboardInterrupt:
+        msg = "\nInterrupted. Run the same command again to resume;"
+        msg += "\n  completed plugins will be skipped."
+        sys.exit(msg)
+
+    results["seconds"] = time.perf_counter() - start
+    show_batch_summary(results)
+
+
+def read_journal(path_journal):
+    """Read the keys of all started and completed plugins from the journal."""
+    completed_keys, started_keys = set(), set()
+    if not path_journal.exists():
+        return completed_keys, started_keys
+
+    with path_journal.open() as f:
+        for line in f:
+            try:
+                record = json.loads(line)
+            except json.JSONDecodeError:
+                # A crash can leave a partial last line.
+                continue
+
+            if record["event"] == "started":
+                started_keys.add(record["key"])
+            elif record["event"] == "completed":
+                completed_keys.add(record["key"])
+
+    return completed_keys, started_keys
+
+
+def get_spec_key(plugin_config):
+    """Get a key that identifies one plugin spec, including where it's written."""
+    spec = asdict(plugin_config)
+    spec["target_dir"] = Path(plugin_config.target_dir).resolve().as_posix()
+    spec_str = json.dumps(spec, sort_keys=True)
+    return hashlib.sha256(spec_str.encode()).hexdigest()
+
+
+def get_build_options(args):
+    """Get the CLI options that affect how each plugin in a batch is written."""
+    return {
+        "fsync": getattr(args, "fsync", False),
+        "link_mode": getattr(args, "link_mode", "copy"),
+        "no_cache": getattr(args, "no_cache", False),
+        "check": getattr(args, "check", False),
+        "record_timings": bool(timings_utils.get_timings(args)),
+        "output_level": getattr(args, "output_level", "normal"),
+        "template_dir": getattr(args, "template_dir", None),
+    }
+
+
+def load_specs(path, default_target_dir=None):
+    """Load plugin specs from a TOML or JSONL file.
+
+    Returns a list of PluginConfig instances.
+    """
+    path = Path(path)
+    if not path.exists():
+        sys.exit(f"The batch file {path.as_posix()} does not exist.")
+
+    if path.suffix == ".toml":
+        try:
+            import tomllib
+        except ImportError:
+            msg = "Reading TOML batch files requires Python 3.11 or later."
+            msg += "\n  Please use a .jsonl batch file instead."
+            sys.exit(msg)
+        specs = tomllib.loads(path.read_text()).get("plugin", [])
+    else:
+        lines = path.read_text().splitlines()
+        try:
+            specs = [json.loads(line) for line in lines if line.strip()]
+        except json.JSONDecodeError as e:
+            sys.exit(f"Could not parse {path.as_posix()}: {e}")
+
+    return [_get_plugin_config(spec, default_target_dir) for spec in specs]
+
+
+def validate_specs(plugin_configs):
+    """Validate every plugin config before anything is written.
+
+    All problems are reported together, so one run finds every bad spec.
+    """
+    errors = []
+    paths_new = set()
+    for num, plugin_config in enumerate(plugin_configs, start=1):
+        label = _get_spec_label(num, plugin_config)
+        error = get_spec_error(plugin_config)
+        if error:
+            errors.append(f"{label}: {error}")
+            continue
+
+        path_new = Path(plugin_config.target_dir) / plugin_config.pkg_name
+        if path_new.exists():
+            errors.append(f"{label}: A directory already exists at {path_new.as_posix()}.")
+        elif path_new.resolve() in paths_new:
+            errors.append(f"{label}: Another spec also writes to {path_new.as_posix()}.")
+        paths_new.add(path_new.resolve())
+
+    if not plugin_configs:
+        errors.append("The batch file doesn't contain any plugin specs.")
+
+    if errors:
+        msg = "\nThe batch file has problems, so no plugins were generated:"
+        for error in errors:
+            msg += f"\n  {error}"
+        sys.exit(msg)
+
+
+def get_spec_error(plugin_config):
+    """Check a single spec, before it's planned or generated.
+
+    plugin_config is a PluginConfig, or the error message load_specs() returned instead.
+    Returns a description of the first problem found, or None if the spec is valid.
+    """
+    if isinstance(plugin_config, str):
+        return plugin_config
+
+    try:
+        plugin_config.validate()
+    except AssertionError as e:
+        return str(e)
+
+    if not plugin_config.target_dir:
+        return "A target_dir is required, either in the spec or with --target-dir."
+
+    path_target = Path(plugin_config.target_dir)
+    if not path_target.exists():
+        return f"The path {path_target.as_posix()} does not exist."
+
+    return None
+
+
+def generate_batch(plugin_configs, max_workers=None, build_options=None):
+    """Generate plugins in parallel.
+
+    The compiled template, including any layers in build_options["template_dir"], is loaded
+    once, and shared with every worker process.
+    Returns a dict with the results of the batch run. If build_options["record_timings"]
+    is set, results["timings"] holds the timings for every plugin, added together.
+    """
+    build_options = build_options or {}
+    path_templates = generator_utils.get_template_layers(build_options.get("template_dir"))
+    compiled_template = template_utils.load_compiled_template(path_templates)
+
+    start = time.perf_counter()
+    bytes_written = 0
+    failures = []
+    timings = timings_utils.Timings() if build_options.get("record_timings") else None
+    with ProcessPoolExecutor(
+        max_workers=max_workers,
+        initializer=_init_worker,
+        initargs=(compiled_template, build_options),
+    ) as executor:
+        for plugin_config, (num_bytes, error, timings_dict, output) in zip(
+            plugin_configs, executor.map(_generate_plugin, plugin_configs)
+        ):
+            # Each plugin's output arrives as a single block, so it never interleaves.
+            if output:
+                sys.stdout.write(output)
+                sys.stdout.flush()
+            if error:
+                failures.append((plugin_config.pkg_name, error))
+            else:
+                bytes_written += num_bytes
+            if timings and timings_dict:
+                timings.merge(timings_dict)
+
+    return {
+        "num_plugins": len(plugin_configs),
+        "seconds": time.perf_counter() - start,
+        "bytes_written": bytes_written,
+        "failures": failures,
+        "timings": timings,
+    }
+
+
+def show_batch_summary(results, events=None):
+    """Show throughput for a batch run, and exit with an error if any plugins failed."""
+    num_generated = results["num_plugins"] - len(results["failures"]) - results.get("num_skipped", 0)
+    seconds = results["seconds"]
+    plugins_per_second = num_generated / seconds if seconds else 0
+
+    msg = f"\nGenerated {num_generated} of {results['num_plugins']} plugins in {seconds:.2f}s"
+    msg += f" ({plugins_per_second:.1f} plugins/s)."
+    msg += f"\n  Bytes written: {results['bytes_written']:,}"
+    if results.get("num_skipped"):
+        msg += f"\n  Skipped (already completed): {results['num_skipped']}"
+    msg += f"\n  Failures: {len(results['failures'])}"
+
+    events = events or EventLog()
+    events.info(
+        "batch_summary",
+        msg,
+        num_plugins=results["num_plugins"],
+        num_generated=num_generated,
+        num_skipped=results.get("num_skipped", 0),
+        num_failures=len(results["failures"]),
+        seconds=seconds,
+        bytes_written=results["bytes_written"],
+    )
+    events.flush()
+
+    if results["failures"]:
+        msg = "\nThe following plugins could not be generated:"
+        for pkg_name, error in results["failures"]:
+            msg += f"\n  {pkg_name}: {error}"
+        sys.exit(msg)
+
+
+# --- Helper functions ---
+
+# Compiled template and build options for the current worker process.
+_compiled_template = None
+_build_options = {}
+
+def _get_spec_label(num, plugin_config):
+    """Label a spec in error messages, with its package name if it has one."""
+    if isinstance(plugin_config, str):
+        return f"Spec {num}"
+    return f"Spec {num} ({plugin_config.pkg_name or 'no package name'})"
+
+def _init_worker(compiled_template, build_options):
+    """Store the shared compiled template and build options in each worker process."""
+    global _compiled_template, _build_options
+    _compiled_template = compiled_template
+    _build_options = build_options
+
+def _generate_plugin(plugin_config):
+    """Generate a single plugin in a worker process.
+
+    Returns the number of bytes written, an error message if generation failed, the
+    plugin's timings if they're being recorded, and the plugin's buffered output.
+    """
+    args = Namespace(target_dir=plugin_config.target_dir, **_build_options)
+    timings = timings_utils.Timings() if _build_options.get("record_timings") else None
+    events = get_event_log(args, plugin=plugin_config.pkg_name)
+    try:
+        # Stray prints from many workers would interleave; events are returned as one block.
+        with contextlib.redirect_stdout(io.StringIO()):
+            num_bytes = generator_utils.build_new_plugin(
+                args, plugin_config, _compiled_template, timings, events
+            )
+    except (Exception, SystemExit) as e:
+        return 0, str(e) or type(e).__name__, None, _get_batch_output(events)
+
+    return num_bytes, "", timings.to_dict() if timings else None, _get_batch_output(events)
+
+def _get_batch_output(events):
+    """Get a plugin's output for a batch run.
+
+    At the normal level, a batch only shows its summary. Verbose and JSON output is
+    shown for every plugin.
+    """
+    if events.level in ("verbose", "json"):
+        return events.render()
+    return ""
+
+def _stream_plugin(num, line, args, f_journal, completed_keys, started_keys, results):
+    """Generate one streamed plugin, and record it in the journal."""
+    import generate_plugin as gp
+
+    try:
+        plugin_config = _get_plugin_config(json.loads(line), args.target_dir)
+    except json.JSONDecodeError as e:
+        plugin_config = f"Could not parse spec: {e}"
+    # Without a target_dir, generate_plugin() would prompt for one, with stdout redirected.
+    error = get_spec_error(plugin_config)
+    if error:
+        label = plugin_config.pkg_name if not isinstance(plugin_config, str) else f"spec {num}"
+        results["failures"].append((label, error))
+        return
+
+    key = get_spec_key(plugin_config)
+    if key in completed_keys:
+        results["num_skipped"] += 1
+        return
+
+    # This is the same path generate_plugin() writes to.
+    args_plugin = Namespace(target_dir=plugin_config.target_dir, **get_build_options(args))
+    path_new = Path(args_plugin.target_dir) / plugin_config.pkg_name
+    if key in started_keys and path_new.exists():
+        # An earlier run was interrupted after this plugin was written, but before it was
+        # recorded as completed. Plugins are written to a staging directory and renamed into
+        # place in one step, so the directory holds the whole plugin. Record it as it is.
+        _record_completed(f_journal, key, path_new, completed_keys)
+        results["num_skipped"] += 1
+        return
+
+    # A directory that's already there isn't this run's; generate_plugin() reports it, and
+    # nothing is recorded, so a later run never treats it as its own.
+    if not path_new.exists():
+        _write_journal_record(f_journal, {"event": "started", "key": key, "path": path_new.as_posix()})
+
+    try:
+        with contextlib.redirect_stdout(io.StringIO()):
+            gp.generate_plugin(plugin_config, args_plugin)
+    except (Exception, SystemExit) as e:
+        results["failures"].append((plugin_config.pkg_name, str(e).strip() or type(e).__name__))
+        return
+
+    results["bytes_written"] += _record_completed(f_journal, key, path_new, completed_keys)
+
+def _record_completed(f_journal, key, path_new, completed_keys):
+    """Record a plugin as completed, with the hash of every file it contains.
+
+    Returns the number of bytes in the plugin.
+    """
+    output_hashes = {}
+    num_bytes = 0
+    for path in sorted(path_new.rglob("*")):
+        if path.is_file():
+            contents = path.read_bytes()
+            output_hashes[path.relative_to(path_new).as_posix()] = hashlib.sha256(contents).hexdigest()
+            num_bytes += len(contents)
+
+    record = {"event": "completed", "key": key, "path": path_new.as_posix(), "files": output_hashes}
+    _write_journal_record(f_journal, record)
+    completed_keys.add(key)
+    return num_bytes
+
+def _write_journal_record(f_journal, record):
+    """Append a record to the journal, and flush it so it survives a crash."""
+    f_journal.write(json.dumps(record) + "\n")
+    f_journal.flush()
+
+def _get_plugin_config(spec, default_target_dir):
+    """Convert a single spec to a PluginConfig.
+
+    Returns an error message instead, if the spec has unknown keys, or values of the
+    wrong type.
+    """
+    if not isinstance(spec, dict):
+        return "Each spec must be a table or a JSON object."
+
+    field_names = {field.name for field in fields(PluginConfig)}
+    unknown_keys = sorted(set(spec) - field_names)
+    if unknown_keys:
+        return f"Unknown keys: {', '.join(unknown_keys)}"
+
+    type_errors = get_type_errors(spec)
+    if type_errors:
+        return f"Wrong types: {', '.join(type_errors)}"
+
+    plugin_config = PluginConfig(**spec)
+    target_dir = plugin_config.target_dir or default_target_dir
+    plugin_config.target_dir = Path(target_dir) if target_dir else ""
+    return plugin_config
@@ -4,6 +4,9 @@ import argparse
 from pathlib import Path
 import sys
 
+from utils import events
+from utils import plugin_tree
+
 
 def parse_cli():
     parser = argparse.ArgumentParser(description="Plugin generator for django-simple-deploy.")
@@ -12,8 +15,119 @@ def parse_cli():
         type=str,
         help="Path where the new directory will be written.",
     )
+    parser.add_argument(
+        "--output-archive",
+        type=str,
+        help="Write the new plugin to a .zip, .tar.gz, .tgz, or .tar archive, instead of a directory.",
+    )
+    parser.add_argument(
+        "--template-dir",
+        type=str,
+        action="append",
+        help=(
+            "A template layer to add on top of plugin_template/. Can be used more than once; "
+            "files in later layers override files at the same path in earlier layers."
+        ),
+    )
+    parser.add_argument(
+        "--fsync",
+        action="store_true",
+        help="Flush the new plugin to disk before it's moved into place.",
+    )
+    parser.add_argument(
+        "--link-mode",
+        choices=plugin_tree.link_modes,
+        default="copy",
+        help=(
+            "How to write files that are copied unchanged from the template. "
+            "`reflink` clones files on filesystems that support it; `hardlink` shares "
+            "storage with the template, so editing a linked file also edits the template. "
+            "`auto` tries reflink, then an in-kernel copy. All modes fall back to copying. (Default: copy)"
+        ),
+    )
+    parser.add_argument(
+        "--output-level",
+        choices=events.output_levels,
+        default="normal",
+        help=(
+            "How much to show while generating. `verbose` adds details such as file sizes; "
+            "`json` writes every event as a JSON object per line. With --batch, `normal` only "
+            "shows the summary. (Default: normal)"
+        ),
+    )
+    parser.add_argument(
+        "--timings",
+        action="store_true",
+        help="Show the time, files, and bytes for each stage of generating the plugin, and the slowest files.",
+    )
+    parser.add_argument(
+        "--timings-json",
+        type=str,
+        help="Write the timings for each stage, and the slowest files, to a JSON file.",
+    )
+    parser.add_argument(
+        "--plan",
+        action="store_true",
+        help=(
+            "Show the directories, files, and bytes the new plugin would have, and any collisions "
+            "with existing paths, without writing anything. Use --output-level json for JSON."
+        ),
+    )
+    parser.add_argument(
+        "--check",
+        action="store_true",
+        help=(
+            "Before writing the new plugin, compile every module, import it against a stub "
+            "django-simple-deploy, and call its config and CLI hooks. Nothing is written if the check fails."
+        ),
+    )
+    parser.add_argument(
+        "--no-cache",
+        action="store_true",
+        help="Always render the new plugin, instead of reusing an identical plugin from the output cache.",
+    )
+    parser.add_argument(
+        "--update",
+        type=str,
+        help="Update an existing plugin to match the current template, keeping any local edits.",
+    )
+    parser.add_argument(
+        "--batch",
+        type=str,
+        help="Generate every plugin described in a .toml or .jsonl spec file, without prompting.",
+    )
+    parser.add_argument(
+        "--stream",
+        type=str,
+        help="Generate plugins one at a time from a .jsonl spec file, or from stdin with `-`. Resumable.",
+    )
+    parser.add_argument(
+        "--journal",
+        type=str,
+        help="Journal file for --stream. (Default: <spec file>.journal)",
+    )
+    parser.add_argument(
+        "--serve",
+        type=str,
+        help="Serve plugin generation over HTTP at PORT or HOST:PORT. POST a JSON config to /generate to get a zip.",
+    )
+    parser.add_argument(
+        "--jobs",
+        type=int,
+        default=None,
+        help="Number of worker processes for --batch, or threads for --serve. (Default: based on number of CPUs)",
+    )
     args = parser.parse_args()
 
+    # Only a single plugin, or a batch, can be planned. The other modes would write
+    # anyway, so a dry run must never reach them.
+    if args.plan:
+        for option in ("update", "stream", "serve"):
+            if getattr(args, option):
+                msg = f"--plan can't be used with --{option}."
+                msg += "\n  Use --plan on its own, or with --batch."
+                sys.exit(msg)
+
     # If provided, make sure target_dir exists before doing anything else.
     if args.target_dir:
         path = Path(args.target_dir)
@@ -23,4 +137,27 @@ def parse_cli():
             msg += "\n  or choose another location to write to."
             sys.exit(msg)
 
+    for template_dir in args.template_dir or []:
+        path = Path(template_dir)
+        if not path.is_dir():
+            msg = f"The template layer {path.as_posix()} is not a directory."
+            sys.exit(msg)
+
+    if args.update:
+        path = Path(args.update)
+        if not path.is_dir():
+            msg = f"The path {path.as_posix()} is not a plugin directory."
+            sys.exit(msg)
+
+    if args.output_archive:
+        path = Path(args.output_archive)
+        if not path.name.endswith(plugin_tree.archive_suffixes):
+            msg = f"Can't write an archive to {path.as_posix()}."
+            msg += f"\n  Supported archive formats: {', '.join(plugin_tree.archive_suffixes)}"
+            sys.exit(msg)
+        if not path.parent.exists():
+            msg = f"The path {path.parent.as_posix()} does not exist."
+            msg += "\n  Please create this directory and run the plugin generator again."
+            sys.exit(msg)
+
     return args
\ No newline at end of file
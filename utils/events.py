@@ -0,0 +1,70 @@
+"""Buffered, leveled output for generating a plugin.
+
+Generating a plugin emits an event for every directory and file it makes. Events are
+buffered, and written all at once when the plugin is done, so output from plugins
+generated in parallel never interleaves, and a plugin costs a single write.
+
+Output levels:
+- quiet: Nothing but errors.
+- normal: Human-readable messages: each directory made and file copied, each rendered
+  file with its number of placeholders, a note when the plugin comes from the output
+  cache, and the closing summary. Since messages are buffered, even the opening
+  "Configuring plugin..." message is shown only once the plugin is done.
+- verbose: Normal messages, plus details such as file sizes and cache keys.
+- json: Every event, including verbose events, as one JSON object per line.
+"""
+
+import json
+import sys
+
+
+output_levels = ("quiet", "normal", "verbose", "json")
+
+
+class EventLog:
+    """Collect the events for one plugin, and write them out all at once."""
+
+    def __init__(self, level="normal", **context):
+        self.level = level
+        self.events = []
+
+        # Fields added to every JSON event, such as the plugin a batch event is about.
+        self.context = context
+
+    def info(self, event, msg, **fields):
+        """Add an event that's shown at the normal level."""
+        if self.level != "quiet":
+            self.events.append((event, msg, fields))
+
+    def detail(self, event, msg, **fields):
+        """Add an event that's only shown at the verbose and json levels."""
+        if self.level in ("verbose", "json"):
+            self.events.append((event, msg, fields))
+
+    def render(self):
+        """Render every buffered event, as human-readable text or JSON lines."""
+        if self.level == "json":
+            lines = [
+                json.dumps({"event": event, **self.context, **fields}, default=str)
+                for event, _, fields in self.events
+            ]
+        else:
+            lines = [msg for _, msg, _ in self.events]
+
+        return "".join(f"{line}\n" for line in lines)
+
+    def flush(self, stream=None):
+        """Write every buffered event, and clear the buffer."""
+        output = self.render()
+        self.events.clear()
+        if not output:
+            return
+
+        stream = stream or sys.stdout
+        stream.write(output)
+        stream.flush()
+
+
+def get_event_log(args, **context):
+    """Get an EventLog for the output level chosen on the command line."""
+    return EventLog(getattr(args, "output_level", "normal"), **context)
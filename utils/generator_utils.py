@@ -1,8 +1,26 @@
 """Utility functions for generating a new plugin."""
 
+from collections import Counter
+from functools import partial
+import hashlib
 from pathlib import Path
+import re
 import sys
-import shutil
+import time
+
+from utils import lock_utils
+from utils import output_cache
+from utils import plugin_tree
+from utils import template_utils
+from utils.events import EventLog, get_event_log
+from utils.timings import timed
+
+
+# Files in plugin_template/ that aren't part of a generated plugin.
+excluded_files = ["requirements.in"]
+
+# Every new plugin is generated from this template.
+path_template = Path(__file__).parents[1] / "plugin_template"
 
 
 def get_plugin_info(args, plugin_config):
@@ -37,7 +55,10 @@ def get_plugin_info(args, plugin_config):
         path_root = Path(__file__).parents[1]
         default_target_dir = path_root.parent
 
-        if not args.target_dir:
+        if getattr(args, "output_archive", None):
+            # The plugin is written to an archive, not a directory.
+            pass
+        elif not args.target_dir:
             msg = "Where do you want to write the new plugin? "
             msg += f"\n  Default location: {default_target_dir.as_posix()}"
             msg += "\n(Press Enter to accept default location, or specify a different location.)"
@@ -65,7 +86,10 @@ def get_plugin_info(args, plugin_config):
         print(f"  Package name: {plugin_config.pkg_name}")
         print(f"  Supports --automate-all: {plugin_config.support_automate_all}")
         print(f"  Name on license: {plugin_config.license_name}")
-        print(f"  Path for new plugin: {plugin_config.target_dir}")
+        if getattr(args, "output_archive", None):
+            print(f"  Archive for new plugin: {args.output_archive}")
+        else:
+            print(f"  Path for new plugin: {plugin_config.target_dir}")
 
         msg = "\nIs this information correct? (yes/no) "
         response = input(msg)
@@ -84,7 +108,7 @@ def validate_target_dir(args, plugin_config, path_root):
             sys.exit(msg)
         path_root_new = path / plugin_config.pkg_name
         if path_root_new.exists():
-            msg += f"\nA directory already exists at {path_root_new.as_posix()}."
+            msg = f"\nA directory already exists at {path_root_new.as_posix()}."
             msg += "\nPlease either move or rename that directory, choose a different package name,"
             msg += "\n  or write the new plugin to a different location."
             sys.exit(msg)
@@ -109,137 +133,356 @@ def validate_target_dir(args, plugin_config, path_root):
                 msg += "\n  The new repo will be written alongside this project."
                 sys.exit(msg)
 
-    print("\n\nThank you. Configuring plugin...")
     return path_root_new
 
-def build_new_plugin(args, plugin_config):
-    """Build the new plugin in the target directory."""
-    path_root = Path(__file__).parents[1]
-
-    # Make sure it's okay to write to the target directory.
-    path_root_new = validate_target_dir(args, plugin_config, path_root)
-
-    platform_name_lower = _get_platform_name_lower(plugin_config.platform_name)
-    main_dir_name = _get_main_dir_name(plugin_config.pkg_name)
+def get_template_layers(template_dirs=None):
+    """Get the template layers for a new plugin.
 
-    replacements = _get_replacements(plugin_config, platform_name_lower)
+    Every plugin starts from plugin_template/. Each directory in template_dirs is layered
+    on top of it, in order, so later layers add files or override earlier ones.
+    """
+    return [path_template] + [Path(template_dir) for template_dir in template_dirs or []]
 
+def build_new_plugin(args, plugin_config, compiled_template=None, timings=None, events=None):
+    """Build the new plugin in the target directory.
 
-    # Make new plugin dir, and required directory structure.
-    print(f"\nMaking new directory: {path_root_new.as_posix()}")
-    path_root_new.mkdir()
+    Batch runs pass in an already-loaded compiled_template, so it's shared by every plugin.
+    Otherwise the template is loaded from plugin_template/, and any layers in args.template_dir.
+    Unless args.no_cache is set, plugins that have been generated before are read from
+    the output cache instead of being rendered again. If timings is a Timings instance,
+    the time spent in each stage is recorded.
 
-    print("Building inner directory structure...")
+    Messages are added to events, which the caller flushes. If events is None, messages
+    are written at the level in args, once the plugin has been written.
+    Returns the number of bytes written.
+    """
+    path_root = Path(__file__).parents[1]
+    flush_events = events is None
+    if flush_events:
+        events = get_event_log(args)
 
-    # Using mkdir(parents=True), only need to make most deeply nested dirs.
-    new_dirs = [
-        "developer_resources",
-        f"{main_dir_name}/templates",
-        "tests/integration_tests/reference_files",
-        "tests/e2e_tests",
-    ]
+    # Make sure it's okay to write to the target directory.
+    with timed(timings, "validate_target"):
+        path_root_new = validate_target_dir(args, plugin_config, path_root)
+    events.info("configuring", "\n\nThank you. Configuring plugin...")
+
+    # Generate the plugin in memory, and then write it all at once. The plugin is written to
+    # a staging directory first, so a failure never leaves a half-built plugin behind.
+    plugin_files = get_plugin_tree(args, plugin_config, compiled_template, timings, events)
+    check_plugin_tree(args, plugin_config, plugin_files, timings, events)
+
+    with timed(timings, "show_files"):
+        _show_plugin_files(path_root_new, plugin_files, events)
+
+    fsync = getattr(args, "fsync", False)
+    link_mode = getattr(args, "link_mode", "copy")
+    bytes_written = plugin_tree.write_tree_to_dir(
+        plugin_files.items(), path_root_new, fsync, link_mode, timings
+    )
+    msg = f"\nWrote {bytes_written:,} bytes in {len(plugin_files)} files (link mode: {link_mode})."
+    events.detail(
+        "plugin_written",
+        msg,
+        path=path_root_new.as_posix(),
+        bytes=bytes_written,
+        files=len(plugin_files),
+        link_mode=link_mode,
+    )
+
+    if flush_events:
+        events.flush()
+    return bytes_written
+
+def build_plugin_archive(args, plugin_config, timings=None, events=None):
+    """Stream the new plugin into an archive, without writing a plugin directory.
+
+    Returns the size of the archive in bytes.
+    """
+    path_archive = Path(args.output_archive)
+    if path_archive.exists():
+        msg = f"\nA file already exists at {path_archive.as_posix()}."
+        msg += "\nPlease either move or rename that file, or choose a different archive path."
+        sys.exit(msg)
+
+    flush_events = events is None
+    if flush_events:
+        events = get_event_log(args)
+
+    msg = f"\nWriting new plugin to archive: {path_archive.as_posix()}"
+    events.info("write_archive", msg, path=path_archive.as_posix())
+    path_templates = get_template_layers(getattr(args, "template_dir", None))
+    plugin_files = iter_plugin_files(plugin_config, timings=timings, path_templates=path_templates)
+    if getattr(args, "check", False):
+        # The whole plugin has to be generated before it can be checked.
+        plugin_files = dict(plugin_files)
+        check_plugin_tree(args, plugin_config, plugin_files, timings, events)
+        plugin_files = plugin_files.items()
+    archive_size = plugin_tree.write_tree_to_archive(
+        plugin_files, path_archive, plugin_config.pkg_name
+    )
+    events.detail(
+        "archive_written",
+        f"  Archive size: {archive_size:,} bytes",
+        path=path_archive.as_posix(),
+        bytes=archive_size,
+    )
+
+    if flush_events:
+        events.flush()
+    return archive_size
+
+def plan_new_plugin(args, plugin_config, compiled_template=None):
+    """Work out everything that building the new plugin would write, without writing it.
+
+    The plan comes from the same in-memory plugin tree that build_new_plugin() writes. The
+    only I/O against the target is checking whether any planned path already exists.
+    Returns a dict describing the plan, which can be written as JSON.
+    """
+    if getattr(args, "output_archive", None):
+        path_output = Path(args.output_archive)
+    else:
+        target_dir = args.target_dir or plugin_config.target_dir or Path(__file__).parents[2]
+        path_output = Path(target_dir) / plugin_config.pkg_name
+
+    # A plan writes nothing, so it skips the output cache, and never writes the template cache.
+    path_templates = get_template_layers(getattr(args, "template_dir", None))
+    if compiled_template is None:
+        compiled_template = template_utils.load_compiled_template(path_templates, read_only=True)
+    plugin_files = generate_plugin_tree(plugin_config, compiled_template)
+    new_dirs = sorted(
+        {parent.as_posix() for target_file in plugin_files for parent in Path(target_file).parents}
+        - {"."}
+    )
+
+    # Nothing inside the target can exist unless the target itself does.
+    collisions = []
+    if path_output.exists():
+        collisions.append(path_output.as_posix())
+        if path_output.is_dir():
+            for rel_path in [*new_dirs, *plugin_files]:
+                if (path_output / rel_path).exists():
+                    collisions.append((path_output / rel_path).as_posix())
+
+    return {
+        "plugin": plugin_config.pkg_name,
+        "path": path_output.as_posix(),
+        "dirs": new_dirs,
+        "files": [
+            {
+                "path": target_file_new,
+                "kind": plugin_file.kind,
+                "bytes": plugin_file.size,
+                "template": plugin_file.template_path,
+            }
+            for target_file_new, plugin_file in plugin_files.items()
+        ],
+        "bytes": sum(plugin_file.size for plugin_file in plugin_files.values()),
+        "collisions": collisions,
+    }
 
-    for new_dir in new_dirs:
-        path_new_dir = path_root_new / new_dir
-        print(f"  Making new directory: {path_new_dir.as_posix()}")
-        path_new_dir.mkdir(parents=True)
-
-
-    # --- Copy files that don't need modification. ---
-
-    print(f"\nCopying files...")
-    target_files = [
-        ".gitignore",
-        "developer_resources/README.md",
-        "plugin_pkg_name/__init__.py",
-        "tests/e2e_tests/__init__.py",
-        "tests/integration_tests/test_custom_cli_arg.py",
-        "tests/integration_tests/reference_files/.gitignore",
-        "tests/integration_tests/reference_files/Pipfile",
-        "tests/integration_tests/reference_files/pyproject.toml",
-        "tests/integration_tests/reference_files/requirements.txt",
-        "tests/integration_tests/reference_files/settings.py",
-        "tests/integration_tests/reference_files/plugin_help_text_sample.txt",
-    ]
-
-    for target_file in target_files:
-        print(f"  Copying file: {target_file}")
-        path_src = path_root / "plugin_template" / target_file
-        target_file_new = target_file.replace("plugin_pkg_name", main_dir_name)
-        path_dest = path_root_new / target_file_new
-        shutil.copy(path_src, path_dest)
-
-    # --- Make replacements in file contents. ---
-
-    # Files that need to be parsed.
-    target_files = [
-        "pyproject.toml",
-        "tests/conftest.py",
-        "tests/integration_tests/test_platformname_config.py",
-         "tests/integration_tests/test_help_output.py",
-        "tests/e2e_tests/utils.py",
-        "tests/e2e_tests/test_deployment.py",
-        "MANIFEST.in",
-        "README.md",
-        "CHANGELOG.md",
-        "LICENSE",
-        "plugin_pkg_name/platform_deployer.py",
-        "plugin_pkg_name/cli.py",
-        "plugin_pkg_name/deploy.py",
-        "plugin_pkg_name/plugin_config.py",
-        "plugin_pkg_name/templates/dockerfile_example",
-        "plugin_pkg_name/templates/settings.py",
-        "plugin_pkg_name/deploy_messages.py",
-    ]
-
-    print("\nCustomizing files...")
-    for target_file in target_files:
-        # Read file.
-        path = path_root / "plugin_template" / target_file
-        contents = path.read_text()
-
-        # Modify contents and write file.
-        for k, v in replacements.items():
-            contents = contents.replace(k, v)
-
-        target_file_new = target_file.replace("plugin_pkg_name", main_dir_name)
-        target_file_new = target_file_new.replace("test_platformname_config.py", f"test_{platform_name_lower}_config.py")
-        path_new = path_root_new / target_file_new
-        path_new.write_text(contents)
-
-        msg = f"  Wrote modified file: {target_file_new}"
+def show_plan(plan, events):
+    """Describe a plan from plan_new_plugin()."""
+    msg = f"\nPlan for {plan['plugin']}: {plan['path']}"
+    for new_dir in plan["dirs"]:
+        msg += f"\n  {'dir':<9} {'':>9}  {new_dir}/"
+    for planned_file in plan["files"]:
+        msg += f"\n  {planned_file['kind']:<9} {planned_file['bytes']:>9,}  {planned_file['path']}"
+
+    kinds = Counter(planned_file["kind"] for planned_file in plan["files"])
+    kind_counts = ", ".join(f"{num} {kind}" for kind, num in sorted(kinds.items()))
+    msg += f"\n{len(plan['dirs'])} directories, {len(plan['files'])} files ({kind_counts})"
+    msg += f", {plan['bytes']:,} bytes."
+
+    if plan["collisions"]:
+        msg += "\nCollisions with existing paths:"
+        for path in plan["collisions"]:
+            msg += f"\n  {path}"
+    else:
+        msg += "\nNo collisions with existing paths."
+
+    events.info("plan", msg, **plan)
+
+def get_plugin_tree(args, plugin_config, compiled_template=None, timings=None, events=None):
+    """Generate the new plugin in memory, from the template layers in args.
+
+    Unless args.no_cache is set, the plugin is read from the output cache if it's there.
+    """
+    path_templates = get_template_layers(getattr(args, "template_dir", None))
+    if getattr(args, "no_cache", False):
+        return generate_plugin_tree(plugin_config, compiled_template, timings, path_templates)
+    return _get_cached_plugin_tree(
+        plugin_config, compiled_template, timings, events, path_templates
+    )
+
+def check_plugin_tree(args, plugin_config, plugin_files, timings=None, events=None):
+    """If args.check is set, make sure the new plugin compiles and imports before it's written.
+
+    Exits with the problems that were found, if any.
+    """
+    if not getattr(args, "check", False):
+        return
+
+    # Imported here, so pluggy is only needed when --check is used.
+    from utils import smoke_check
+
+    with timed(timings, "check"):
+        main_dir_name = _get_main_dir_name(plugin_config.pkg_name)
+        problems = smoke_check.check_plugin(plugin_files, plugin_config, main_dir_name)
+    if problems:
+        msg = "\nThe new plugin failed its check, so nothing was written:"
+        msg += "".join(f"\n  {problem}" for problem in problems)
+        sys.exit(msg)
+
+    if events:
+        msg = f"  Checked plugin: {main_dir_name} compiles, imports, and registers its hooks."
+        events.info("check", msg, package=main_dir_name)
+
+def generate_plugin_tree(plugin_config, compiled_template=None, timings=None, path_templates=None):
+    """Generate a new plugin in memory, without writing anything.
+
+    Returns a dict mapping each file's path in the new plugin to a PluginFile.
+    """
+    return dict(iter_plugin_files(plugin_config, compiled_template, timings, path_templates))
+
+def iter_plugin_files(plugin_config, compiled_template=None, timings=None, path_templates=None):
+    """Generate the files for a new plugin, one at a time.
+
+    If compiled_template is None, the template is loaded from path_templates, which
+    defaults to just plugin_template/.
+    Yields (target_file_new, PluginFile) tuples. The last file is the lock file, which
+    records the plugin config, and the hashes of every template and generated file.
+    """
+    with timed(timings, "load_template"):
+        manifest, replacements, conditions = _get_render_inputs(
+            plugin_config, compiled_template, path_templates
+        )
+
+    locked_files = {}
+    for target_file, target_file_new, compiled_file in manifest:
+        start = time.perf_counter()
+        plugin_file = _render_plugin_file(target_file, compiled_file, replacements, conditions)
+        locked_files[target_file_new] = lock_utils.get_locked_file(
+            target_file, compiled_file, plugin_file
+        )
+        if timings:
+            seconds = time.perf_counter() - start
+            num_bytes = plugin_file.size
+            timings.add_file(f"render_{plugin_file.kind}", target_file_new, seconds, num_bytes)
+        yield target_file_new, plugin_file
+
+    with timed(timings, "lock_file"):
+        inputs_hash = lock_utils.get_inputs_hash(replacements, conditions)
+        lock_contents = lock_utils.get_lock_contents(plugin_config, inputs_hash, locked_files)
+    yield lock_utils.lock_file_name, plugin_tree.PluginFile(lock_contents, kind="lock")
+
+def update_plugin(path_plugin, compiled_template=None, path_templates=None):
+    """Bring an existing plugin up to date with the current template.
+
+    Only files whose template, or rendering inputs, changed since the plugin was generated
+    are rendered again. A file is only overwritten if it hasn't been edited since it was
+    generated. Edited files are left alone, and the new version is written next to them
+    with a .dsd-new suffix, so the changes can be merged by hand.
+
+    Returns a dict mapping each outcome to a list of files.
+    """
+    lock, plugin_config = lock_utils.read_lock(path_plugin)
+    manifest, replacements, conditions = _get_render_inputs(
+        plugin_config, compiled_template, path_templates
+    )
+
+    inputs_hash = lock_utils.get_inputs_hash(replacements, conditions)
+    inputs_changed = inputs_hash != lock.get("inputs_sha256")
+    old_locked_files = lock["files"]
+
+    results = {outcome: [] for outcome in ("updated", "added", "removed", "conflicts", "skipped")}
+    locked_files = {}
+    for target_file, target_file_new, compiled_file in manifest:
+        old_locked_file = old_locked_files.get(target_file_new)
+        template_hash = lock_utils.get_template_file_hash(compiled_file)
+        if old_locked_file and old_locked_file["template_sha256"] == template_hash:
+            if not _needs_render(compiled_file) or not inputs_changed:
+                locked_files[target_file_new] = old_locked_file
+                continue
+
+        plugin_file = _render_plugin_file(target_file, compiled_file, replacements, conditions)
+        locked_file = lock_utils.get_locked_file(target_file, compiled_file, plugin_file)
+        locked_files[target_file_new] = locked_file
+
+        path = path_plugin / target_file_new
+        current_hash = lock_utils.hash_file(path) if path.exists() else None
+        if current_hash == locked_file["sha256"]:
+            # Already up to date.
+            continue
+        if old_locked_file and not current_hash:
+            # The file was removed from this plugin on purpose.
+            results["skipped"].append(target_file_new)
+        elif old_locked_file and current_hash == old_locked_file["sha256"]:
+            _write_plugin_file(path, plugin_file)
+            results["updated"].append(target_file_new)
+        elif not current_hash:
+            _write_plugin_file(path, plugin_file)
+            results["added"].append(target_file_new)
+        else:
+            _write_plugin_file(path.with_name(f"{path.name}.dsd-new"), plugin_file)
+            results["conflicts"].append(target_file_new)
+
+    # Remove files that are no longer in the template, unless they've been edited.
+    for target_file_new, old_locked_file in old_locked_files.items():
+        if target_file_new in locked_files:
+            continue
+        path = path_plugin / target_file_new
+        if not path.exists():
+            continue
+        if lock_utils.hash_file(path) == old_locked_file["sha256"]:
+            path.unlink()
+            results["removed"].append(target_file_new)
+        else:
+            results["skipped"].append(target_file_new)
+
+    lock_contents = lock_utils.get_lock_contents(plugin_config, inputs_hash, locked_files)
+    (path_plugin / lock_utils.lock_file_name).write_bytes(lock_contents)
+
+    return results
+
+def show_update_summary(path_plugin, results):
+    """Show what happened to each file during an update."""
+    print(f"\nUpdated plugin: {path_plugin.as_posix()}")
+    for target_file_new in results["updated"]:
+        print(f"  Updated file: {target_file_new}")
+    for target_file_new in results["added"]:
+        print(f"  Added file: {target_file_new}")
+    for target_file_new in results["removed"]:
+        print(f"  Removed file: {target_file_new}")
+    for target_file_new in results["skipped"]:
+        print(f"  Skipped file, removed or edited locally: {target_file_new}")
+    for target_file_new in results["conflicts"]:
+        print(f"  Conflict, wrote {target_file_new}.dsd-new: {target_file_new}")
+
+    if not any(results.values()):
+        print("  Already up to date.")
+    elif results["conflicts"]:
+        msg = "\nSome files have been edited since they were generated. Please merge"
+        msg += "\n  each .dsd-new file into its original file, and then delete it."
         print(msg)
 
-
-    # --- Make other changes.
-
-    # Remove automate_all support if needed.
-    if not plugin_config.support_automate_all:
-        print("Commenting out support for --automate-all...")
-        path = path_root_new / main_dir_name / "deploy_messages.py"
-        lines = path.read_text().splitlines()
-        new_lines = []
-        for line_num, line in enumerate(lines):
-            if line_num in (9,10,11,12,13,14,15, 77,78,79,80,81,82,83,84,85,86,87,88,89,90,91,92,93,94,95):
-                new_lines.append(f"# {line}")
-            else:
-                new_lines.append(line)
-
-        new_contents = "\n".join(new_lines)
-        path.write_text(new_contents)
-
-def show_summary():
+def show_summary(events=None):
     """Show a summary message after building the new plugin."""
+    flush_events = events is None
+    if flush_events:
+        events = EventLog()
+
     msg = "\nFinished setting up your plugin. If there are any issues,"
     msg += "\nplease delete the new plugin and try again, or make manual changes"
     msg += "\nand file an issue on this project's repo:"
     msg += "\n  https://github.com/django-simple-deploy/dsd-plugin-template/issues"
-    print(msg)
-
-    msg = "\nYou should now be able to make an editable install of this project into"
+    msg += "\n"
+    msg += "\nYou should now be able to make an editable install of this project into"
     msg += "\na development version of django-simple-deploy, and all initial tests"
     msg += "\nshould pass."
-    print(msg)
+    events.info("finished", msg)
+
+    if flush_events:
+        events.flush()
 
 
 # --- Helper functions ---
@@ -249,9 +492,201 @@ def _get_platform_name_lower(platform_name):
     return platform_name.lower().replace("-", "").replace("_", "").replace(".", "").replace(" ", "")
 
 def _get_main_dir_name(pkg_name):
-    """Return name of main dir. For dsd-new-platform, that's dsd_new_platform."""
-    pkg_name_lower = pkg_name.lower().replace("-", "_")
-    return pkg_name_lower
+    """Return name of main dir. For dsd-new-platform, that's dsd_new_platform.
+
+    Runs of `-`, `_`, and `.` become a single underscore, so the name is always an
+    importable package name.
+    """
+    return re.sub(r"[-_.]+", "_", pkg_name).lower()
+
+def _get_path_rules(main_dir_name, platform_name_lower):
+    """Get the rules for renaming template paths in the new plugin.
+
+    Each rule maps a file or directory name in the template to its name in the new plugin.
+    """
+    return {
+        "plugin_pkg_name": main_dir_name,
+        "test_platformname_config.py": f"test_{platform_name_lower}_config.py",
+    }
+
+def _get_manifest(compiled_template, main_dir_name, platform_name_lower):
+    """Get the list of files that make up the new plugin.
+
+    Returns a list of (target_file, target_file_new, compiled_file) tuples.
+    """
+    path_rules = _get_path_rules(main_dir_name, platform_name_lower)
+
+    manifest = []
+    for target_file, compiled_file in compiled_template.items():
+        if target_file in excluded_files:
+            continue
+
+        parts = [path_rules.get(part, part) for part in target_file.split("/")]
+        target_file_new = "/".join(parts)
+        manifest.append((target_file, target_file_new, compiled_file))
+
+    return manifest
+
+def _get_render_inputs(plugin_config, compiled_template=None, path_templates=None):
+    """Get the manifest, replacements, and conditions for rendering a plugin."""
+    platform_name_lower = _get_platform_name_lower(plugin_config.platform_name)
+    main_dir_name = _get_main_dir_name(plugin_config.pkg_name)
+
+    replacements = _get_replacements(plugin_config, platform_name_lower)
+    conditions = _get_conditions(plugin_config)
+
+    # Template files are read and tokenized once, and then cached until the template changes.
+    if compiled_template is None:
+        compiled_template = template_utils.load_compiled_template(
+            path_templates or [path_template]
+        )
+    manifest = _get_manifest(compiled_template, main_dir_name, platform_name_lower)
+
+    return manifest, replacements, conditions
+
+def _render_plugin_file(target_file, compiled_file, replacements, conditions):
+    """Render a single template file."""
+    kind, data, mode, source = compiled_file
+
+    # Files that don't need modification. These can be linked to their source file.
+    if kind == template_utils.VERBATIM:
+        return plugin_tree.PluginFile(data, mode, target_file, kind, source_path=Path(source))
+
+    if kind == template_utils.STREAMED:
+        return _stream_plugin_file(target_file, compiled_file, replacements, conditions)
+
+    # Make replacements in file contents, and keep only the blocks this plugin needs.
+    contents, num_placeholders = template_utils.render_segments(
+        data, replacements, target_file, conditions
+    )
+    return plugin_tree.PluginFile(contents.encode(), mode, target_file, kind, num_placeholders)
+
+def _stream_plugin_file(target_file, compiled_file, replacements, conditions):
+    """Set up a large template file to be streamed, instead of read into memory.
+
+    A large file that needs rendering is rendered once here, to get its size and hash,
+    and then rendered again as it's written.
+    """
+    _, (template_hash, needs_render), mode, source = compiled_file
+    path_source = Path(source)
+    if not needs_render:
+        return plugin_tree.PluginFile(
+            None,
+            mode,
+            target_file,
+            template_utils.VERBATIM,
+            source_path=path_source,
+            iter_chunks=partial(template_utils.iter_file_chunks, path_source),
+            size=path_source.stat().st_size,
+            sha256=template_hash,
+        )
+
+    renderer = template_utils.StreamRenderer(replacements, target_file, conditions)
+    hasher = hashlib.sha256()
+    size = 0
+    for chunk in renderer.render_file(path_source):
+        hasher.update(chunk)
+        size += len(chunk)
+
+    return plugin_tree.PluginFile(
+        None,
+        mode,
+        target_file,
+        template_utils.RENDERED,
+        renderer.num_placeholders,
+        iter_chunks=partial(renderer.render_file, path_source),
+        size=size,
+        sha256=hasher.hexdigest(),
+    )
+
+def _needs_render(compiled_file):
+    """Check whether a compiled template file depends on the rendering inputs."""
+    kind, data = compiled_file[:2]
+    if kind == template_utils.STREAMED:
+        return data[1]
+    return kind == template_utils.RENDERED
+
+def _get_cached_plugin_tree(
+    plugin_config, compiled_template=None, timings=None, events=None, path_templates=None
+):
+    """Get a plugin tree from the output cache, generating and caching it on a miss."""
+    path_templates = path_templates or [path_template]
+    with timed(timings, "output_cache"):
+        platform_name_lower = _get_platform_name_lower(plugin_config.platform_name)
+        replacements = _get_replacements(plugin_config, platform_name_lower)
+        conditions = _get_conditions(plugin_config)
+        # A loaded template already knows its hash; otherwise the template is scanned.
+        template_hash = getattr(compiled_template, "template_hash", None)
+        if template_hash is None:
+            template_hash = template_utils.get_template_hash(path_templates)
+        cache_key = output_cache.get_cache_key(template_hash, replacements, conditions)
+        plugin_files = output_cache.load_plugin_files(cache_key)
+
+    if plugin_files is None:
+        if events:
+            events.detail("cache_miss", f"\nNo cached plugin: {cache_key[:12]}", key=cache_key)
+        plugin_files = generate_plugin_tree(
+            plugin_config, compiled_template, timings, path_templates
+        )
+        with timed(timings, "output_cache"):
+            output_cache.store_plugin_files(cache_key, plugin_files.items())
+        return plugin_files
+
+    if events:
+        events.info("cache_hit", f"\nUsing cached plugin: {cache_key[:12]}", key=cache_key)
+    return plugin_files
+
+def _write_plugin_file(path, plugin_file):
+    """Write a single file into an existing plugin."""
+    path.parent.mkdir(parents=True, exist_ok=True)
+    with open(path, "wb") as f:
+        for chunk in plugin_file.chunks():
+            f.write(chunk)
+    path.chmod(plugin_file.mode)
+
+def _show_plugin_files(path_root_new, plugin_files, events):
+    """Describe the files that make up the new plugin."""
+    msg = f"\nMaking new directory: {path_root_new.as_posix()}"
+    events.info("make_root_dir", msg, path=path_root_new.as_posix())
+    events.info("section", "Building inner directory structure...", name="dirs")
+    for new_dir in plugin_tree.get_new_dirs(plugin_files.items()):
+        path_new_dir = path_root_new / new_dir
+        msg = f"  Making new directory: {path_new_dir.as_posix()}"
+        events.info("make_dir", msg, path=path_new_dir.as_posix())
+
+    events.info("section", "\nCopying files...", name="verbatim")
+    for target_file_new, plugin_file in plugin_files.items():
+        if plugin_file.kind == template_utils.VERBATIM:
+            msg = f"  Copying file: {plugin_file.template_path}"
+            events.info(
+                "copy_file",
+                msg,
+                path=target_file_new,
+                template=plugin_file.template_path,
+                bytes=plugin_file.size,
+            )
+
+    events.info("section", "\nCustomizing files...", name="rendered")
+    for target_file_new, plugin_file in plugin_files.items():
+        if plugin_file.kind == template_utils.RENDERED:
+            msg = f"  Wrote modified file: {target_file_new} ({plugin_file.num_placeholders} placeholders)"
+            events.info(
+                "render_file",
+                msg,
+                path=target_file_new,
+                template=plugin_file.template_path,
+                bytes=plugin_file.size,
+                placeholders=plugin_file.num_placeholders,
+            )
+
+    msg = f"  Wrote lock file: {lock_utils.lock_file_name}"
+    events.info("lock_file", msg, path=lock_utils.lock_file_name)
+
+def _get_conditions(plugin_config):
+    """Get the conditions used by {% if %} blocks in template files."""
+    return {
+        "AutomateAllSupported": plugin_config.support_automate_all,
+    }
 
 def _get_replacements(plugin_config, platform_name_lower):
     """Get substitions for..."""
@@ -259,7 +694,7 @@ def _get_replacements(plugin_config, platform_name_lower):
         "{{PlatformName}}": plugin_config.platform_name,
         "{{PlatformNameLower}}": platform_name_lower,
         "{{PackageName}}": plugin_config.pkg_name,
-        "{{PluginName}}": plugin_config.pkg_name.replace("-", "_"),
+        "{{PluginName}}": _get_main_dir_name(plugin_config.pkg_name),
         "{{AutomateAllSupported}}": str(plugin_config.support_automate_all),
         "{{LicenseName}}": plugin_config.license_name,
     }
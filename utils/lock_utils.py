@@ -0,0 +1,92 @@
+"""Utility functions for the lock file that's written to each new plugin.
+
+The lock file records the config a plugin was generated from, and a hash of every
+template file and generated file. `generate_plugin.py --update` uses it to tell which
+files need to be regenerated, and which files have been edited since they were generated.
+"""
+
+from dataclasses import asdict
+import hashlib
+import json
+import sys
+
+from utils import template_utils
+from utils.plugin_config import PluginConfig
+
+
+lock_file_name = ".dsd-generator.lock"
+
+# Bump this whenever the format of the lock file changes.
+LOCK_VERSION = 1
+
+
+def get_lock_contents(plugin_config, inputs_hash, locked_files):
+    """Get the contents of a lock file, as bytes.
+
+    The target dir isn't recorded, so a plugin can be moved without affecting its lock file.
+    """
+    lock_config = asdict(plugin_config)
+    del lock_config["target_dir"]
+
+    lock = {
+        "lock_version": LOCK_VERSION,
+        "plugin_config": lock_config,
+        "inputs_sha256": inputs_hash,
+        "files": locked_files,
+    }
+    return (json.dumps(lock, indent=2, sort_keys=True) + "\n").encode()
+
+def get_locked_file(template_path, compiled_file, plugin_file):
+    """Get the lock file entry for a single generated file."""
+    return {
+        "template": template_path,
+        "template_sha256": get_template_file_hash(compiled_file),
+        "sha256": plugin_file.get_sha256(),
+    }
+
+def get_template_file_hash(compiled_file):
+    """Hash a compiled template file's source."""
+    kind, data = compiled_file[:2]
+    if kind == template_utils.STREAMED:
+        # Large files are hashed when the template is compiled.
+        return data[0]
+    if kind == template_utils.RENDERED:
+        data = "".join(data).encode()
+    return hash_bytes(data)
+
+def get_inputs_hash(replacements, conditions):
+    """Hash everything besides the template that affects rendered files."""
+    inputs = {"replacements": replacements, "conditions": conditions}
+    return hash_bytes(json.dumps(inputs, sort_keys=True).encode())
+
+def hash_bytes(contents):
+    return hashlib.sha256(contents).hexdigest()
+
+def hash_file(path):
+    """Hash a file in a plugin, one chunk at a time."""
+    hasher = hashlib.sha256()
+    for chunk in template_utils.iter_file_chunks(path):
+        hasher.update(chunk)
+    return hasher.hexdigest()
+
+def read_lock(path_plugin):
+    """Read a plugin's lock file.
+
+    Returns the parsed lock, and the PluginConfig it records.
+    """
+    path_lock = path_plugin / lock_file_name
+    try:
+        lock = json.loads(path_lock.read_text())
+    except FileNotFoundError:
+        msg = f"No {lock_file_name} file found in {path_plugin.as_posix()}."
+        msg += "\n  Only plugins made with this version of the generator can be updated."
+        sys.exit(msg)
+    except json.JSONDecodeError as e:
+        sys.exit(f"Can't read {path_lock.as_posix()}: {e}")
+
+    if lock.get("lock_version") != LOCK_VERSION:
+        msg = f"Unsupported lock file version in {path_lock.as_posix()}: {lock.get('lock_version')}"
+        sys.exit(msg)
+
+    plugin_config = PluginConfig(**lock["plugin_config"], target_dir=path_plugin.parent)
+    return lock, plugin_config
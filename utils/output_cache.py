@@ -0,0 +1,155 @@
+"""Content-addressed cache of generated plugins.
+
+Generating the same plugin twice, from the same template, gives exactly the same files.
+Each generated plugin is stored as a single marshal file, keyed by a hash of everything
+that affects its contents: the template tree, the replacements and conditions used to
+render it, and the source of the generator itself. A cache hit is loaded with one read,
+instead of rendering every file again.
+
+The least recently used plugins are evicted once the cache grows past its size limit.
+"""
+
+from functools import cache
+import hashlib
+import json
+import marshal
+import os
+from pathlib import Path
+
+from utils import plugin_tree
+from utils import template_utils
+
+
+# Generator modules whose source affects generated plugins. Changing any of these
+# invalidates every cached plugin.
+generator_modules = (
+    "generator_utils.py",
+    "lock_utils.py",
+    "output_cache.py",
+    "plugin_tree.py",
+    "template_utils.py",
+)
+
+# Default size limit for the cache, in bytes.
+MAX_CACHE_BYTES = 256 * 1024 * 1024
+
+
+def get_cache_key(template_hash, replacements, conditions):
+    """Get the key for a generated plugin."""
+    hasher = hashlib.sha256(template_hash.encode())
+    inputs = {"replacements": replacements, "conditions": conditions}
+    hasher.update(json.dumps(inputs, sort_keys=True).encode())
+    hasher.update(_get_generator_hash())
+    return hasher.hexdigest()
+
+
+def load_plugin_files(cache_key, path_cache_dir=None):
+    """Load a cached plugin.
+
+    Returns a dict mapping each file's path in the plugin to a PluginFile, or None if
+    the plugin isn't in the cache.
+    """
+    path_cache = _get_plugin_cache_dir(path_cache_dir) / f"{cache_key}.marshal"
+    try:
+        cached_files = marshal.loads(path_cache.read_bytes())
+        plugin_files = {
+            # Cached verbatim files can still be linked to their template file.
+            target_file: plugin_tree.PluginFile(
+                *file_values, source_path=Path(source_path) if source_path else None
+            )
+            for target_file, *file_values, source_path in cached_files
+        }
+    except (OSError, EOFError, ValueError, TypeError):
+        # Missing or damaged cache entry; generate the plugin again.
+        return None
+
+    # Mark this entry as recently used, so it's evicted last.
+    try:
+        os.utime(path_cache)
+    except OSError:
+        pass
+
+    return plugin_files
+
+
+def store_plugin_files(cache_key, plugin_files, path_cache_dir=None, max_bytes=None):
+    """Add a generated plugin to the cache, and evict old entries if the cache is too big.
+
+    The cache is an optimization, so failing to write it is not an error. Plugins with
+    files streamed from large templates aren't cached, because the cache holds every
+    file's contents.
+    """
+    plugin_files = list(plugin_files)
+    if any(plugin_file.contents is None for _, plugin_file in plugin_files):
+        return
+
+    path_dir = _get_plugin_cache_dir(path_cache_dir)
+    path_cache = path_dir / f"{cache_key}.marshal"
+    cached_files = [
+        (
+            target_file,
+            plugin_file.contents,
+            plugin_file.mode,
+            plugin_file.template_path,
+            plugin_file.kind,
+            plugin_file.num_placeholders,
+            str(plugin_file.source_path) if plugin_file.source_path else None,
+        )
+        for target_file, plugin_file in plugin_files
+    ]
+
+    # Write to a temp file first, so concurrent runs never read a partial file.
+    path_tmp = path_cache.with_suffix(f".{os.getpid()}.tmp")
+    try:
+        path_dir.mkdir(parents=True, exist_ok=True)
+        path_tmp.write_bytes(marshal.dumps(cached_files))
+        os.replace(path_tmp, path_cache)
+
+        _evict(path_dir, get_max_bytes() if max_bytes is None else max_bytes)
+    except OSError:
+        path_tmp.unlink(missing_ok=True)
+
+
+def get_max_bytes():
+    """Get the size limit for the cache, which can be set with DSD_GENERATOR_CACHE_MAX_BYTES."""
+    if max_bytes := os.environ.get("DSD_GENERATOR_CACHE_MAX_BYTES"):
+        return int(max_bytes)
+    return MAX_CACHE_BYTES
+
+
+# --- Helper functions ---
+
+@cache
+def _get_generator_hash():
+    """Hash the source of the generator modules, once per process."""
+    hasher = hashlib.sha256()
+    path_utils = Path(__file__).parent
+    for module_name in generator_modules:
+        hasher.update((path_utils / module_name).read_bytes())
+    return hasher.digest()
+
+def _get_plugin_cache_dir(path_cache_dir):
+    if path_cache_dir is None:
+        path_cache_dir = template_utils.get_cache_dir()
+    return path_cache_dir / "plugins"
+
+def _evict(path_dir, max_bytes):
+    """Remove the least recently used plugins, until the cache fits in max_bytes.
+
+    Plugins cached as .tar files, by older versions of the generator, are never read,
+    so they're always removed.
+    """
+    for path in path_dir.glob("*.tar"):
+        path.unlink(missing_ok=True)
+
+    entries = []
+    for path in path_dir.glob("*.marshal"):
+        stat = path.stat()
+        entries.append((stat.st_mtime_ns, stat.st_size, path))
+
+    total_bytes = sum(size for _, size, _ in entries)
+    for _, size, path in sorted(entries):
+        if total_bytes <= max_bytes:
+            break
+        path.unlink(missing_ok=True)
+        total_bytes -= size
@@ -1,7 +1,8 @@
 """Stores config info required to generate a new plugin."""
 
-from dataclasses import dataclass
+from dataclasses import dataclass, fields
 from pathlib import Path
+import re
 
 
 @dataclass
@@ -14,5 +15,31 @@ class PluginConfig:
 
     def validate(self):
         """Validate the plugin config."""
-        assert self.platform_name
-        assert self.pkg_name.startswith("dsd-")
\ No newline at end of file
+        assert self.platform_name, "A platform name is required."
+        assert self.pkg_name.startswith("dsd-"), "The package name must start with `dsd-`."
+        assert re.fullmatch(r"dsd-[A-Za-z0-9._-]*[A-Za-z0-9]", self.pkg_name), (
+            "The package name can only contain letters, numbers, `-`, `_`, and `.`, "
+            "and must end with a letter or number."
+        )
+
+        # The platform name is written into strings, comments, and identifiers in the
+        # new plugin, so quotes, braces, and other punctuation could break its code.
+        name_chars = re.sub(r"[ ._-]", "", self.platform_name.lower())
+        assert name_chars and f"_{name_chars}".isidentifier(), (
+            "The platform name can only contain letters, numbers, spaces, `.`, `-`, and `_`."
+        )
+
+def get_type_errors(spec):
+    """Get a message for each value in a spec that has the wrong type for its field.
+
+    Specs come from JSON and TOML, so paths are given as strings.
+    """
+    type_names = {str: "a string", bool: "true or false", Path: "a string"}
+    errors = []
+    for field in fields(PluginConfig):
+        if field.name not in spec:
+            continue
+        allowed_types = (str, Path) if field.type is Path else (field.type,)
+        if not isinstance(spec[field.name], allowed_types):
+            errors.append(f"{field.name} must be {type_names[field.type]}")
+    return errors
@@ -0,0 +1,47 @@
+"""Generate plugins from a long-lived process.
+
+The CLI reads the compiled template for every run. A PluginGenerator loads it once,
+and then generates any number of plugins in memory, so a service can generate each
+plugin without starting a new process.
+"""
+
+import io
+
+from utils import generator_utils
+from utils import plugin_tree
+from utils import template_utils
+
+
+class PluginGenerator:
+    """Generate plugins in memory, from a template that's loaded once.
+
+    Generating a plugin doesn't change any state, so one instance can be shared by
+    many threads.
+    """
+
+    def __init__(self, compiled_template=None, path_templates=None):
+        if compiled_template is None:
+            compiled_template = template_utils.load_compiled_template(
+                path_templates or generator_utils.get_template_layers()
+            )
+        self.compiled_template = compiled_template
+
+    def generate(self, plugin_config):
+        """Generate a plugin in memory.
+
+        Returns a dict mapping each file's path in the new plugin to a PluginFile.
+        """
+        plugin_config.validate()
+        return generator_utils.generate_plugin_tree(plugin_config, self.compiled_template)
+
+    def generate_zip(self, plugin_config):
+        """Generate a plugin as a zip archive, without writing anything to disk.
+
+        Returns the contents of the archive.
+        """
+        plugin_config.validate()
+        plugin_files = generator_utils.iter_plugin_files(plugin_config, self.compiled_template)
+
+        f = io.BytesIO()
+        plugin_tree.write_tree_to_zip(plugin_files, f, plugin_config.pkg_name)
+        return f.getvalue()
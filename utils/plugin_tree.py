@@ -0,0 +1,300 @@
+"""In-memory representation of a generated plugin, and sinks for writing it out.
+
+A plugin tree is a dict mapping each file's path, relative to the plugin's root
+directory, to a PluginFile. Sinks take the items of a tree, so they can also consume
+files one at a time as they're generated.
+"""
+
+from dataclasses import dataclass, field
+import gzip
+import hashlib
+import io
+import os
+from pathlib import Path
+import shutil
+import sys
+import tarfile
+import time
+from typing import Callable
+import uuid
+import zipfile
+
+
+# Ways to write files that are copied unchanged from the template.
+link_modes = ("copy", "hardlink", "reflink", "auto")
+
+# ioctl request for cloning a file on Linux filesystems such as Btrfs and XFS.
+FICLONE = 0x40049409
+
+# Suffixes of supported archive formats.
+archive_suffixes = (".zip", ".tar.gz", ".tgz", ".tar")
+
+# Every archive entry gets the same timestamp, so archives are byte-for-byte reproducible.
+# This is the earliest timestamp the zip format supports.
+ARCHIVE_DATE_TIME = (1980, 1, 1, 0, 0, 0)
+ARCHIVE_MTIME = 315532800
+
+
+@dataclass
+class PluginFile:
+    """A single file in a generated plugin."""
+    contents: bytes
+    mode: int = 0o644
+
+    # Where the file came from in plugin_template/, and how it was generated.
+    template_path: str = ""
+    kind: str = "verbatim"
+    num_placeholders: int = 0
+
+    # The template file that verbatim files can be linked to, instead of written.
+    source_path: Path = field(default=None, compare=False, repr=False)
+
+    # Files streamed from large templates aren't held in memory. Their contents is None,
+    # and iter_chunks() yields their contents in chunks of bytes.
+    iter_chunks: Callable = field(default=None, compare=False, repr=False)
+    size: int = field(default=None, compare=False)
+    sha256: str = field(default=None, compare=False, repr=False)
+
+    def __post_init__(self):
+        if self.size is None and self.contents is not None:
+            self.size = len(self.contents)
+
+    def chunks(self):
+        """Get the file's contents, as an iterable of bytes."""
+        if self.contents is None:
+            return self.iter_chunks()
+        return (self.contents,)
+
+    def get_sha256(self):
+        """Hash the file's contents, one chunk at a time."""
+        if self.sha256 is None:
+            hasher = hashlib.sha256()
+            for chunk in self.chunks():
+                hasher.update(chunk)
+            self.sha256 = hasher.hexdigest()
+        return self.sha256
+
+
+def write_tree_to_dir(plugin_files, path_root_new, fsync=False, link_mode="copy", timings=None):
+    """Write plugin files to a new directory, atomically.
+
+    Files are written to a staging directory alongside path_root_new, which is renamed
+    to path_root_new once every file has been written. If anything goes wrong, the
+    staging directory is removed, and nothing is left at path_root_new.
+
+    If fsync is True, everything is flushed to disk once, just before the rename.
+    See link_modes for the values of link_mode. Verbatim files are copied whenever they
+    can't be linked, for example when the template is on a different filesystem.
+    If timings is a Timings instance, the time spent making directories, writing each
+    kind of file, and committing the new plugin is recorded.
+    Returns the number of bytes in the new plugin.
+    """
+    start = time.perf_counter()
+    path_staging = path_root_new.parent / f".{path_root_new.name}.{uuid.uuid4().hex[:8]}.staging"
+    path_staging.mkdir()
+
+    try:
+        if link_mode != "copy":
+            link_mode = _check_link_mode(link_mode, path_staging)
+
+        bytes_written = 0
+        written_paths = []
+        made_dirs = {path_staging}
+        mkdir_seconds = time.perf_counter() - start
+        for target_file, plugin_file in plugin_files:
+            path = path_staging / target_file
+            if path.parent not in made_dirs:
+                start = time.perf_counter()
+                path.parent.mkdir(parents=True, exist_ok=True)
+                made_dirs.update(path_staging / d for d in Path(target_file).parents)
+                mkdir_seconds += time.perf_counter() - start
+
+            start = time.perf_counter()
+            _write_file(plugin_file, path, link_mode)
+            written_paths.append(path)
+            bytes_written += plugin_file.size
+            if timings:
+                seconds = time.perf_counter() - start
+                timings.add_file(f"write_{plugin_file.kind}", target_file, seconds, plugin_file.size)
+
+        start = time.perf_counter()
+        if fsync:
+            _fsync_paths(written_paths, path_staging)
+
+        os.rename(path_staging, path_root_new)
+    except BaseException:
+        shutil.rmtree(path_staging, ignore_errors=True)
+        raise
+
+    if fsync:
+        _fsync_paths([], path_root_new.parent)
+
+    if timings:
+        timings.add("mkdir", mkdir_seconds, len(made_dirs))
+        timings.add("commit", time.perf_counter() - start)
+
+    return bytes_written
+
+
+def write_tree_to_archive(plugin_files, path_archive, root_dir):
+    """Stream plugin files into a .zip, .tar.gz, .tgz, or .tar archive.
+
+    Each file is added to the archive as soon as it's generated, under root_dir/.
+    Returns the size of the archive in bytes. A partial archive is removed if
+    anything goes wrong.
+    """
+    try:
+        with open(path_archive, "wb") as f:
+            if path_archive.name.endswith(".zip"):
+                write_tree_to_zip(plugin_files, f, root_dir)
+            elif path_archive.name.endswith((".tar.gz", ".tgz")):
+                # Leave the name and timestamp out of the gzip header.
+                with gzip.GzipFile(filename="", mode="wb", fileobj=f, mtime=0) as f_gzip:
+                    write_tree_to_tar(plugin_files, f_gzip, root_dir)
+            else:
+                write_tree_to_tar(plugin_files, f, root_dir)
+    except BaseException:
+        path_archive.unlink(missing_ok=True)
+        raise
+
+    return path_archive.stat().st_size
+
+
+def write_tree_to_zip(plugin_files, f, root_dir):
+    """Write plugin files to a zip archive, in a file-like object."""
+    with zipfile.ZipFile(f, "w", compression=zipfile.ZIP_DEFLATED) as zf:
+        for target_file, plugin_file in plugin_files:
+            info = zipfile.ZipInfo(f"{root_dir}/{target_file}", date_time=ARCHIVE_DATE_TIME)
+            info.external_attr = (0o100000 | plugin_file.mode) << 16
+            info.compress_type = zipfile.ZIP_DEFLATED
+            info.file_size = plugin_file.size
+            with zf.open(info, "w") as f_entry:
+                for chunk in plugin_file.chunks():
+                    f_entry.write(chunk)
+
+
+def write_tree_to_tar(plugin_files, f, root_dir):
+    """Write plugin files to an uncompressed tar stream, in a file-like object."""
+    with tarfile.open(fileobj=f, mode="w|", format=tarfile.PAX_FORMAT) as tf:
+        for target_file, plugin_file in plugin_files:
+            info = tarfile.TarInfo(f"{root_dir}/{target_file}")
+            info.size = plugin_file.size
+            info.mode = plugin_file.mode
+            info.mtime = ARCHIVE_MTIME
+            tf.addfile(info, io.BufferedReader(_ChunkReader(plugin_file.chunks())))
+
+
+def get_new_dirs(plugin_files):
+    """Get the most deeply nested dirs needed for a set of plugin files."""
+    parent_dirs = {Path(target_file).parent for target_file, _ in plugin_files}
+
+    # Skip any dir that's a parent of another dir.
+    all_parents = set()
+    for parent_dir in parent_dirs:
+        all_parents.update(parent_dir.parents)
+
+    return sorted(d.as_posix() for d in parent_dirs - all_parents)
+
+
+# --- Helper functions ---
+
+def _write_file(plugin_file, path, link_mode):
+    """Write a single file, linking it to its source if link_mode allows it."""
+    if link_mode != "copy" and _link_file(plugin_file, path, link_mode):
+        return
+
+    with open(path, "wb") as f:
+        for chunk in plugin_file.chunks():
+            f.write(chunk)
+    if plugin_file.mode & 0o111:
+        path.chmod(plugin_file.mode)
+
+def _check_link_mode(link_mode, path_staging):
+    """Fall back to copying when the template is on a different filesystem."""
+    path_template = Path(__file__).parents[1] / "plugin_template"
+    if path_template.stat().st_dev != path_staging.stat().st_dev:
+        return "copy"
+    return link_mode
+
+def _link_file(plugin_file, path, link_mode):
+    """Try to hardlink or clone a verbatim file from its source.
+
+    Returns True if the file was written, and False if it needs to be copied.
+    """
+    path_source = plugin_file.source_path
+    try:
+        # Make sure the source still matches what was generated.
+        if not path_source or path_source.stat().st_size != plugin_file.size:
+            return False
+
+        if link_mode == "hardlink":
+            os.link(path_source, path)
+            return True
+
+        # reflink clones the file. auto also lets the kernel copy the file if it can't be cloned.
+        with open(path_source, "rb") as f_src, open(path, "wb") as f_dst:
+            if sys.platform.startswith("linux"):
+                try:
+                    import fcntl
+                    fcntl.ioctl(f_dst.fileno(), FICLONE, f_src.fileno())
+                    return True
+                except OSError:
+                    pass
+
+            if link_mode == "auto" and hasattr(os, "copy_file_range"):
+                num_bytes = plugin_file.size
+                while num_bytes:
+                    copied = os.copy_file_range(f_src.fileno(), f_dst.fileno(), num_bytes)
+                    if not copied:
+                        return False
+                    num_bytes -= copied
+                return True
+    except OSError:
+        pass
+
+    return False
+
+class _ChunkReader(io.RawIOBase):
+    """A readable stream over an iterable of bytes, for sinks that need a file object."""
+
+    def __init__(self, chunks):
+        self._chunks = iter(chunks)
+        self._pending = memoryview(b"")
+
+    def readable(self):
+        return True
+
+    def readinto(self, buffer):
+        while not self._pending:
+            chunk = next(self._chunks, None)
+            if chunk is None:
+                return 0
+            self._pending = memoryview(chunk)
+
+        num_bytes = min(len(buffer), len(self._pending))
+        buffer[:num_bytes] = self._pending[:num_bytes]
+        self._pending = self._pending[num_bytes:]
+        return num_bytes
+
+def _fsync_paths(paths, path_dir):
+    """Flush files, and every directory from path_dir down, to disk."""
+    for path in paths:
+        fd = os.open(path, os.O_RDONLY)
+        try:
+            os.fsync(fd)
+        finally:
+            os.close(fd)
+
+    # Directories can't be opened for fsync on Windows.
+    if os.name == "nt":
+        return
+
+    dirs = {path_dir}
+    for path in paths:
+        dirs.update(path_dir / parent for parent in path.relative_to(path_dir).parents)
+    for path in sorted(dirs, reverse=True):
+        fd = os.open(path, os.O_RDONLY)
+        try:
+            os.fsync(fd)
+        finally:
+            os.close(fd)
@@ -0,0 +1,168 @@
+"""A local HTTP service that generates plugins.
+
+POST a JSON object with the PluginConfig fields to /generate, and the response is
+the new plugin as a zip archive:
+
+    $ curl -d '{"platform_name": "CodeRed", "pkg_name": "dsd-codered"}' \
+        http://127.0.0.1:8421/generate -o dsd-codered.zip
+
+Requests are handled by a fixed pool of threads, which share a single PluginGenerator.
+Only the standard library is used.
+"""
+
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import fields
+from http import HTTPStatus
+from http.server import BaseHTTPRequestHandler, HTTPServer
+import json
+import sys
+
+from utils import generator_utils
+from utils.plugin_config import PluginConfig, get_type_errors
+from utils.plugin_generator import PluginGenerator
+
+
+DEFAULT_HOST = "127.0.0.1"
+DEFAULT_PORT = 8421
+
+# Largest request body accepted, in bytes.
+MAX_REQUEST_BYTES = 64 * 1024
+
+
+class PoolHTTPServer(HTTPServer):
+    """An HTTP server that handles requests in a fixed pool of threads."""
+
+    def __init__(self, server_address, handler_class, generator, max_workers=None):
+        super().__init__(server_address, handler_class)
+        self.generator = generator
+        self.executor = ThreadPoolExecutor(max_workers=max_workers)
+
+    def process_request(self, request, client_address):
+        self.executor.submit(self._process_request, request, client_address)
+
+    def _process_request(self, request, client_address):
+        """Handle one request in a pool thread, the way ThreadingMixIn does."""
+        try:
+            self.finish_request(request, client_address)
+        except Exception:
+            self.handle_error(request, client_address)
+        finally:
+            self.shutdown_request(request)
+
+    def server_close(self):
+        super().server_close()
+        self.executor.shutdown(wait=True)
+
+
+class GeneratorRequestHandler(BaseHTTPRequestHandler):
+    """Generate a plugin for each POST to /generate."""
+
+    protocol_version = "HTTP/1.1"
+
+    # Close idle keep-alive connections, so they don't tie up pool threads.
+    timeout = 5
+
+    def do_POST(self):
+        if self.path != "/generate":
+            self._send_error(HTTPStatus.NOT_FOUND, f"Unknown path: {self.path}")
+            return
+
+        try:
+            length = int(self.headers.get("Content-Length", 0))
+        except ValueError:
+            length = -1
+        if not 0 < length <= MAX_REQUEST_BYTES:
+            self._send_error(HTTPStatus.BAD_REQUEST, "A JSON request body is required.")
+            return
+
+        try:
+            plugin_config = get_plugin_config(json.loads(self.rfile.read(length)))
+        except (ValueError, TypeError, AssertionError) as e:
+            self._send_error(HTTPStatus.BAD_REQUEST, str(e))
+            return
+
+        try:
+            contents = self.server.generator.generate_zip(plugin_config)
+        except Exception as e:
+            # Answer every request, instead of dropping the connection.
+            msg = f"The plugin couldn't be generated: {type(e).__name__}: {e}"
+            self._send_error(HTTPStatus.INTERNAL_SERVER_ERROR, msg)
+            return
+
+        # The package name has been validated, so it only has characters that are safe
+        # in a quoted header value.
+        self.send_response(HTTPStatus.OK)
+        self.send_header("Content-Type", "application/zip")
+        self.send_header("Content-Length", str(len(contents)))
+        self.send_header(
+            "Content-Disposition", f'attachment; filename="{plugin_config.pkg_name}.zip"'
+        )
+        self.end_headers()
+        self.wfile.write(contents)
+
+    def log_message(self, format, *args):
+        # Logging every request to stderr would slow down the server under load.
+        pass
+
+    def _send_error(self, status, msg):
+        contents = (json.dumps({"error": msg}) + "\n").encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(contents)))
+        self.end_headers()
+        self.wfile.write(contents)
+
+
+def get_plugin_config(spec):
+    """Build a validated PluginConfig from a request body.
+
+    Raises ValueError if the request isn't a valid spec, or AssertionError if the
+    config doesn't pass validation.
+    """
+    if not isinstance(spec, dict):
+        raise ValueError("The request body must be a JSON object.")
+
+    field_names = {field.name for field in fields(PluginConfig)} - {"target_dir"}
+    unknown_keys = sorted(set(spec) - field_names)
+    if unknown_keys:
+        raise ValueError(f"Unknown keys: {', '.join(unknown_keys)}")
+
+    type_errors = get_type_errors(spec)
+    if type_errors:
+        raise ValueError(f"Wrong types: {', '.join(type_errors)}")
+
+    plugin_config = PluginConfig(**spec)
+    plugin_config.validate()
+    return plugin_config
+
+
+def parse_address(address):
+    """Parse a PORT or HOST:PORT address for --serve."""
+    host, _, port = address.rpartition(":")
+    try:
+        return host or DEFAULT_HOST, int(port)
+    except ValueError:
+        sys.exit(f"Can't serve at {address}. Please use PORT or HOST:PORT.")
+
+
+def make_server(host=DEFAULT_HOST, port=DEFAULT_PORT, max_workers=None, generator=None):
+    """Make a server, with the template loaded and ready to generate plugins."""
+    if generator is None:
+        generator = PluginGenerator()
+    return PoolHTTPServer((host, port), GeneratorRequestHandler, generator, max_workers)
+
+
+def run_server(args):
+    """Serve plugin generation requests until interrupted."""
+    host, port = parse_address(args.serve)
+    path_templates = generator_utils.get_template_layers(args.template_dir)
+    server = make_server(host, port, args.jobs, PluginGenerator(path_templates=path_templates))
+
+    host, port = server.server_address[:2]
+    print(f"Generating plugins at http://{host}:{port}/generate (Ctrl-C to stop).")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        sys.exit("\nStopped server.")
+    finally:
+        server.server_close()
@@ -0,0 +1,236 @@
+"""Check that a generated plugin compiles and imports, without installing it.
+
+The full e2e tests clone django-simple-deploy, build a venv, and install the new plugin,
+which takes about 30 seconds. This check catches most template breakage in milliseconds,
+in the current process, with no network access:
+
+- Every .py file in the plugin is compiled.
+- The plugin's main package, and its deploy module, are imported from memory, against
+  stub modules for django-simple-deploy and the third-party packages it imports.
+- The deploy module is registered with a pluggy PluginManager, and the dsd_get_plugin_config,
+  dsd_get_plugin_cli, and dsd_validate_cli hooks are called, the way core calls them.
+
+The stubs only provide what the generated plugin uses at import time and in those hooks.
+The deploy hook isn't called, because it changes the user's project.
+
+While the plugin is imported, the stubs replace any django, requests, and
+django_simple_deploy modules in sys.modules, for the whole process. They're restored
+afterwards, but other threads that import those packages during a check see the stubs.
+So the check isn't safe to run alongside other threads that use those packages.
+"""
+
+import argparse
+import importlib
+import importlib.abc
+import importlib.util
+from pathlib import Path
+import sys
+import threading
+from types import ModuleType, SimpleNamespace
+
+import pluggy
+
+
+# Imports temporarily replace entries in sys.modules, so only one check runs at a time.
+# The lock only serializes checks; it doesn't protect other code in the same process.
+_import_lock = threading.Lock()
+
+# Modules the generated plugin imports from core and its dependencies.
+stubbed_modules = (
+    "django_simple_deploy",
+    "django_simple_deploy.hookspecs",
+    "django_simple_deploy.management",
+    "django_simple_deploy.management.commands",
+    "django_simple_deploy.management.commands.utils",
+    "django_simple_deploy.management.commands.utils.plugin_utils",
+    "django_simple_deploy.management.commands.utils.command_errors",
+    "django",
+    "django.conf",
+    "django.utils",
+    "django.utils.safestring",
+    "requests",
+)
+
+
+def check_plugin(plugin_files, plugin_config, main_dir_name):
+    """Compile and import a plugin that's been generated in memory.
+
+    Returns a list of problems, which is empty if the plugin passed.
+    """
+    code_objects, problems = compile_plugin_files(plugin_files)
+    if problems:
+        return problems
+
+    with _import_lock:
+        return _import_plugin(code_objects, plugin_config, main_dir_name)
+
+def compile_plugin_files(plugin_files):
+    """Compile every .py file in a plugin.
+
+    Returns a dict mapping each file's path to its code object, and a list of problems.
+    """
+    code_objects = {}
+    problems = []
+    for target_file, plugin_file in plugin_files.items():
+        if not target_file.endswith(".py"):
+            continue
+        try:
+            source = b"".join(plugin_file.chunks())
+            code_objects[target_file] = compile(source, target_file, "exec", dont_inherit=True)
+        except (SyntaxError, ValueError) as e:
+            problems.append(f"{target_file} doesn't compile: {e}")
+
+    return code_objects, problems
+
+
+# --- Helper functions ---
+
+def _import_plugin(code_objects, plugin_config, main_dir_name):
+    """Import the plugin against stub modules, and call its hooks through pluggy."""
+    isolated_names = {name.split(".")[0] for name in stubbed_modules} | {main_dir_name}
+    saved_modules = {
+        name: module
+        for name, module in sys.modules.items()
+        if name.split(".")[0] in isolated_names
+    }
+    for name in saved_modules:
+        del sys.modules[name]
+
+    finder = _PluginFinder(code_objects, main_dir_name)
+    sys.meta_path.insert(0, finder)
+    try:
+        sys.modules.update(_get_stub_modules())
+        return _call_hooks(plugin_config, main_dir_name)
+    finally:
+        sys.meta_path.remove(finder)
+        for name in list(sys.modules):
+            if name.split(".")[0] in isolated_names:
+                del sys.modules[name]
+        sys.modules.update(saved_modules)
+
+def _call_hooks(plugin_config, main_dir_name):
+    """Register the plugin, and call the hooks core uses to configure it."""
+    # Core imports the plugin's deploy module, which holds its hook implementations.
+    try:
+        importlib.import_module(main_dir_name)
+        plugin = importlib.import_module(f"{main_dir_name}.deploy")
+    except Exception as e:
+        return [f"{main_dir_name} doesn't import: {type(e).__name__}: {e}"]
+
+    pm = pluggy.PluginManager("django_simple_deploy")
+    pm.add_hookspecs(sys.modules["django_simple_deploy.hookspecs"])
+    try:
+        pm.register(plugin)
+        pm.check_pending()
+    except pluggy.PluginValidationError as e:
+        return [f"{main_dir_name} doesn't register with pluggy: {e}"]
+
+    problems = []
+    try:
+        configs = pm.hook.dsd_get_plugin_config()
+        parser = argparse.ArgumentParser(prog="manage.py deploy")
+        pm.hook.dsd_get_plugin_cli(parser=parser)
+        options = vars(parser.parse_args([]))
+        pm.hook.dsd_validate_cli(options=options)
+    except Exception as e:
+        return [f"A hook in {main_dir_name} raised {type(e).__name__}: {e}"]
+
+    if len(configs) != 1:
+        problems.append(f"dsd_get_plugin_config returned {len(configs)} configs, instead of 1.")
+    else:
+        platform_name = getattr(configs[0], "platform_name", None)
+        automate_all_supported = getattr(configs[0], "automate_all_supported", None)
+        if platform_name != plugin_config.platform_name:
+            problems.append(f"The plugin config has platform_name {platform_name!r}.")
+        if automate_all_supported != plugin_config.support_automate_all:
+            problems.append(f"The plugin config has automate_all_supported {automate_all_supported!r}.")
+        if automate_all_supported and not getattr(configs[0], "confirm_automate_all_msg", ""):
+            problems.append("The plugin supports --automate-all, but has no confirm_automate_all_msg.")
+
+    return problems
+
+def _get_stub_modules():
+    """Build stub modules for core, and the third-party packages the plugin imports."""
+    modules = {name: ModuleType(name) for name in stubbed_modules}
+    for name, module in modules.items():
+        if any(other.startswith(f"{name}.") for other in modules):
+            module.__path__ = []
+
+    hookspec = pluggy.HookspecMarker("django_simple_deploy")
+    modules["django_simple_deploy"].hookimpl = pluggy.HookimplMarker("django_simple_deploy")
+
+    @hookspec
+    def dsd_get_plugin_config():
+        """Get platform-specific attributes needed by core."""
+
+    @hookspec
+    def dsd_get_plugin_cli(parser):
+        """Get plugin's CLI extension."""
+
+    @hookspec
+    def dsd_validate_cli(options):
+        """Validate and parse plugin-specific CLI args."""
+
+    @hookspec
+    def dsd_deploy():
+        """Carry out platform-specific deployment steps."""
+
+    hookspecs = modules["django_simple_deploy.hookspecs"]
+    for func in (dsd_get_plugin_config, dsd_get_plugin_cli, dsd_validate_cli, dsd_deploy):
+        setattr(hookspecs, func.__name__, func)
+
+    plugin_utils = modules["django_simple_deploy.management.commands.utils.plugin_utils"]
+    plugin_utils.dsd_config = SimpleNamespace(
+        unit_testing=True,
+        automate_all=False,
+        project_root=Path.cwd(),
+        local_project_name="blog",
+        log_output=False,
+    )
+    for func_name in (
+        "write_output",
+        "add_file",
+        "get_template_string",
+        "modify_settings_file",
+        "add_packages",
+        "commit_changes",
+    ):
+        setattr(plugin_utils, func_name, lambda *args, **kwargs: None)
+
+    command_errors = modules["django_simple_deploy.management.commands.utils.command_errors"]
+    command_errors.DSDCommandError = type("DSDCommandError", (Exception,), {})
+
+    modules["django.conf"].settings = SimpleNamespace()
+    modules["django.utils.safestring"].mark_safe = lambda s: s
+
+    return modules
+
+class _PluginFinder(importlib.abc.MetaPathFinder, importlib.abc.Loader):
+    """Import the plugin's main package from code objects, instead of from disk."""
+
+    def __init__(self, code_objects, main_dir_name):
+        # Maps each module name to its code object, and whether it's a package.
+        self.modules = {}
+        for target_file, code in code_objects.items():
+            parts = target_file.removesuffix(".py").split("/")
+            if parts[0] != main_dir_name:
+                continue
+            is_package = parts[-1] == "__init__"
+            if is_package:
+                parts.pop()
+            self.modules[".".join(parts)] = (code, is_package)
+
+    def find_spec(self, fullname, path, target=None):
+        if fullname not in self.modules:
+            return None
+        code, is_package = self.modules[fullname]
+        return importlib.util.spec_from_loader(
+            fullname, self, origin=code.co_filename, is_package=is_package
+        )
+
+    def create_module(self, spec):
+        return None
+
+    def exec_module(self, module):
+        code, _ = self.modules[module.__name__]
+        exec(code, module.__dict__)
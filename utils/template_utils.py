@@ -0,0 +1,545 @@
+"""Utility functions for rendering plugin template files."""
+
+import codecs
+import hashlib
+import marshal
+import os
+from pathlib import Path
+import re
+
+
+# Generator placeholders look like {{PlatformName}}. Other brace tokens, such as
+# {{ django_project_name }} in templates/dockerfile_example, belong to the generated
+# plugin's own templates, and are passed through unchanged.
+placeholder_pattern = r"\{\{[A-Z][A-Za-z0-9]*\}\}"
+
+# Conditional blocks look like {% if AutomateAllSupported %}...{% else %}...{% endif %}.
+# A tag that's alone on its line takes the whole line with it, so it doesn't leave a
+# blank line behind.
+tag_pattern = r"\{%\s*(?:if\s+(?:not\s+)?[A-Z][A-Za-z0-9]*|else|endif)\s*%\}"
+
+# Django's own {% if %} tags, in the generated plugin's templates. They're matched so
+# their {% else %} and {% endif %} tags are never taken for a generator block's.
+django_if_pattern = r"\{%\s*if\s[^%\n]*%\}"
+
+re_token = re.compile(
+    rf"(^[ \t]*{tag_pattern}[ \t]*\n|{tag_pattern}|{placeholder_pattern}|{django_if_pattern})",
+    re.MULTILINE,
+)
+
+# Any generator token in a file means the file needs to be rendered. Django tags,
+# and a stray {% else %} or {% endif %}, don't count; see compile_template().
+re_render_token = re.compile(rf"{placeholder_pattern}|\{{%\s*if\s+(?:not\s+)?[A-Z]")
+
+# Bump this whenever the format of compiled templates changes.
+CACHE_FORMAT = 7
+
+# Number of compiled templates to keep in the cache. Runs with different template
+# layers each need their own entry, so the least recently used entries are removed.
+MAX_CACHED_TEMPLATES = 8
+
+# Kinds of template files. Verbatim files are copied as-is; rendered files have
+# placeholders or conditional blocks that need to be rendered. Streamed files are
+# too large to hold in memory, and are read from the template in chunks as they're
+# written.
+VERBATIM = "verbatim"
+RENDERED = "rendered"
+STREAMED = "streamed"
+
+# Template files at least this large are streamed, instead of read into memory.
+STREAM_MIN_BYTES = 1024 * 1024
+
+# Size of the chunks that streamed files are read in, in bytes.
+CHUNK_SIZE = 64 * 1024
+
+# Longest token that's kept whole when a streamed file is split into chunks.
+MAX_TOKEN_LENGTH = 256
+
+# A file with a NUL byte in its first 8 KB is binary, and is never decoded.
+BINARY_SNIFF_BYTES = 8192
+
+# Files that are never part of a template.
+ignored_names = {"__pycache__", ".DS_Store"}
+
+# Kinds of {% if %} blocks, tracked while a template is compiled.
+GENERATOR_BLOCK = "generator"
+DJANGO_BLOCK = "django"
+
+
+class TemplateError(Exception):
+    """Raised when a template file can't be rendered."""
+
+
+class CompiledTemplate(dict):
+    """A compiled template, which keeps the hash of the template it was compiled from.
+
+    The output cache keys plugins by this hash, so it never has to scan the template
+    again. template_hash is None if the template wasn't hashed.
+    """
+
+    template_hash = None
+
+
+def compile_template(contents):
+    """Split a template into literal text and tokens, in a single pass.
+
+    Returns a list where even indexes hold literal text, and odd indexes hold
+    placeholders and conditional tags. For example:
+        "Deploy to {{PlatformName}}." -> ["Deploy to ", "{{PlatformName}}", "."]
+
+    Joining the segments gives back the original contents.
+    """
+    segments = re_token.split(contents)
+
+    # Django's {% if %} tags, and any {% else %} or {% endif %} that doesn't close a
+    # generator block, belong to the generated plugin's own Django templates. Merge
+    # them back into the literal text.
+    compiled_segments = [segments[0]]
+    open_blocks = []
+    for token, text in zip(segments[1::2], segments[2::2]):
+        tag = _parse_tag(token)
+        if tag and _is_django_tag(tag, open_blocks):
+            compiled_segments[-1] += token + text
+            continue
+        if tag and tag[0] == "if":
+            open_blocks.append(GENERATOR_BLOCK)
+        elif tag and tag[0] == "endif":
+            open_blocks.pop()
+
+        compiled_segments += [token, text]
+
+    return compiled_segments
+
+
+def render(contents, replacements, path="", conditions=None):
+    """Render a template string.
+
+    Returns the rendered string, and the number of placeholders that were replaced.
+    """
+    segments = compile_template(contents)
+    return render_segments(segments, replacements, path, conditions)
+
+
+def render_segments(segments, replacements, path="", conditions=None):
+    """Render a compiled template.
+
+    conditions maps the names used in {% if %} tags to True or False.
+
+    Raises TemplateError if the template uses a placeholder that's not in replacements,
+    or a condition that's not in conditions.
+    Returns the rendered string, and the number of placeholders that were replaced.
+    """
+    parts = []
+    num_placeholders = 0
+
+    # One entry for each enclosing {% if %} block: whether the current branch is rendered.
+    block_stack = []
+    rendering = True
+
+    for index, segment in enumerate(segments):
+        if index % 2 == 0:
+            if rendering:
+                parts.append(segment)
+            continue
+
+        tag = _parse_tag(segment)
+        if not tag:
+            value = _lookup(replacements, segment, "placeholder", path)
+            if rendering:
+                parts.append(value)
+                num_placeholders += 1
+        elif tag[0] == "if":
+            _, negate, name = tag
+            condition = bool(_lookup(conditions or {}, name, "condition", path))
+            block_stack.append((rendering, condition != negate))
+            rendering = rendering and condition != negate
+        elif tag[0] == "else":
+            outer_rendering, branch_rendered = block_stack[-1]
+            rendering = outer_rendering and not branch_rendered
+        else:
+            rendering, _ = block_stack.pop()
+
+    if block_stack:
+        msg = "Missing {% endif %}"
+        if path:
+            msg += f" in {path}"
+        raise TemplateError(msg)
+
+    return "".join(parts), num_placeholders
+
+
+class StreamRenderer:
+    """Render a large template file in chunks, without reading it into memory.
+
+    Text is rendered a few lines at a time, so tags that are alone on their line are
+    handled just as render() handles them. A piece of text is never split inside a
+    token, so placeholders and tags that straddle a chunk boundary are rendered whole.
+    """
+
+    def __init__(self, replacements, path="", conditions=None):
+        self.replacements = replacements
+        self.path = path
+        self.conditions = conditions or {}
+        self.num_placeholders = 0
+
+    def render_file(self, path_source, chunk_size=None):
+        """Render a template file. Yields the rendered file as chunks of bytes."""
+        with open(path_source, encoding="utf-8") as f:
+            text_chunks = iter(lambda: f.read(chunk_size or CHUNK_SIZE), "")
+            for text in self.render_chunks(text_chunks):
+                yield text.encode()
+
+    def render_chunks(self, text_chunks):
+        """Render a template that's split into chunks of text. Yields rendered text.
+
+        Raises TemplateError the same way render_segments() does.
+        """
+        self.num_placeholders = 0
+        self._block_stack = []
+        self._open_blocks = []
+        self._rendering = True
+
+        # The character before the text that's being rendered, so ^ only matches
+        # at the start of a real line.
+        prev_char = "\n"
+        pending = ""
+        for chunk in text_chunks:
+            pending += chunk
+            cut = _get_safe_cut(pending)
+            if cut:
+                yield self._render_text(prev_char + pending[:cut])
+                prev_char = pending[cut - 1]
+                pending = pending[cut:]
+
+        yield self._render_text(prev_char + pending)
+
+        if self._block_stack:
+            msg = "Missing {% endif %}"
+            if self.path:
+                msg += f" in {self.path}"
+            raise TemplateError(msg)
+
+    def _render_text(self, text):
+        """Render text, skipping the leading context character."""
+        parts = []
+        pos = 1
+        for match in re_token.finditer(text, 1):
+            if self._rendering:
+                parts.append(text[pos : match.start()])
+            pos = match.end()
+
+            token = match.group()
+            tag = _parse_tag(token)
+            if not tag:
+                value = _lookup(self.replacements, token, "placeholder", self.path)
+                if self._rendering:
+                    parts.append(value)
+                    self.num_placeholders += 1
+            elif _is_django_tag(tag, self._open_blocks):
+                # Django tags are passed through, as compile_template() does.
+                if self._rendering:
+                    parts.append(token)
+            elif tag[0] == "if":
+                _, negate, name = tag
+                condition = bool(_lookup(self.conditions, name, "condition", self.path))
+                self._open_blocks.append(GENERATOR_BLOCK)
+                self._block_stack.append((self._rendering, condition != negate))
+                self._rendering = self._rendering and condition != negate
+            elif tag[0] == "else":
+                outer_rendering, branch_rendered = self._block_stack[-1]
+                self._rendering = outer_rendering and not branch_rendered
+            else:
+                self._open_blocks.pop()
+                self._rendering, _ = self._block_stack.pop()
+
+        if self._rendering:
+            parts.append(text[pos:])
+        return "".join(parts)
+
+
+def iter_file_chunks(path_source, chunk_size=None):
+    """Read a file in chunks of bytes, without decoding it."""
+    with open(path_source, "rb") as f:
+        yield from iter(lambda: f.read(chunk_size or CHUNK_SIZE), b"")
+
+
+def is_binary(contents):
+    """Check the start of a file for a NUL byte, which text files never have."""
+    return b"\0" in contents[:BINARY_SNIFF_BYTES]
+
+
+def load_compiled_template(path_templates, path_cache_dir=None, read_only=False):
+    """Get every file in the template, classified and compiled.
+
+    path_templates is a template directory, or a list of template layers. A file in a
+    later layer overrides the file at the same path in any earlier layer.
+
+    Each layer is scanned with a single walk, and the layers are merged into one index.
+    Compiled templates are cached on disk, keyed by a hash of every layer. If nothing
+    in any layer has changed, no template file is read or tokenized.
+With read_only, the cache is only read: a compiled template isn't written, and a
+cache hit isn't marked as recently used.
+
+    Returns a CompiledTemplate, which maps each file's relative path to a
+    (kind, data, mode, source) tuple, where source is the path of the file in the layer
+    it came from:
+    - (VERBATIM, bytes, mode, source) for files without any placeholders;
+    - (RENDERED, segments, mode, source) for files that need to be rendered;
+    - (STREAMED, (sha256, needs_render), mode, source) for files of at least STREAM_MIN_BYTES.
+    """
+    if path_cache_dir is None:
+        path_cache_dir = get_cache_dir()
+
+    template_entries = _scan_layers(path_templates)
+    template_hash = _hash_template_entries(template_entries)
+    path_cache = path_cache_dir / f"template-{template_hash}.marshal"
+    try:
+        compiled_template = CompiledTemplate(marshal.loads(path_cache.read_bytes()))
+        if not read_only:
+            _touch(path_cache)
+    except (OSError, EOFError, ValueError, TypeError):
+        # Missing or unreadable cache file; compile the template again.
+        compiled_template = _compile_template_entries(template_entries)
+        if not read_only:
+            _write_cache(path_cache, compiled_template)
+        compiled_template = CompiledTemplate(compiled_template)
+
+    compiled_template.template_hash = template_hash
+    return compiled_template
+
+
+def compile_template_tree(path_templates):
+    """Compile every file in the template, without using the cache."""
+    return _compile_template_entries(_scan_layers(path_templates))
+
+
+def get_template_hash(path_templates):
+    """Get a hash that changes whenever any file in any template layer changes."""
+    return _hash_template_entries(_scan_layers(path_templates))
+
+
+def get_cache_dir():
+    """Get the directory where compiled templates are cached."""
+    if cache_dir := os.environ.get("DSD_GENERATOR_CACHE_DIR"):
+        return Path(cache_dir)
+    return Path(__file__).parents[1] / ".generator_cache"
+
+
+# --- Helper functions ---
+
+def _scan_layers(path_templates):
+    """Scan every template layer, and merge them into one index.
+
+    Returns a list of (target_file, DirEntry) tuples, in the same order as _scan_template().
+    """
+    if isinstance(path_templates, (str, os.PathLike)):
+        path_templates = [path_templates]
+
+    merged_entries = {}
+    for path_layer in path_templates:
+        merged_entries.update(_scan_template(Path(path_layer).resolve()))
+
+    return sorted(merged_entries.items(), key=lambda item: item[0].split("/"))
+
+def _scan_template(path_template, rel_dir=""):
+    """Walk the template once with os.scandir().
+
+    Returns a list of (target_file, DirEntry) tuples, in a stable order.
+    """
+    template_entries = []
+    with os.scandir(path_template) as entries:
+        for entry in sorted(entries, key=lambda entry: entry.name):
+            if entry.name in ignored_names:
+                continue
+
+            target_file = f"{rel_dir}{entry.name}"
+            if entry.is_dir():
+                template_entries += _scan_template(entry.path, f"{target_file}/")
+            else:
+                template_entries.append((target_file, entry))
+
+    return template_entries
+
+def _hash_template_entries(template_entries):
+    """Hash the scanned template tree.
+
+    This uses each file's path, source, size, mode, and modification time, so checking for a
+    cached version of the template doesn't require opening any template file. The
+    size limit for streamed files is included, because it changes how files are compiled.
+    """
+    hasher = hashlib.sha256(f"format-{CACHE_FORMAT}-{STREAM_MIN_BYTES}".encode())
+    for target_file, entry in template_entries:
+        stat = entry.stat()
+        hasher.update(
+            f"\0{target_file}\0{entry.path}\0{stat.st_size}\0{stat.st_mode}\0{stat.st_mtime_ns}".encode()
+        )
+
+    return hasher.hexdigest()
+
+def _compile_template_entries(template_entries):
+    """Read, classify, and compile each scanned template file."""
+    compiled_template = {}
+    for target_file, entry in template_entries:
+        mode = _get_file_mode(entry.stat().st_mode)
+        if entry.stat().st_size >= STREAM_MIN_BYTES:
+            large_file_info = _scan_large_file(entry.path)
+            compiled_template[target_file] = (STREAMED, large_file_info, mode, entry.path)
+            continue
+
+        with open(entry.path, "rb") as f:
+            contents = f.read()
+        if is_binary(contents):
+            compiled_template[target_file] = (VERBATIM, contents, mode, entry.path)
+            continue
+
+        try:
+            # Match the newline handling of Path.read_text().
+            text = contents.decode().replace("\r\n", "\n").replace("\r", "\n")
+        except UnicodeDecodeError:
+            compiled_template[target_file] = (VERBATIM, contents, mode, entry.path)
+            continue
+
+        segments = compile_template(text)
+        if len(segments) == 1:
+            compiled_template[target_file] = (VERBATIM, contents, mode, entry.path)
+        else:
+            compiled_template[target_file] = (RENDERED, segments, mode, entry.path)
+
+    return compiled_template
+
+def _scan_large_file(path_source):
+    """Hash a large file, and check whether it needs to be rendered, one chunk at a time.
+
+    Returns (sha256, needs_render). Binary files never need to be rendered.
+    """
+    hasher = hashlib.sha256()
+    decoder = codecs.getincrementaldecoder("utf-8")()
+    needs_render = False
+    is_text = True
+    tail = ""
+    for num, chunk in enumerate(iter_file_chunks(path_source)):
+        hasher.update(chunk)
+        if not is_text:
+            continue
+        if num == 0 and is_binary(chunk):
+            is_text = False
+            continue
+
+        try:
+            text = decoder.decode(chunk)
+        except UnicodeDecodeError:
+            is_text = False
+            continue
+        if not needs_render:
+            needs_render = bool(re_render_token.search(tail + text))
+            # Keep the end of this chunk, in case a token straddles the next boundary.
+            tail = (tail + text)[-MAX_TOKEN_LENGTH:]
+
+    try:
+        decoder.decode(b"", final=True)
+    except UnicodeDecodeError:
+        is_text = False
+
+    return hasher.hexdigest(), is_text and needs_render
+
+def _get_safe_cut(text):
+    """Find where text can be cut without splitting a line or a token.
+
+    Text is cut after its last newline. A line that's longer than CHUNK_SIZE is cut
+    anywhere a token can't be. Returns 0 if no part of the text is ready to render.
+    """
+    cut = text.rfind("\n") + 1
+    if not cut:
+        if len(text) < CHUNK_SIZE:
+            return 0
+        cut = len(text)
+
+    # Back off from a { that might start an unfinished token.
+    brace = text.rfind("{", max(cut - MAX_TOKEN_LENGTH, 0), cut)
+    if brace != -1 and "}}" not in text[brace:cut] and "%}" not in text[brace:cut]:
+        line_start = text.rfind("\n", 0, brace) + 1
+        cut = line_start or brace
+        while cut and text[cut - 1] == "{":
+            cut -= 1
+
+    return cut
+
+def _parse_tag(token):
+    """Parse a conditional tag.
+
+    Returns ("if", negate, name), ("else",), ("endif",), or ("django_if",) for one of
+    Django's own {% if %} tags. Returns None for placeholders.
+    """
+    if not token.lstrip().startswith("{%"):
+        return None
+
+    if not re.fullmatch(tag_pattern, token.strip()):
+        return ("django_if",)
+    words = token.strip()[2:-2].split()
+    if words[0] == "if":
+        return ("if", words[1] == "not", words[-1])
+    return (words[0],)
+
+def _is_django_tag(tag, open_blocks):
+    """Check whether a tag belongs to a Django template, and track the open {% if %} blocks.
+
+    open_blocks holds GENERATOR_BLOCK or DJANGO_BLOCK for each enclosing {% if %}. An
+    {% else %} or {% endif %} belongs to the innermost open block; with no open block,
+    it's a stray Django tag.
+    """
+    if tag[0] == "django_if":
+        open_blocks.append(DJANGO_BLOCK)
+        return True
+    if tag[0] == "if" or (open_blocks and open_blocks[-1] == GENERATOR_BLOCK):
+        return False
+
+    if tag[0] == "endif" and open_blocks:
+        open_blocks.pop()
+    return True
+
+def _lookup(values, key, description, path):
+    """Look up a placeholder or condition, with a helpful error if it's unknown."""
+    try:
+        return values[key]
+    except KeyError:
+        msg = f"Unknown {description} {key}"
+        if path:
+            msg += f" in {path}"
+        msg += f"\n  Known {description}s: {', '.join(values)}"
+        raise TemplateError(msg) from None
+
+def _get_file_mode(st_mode):
+    """Normalize file permissions, so they don't depend on the local umask."""
+    if st_mode & 0o111:
+        return 0o755
+    return 0o644
+
+def _write_cache(path_cache, compiled_template):
+    """Write a compiled template to the cache, and remove the least recently used entries.
+
+    The cache is an optimization, so failing to write it is not an error.
+    """
+    try:
+        path_cache.parent.mkdir(parents=True, exist_ok=True)
+
+        # Write to a temp file first, so concurrent runs never read a partial file.
+        path_tmp = path_cache.with_suffix(f".{os.getpid()}.tmp")
+        path_tmp.write_bytes(marshal.dumps(compiled_template))
+        os.replace(path_tmp, path_cache)
+
+        paths_cached = sorted(
+            path_cache.parent.glob("template-*.marshal"),
+            key=lambda path: path.stat().st_mtime_ns,
+            reverse=True,
+        )
+        for path_stale in paths_cached[MAX_CACHED_TEMPLATES:]:
+            path_stale.unlink(missing_ok=True)
+    except OSError:
+        pass
+
+def _touch(path_cache):
+    """Mark a cache entry as recently used, so it's removed last."""
+    try:
+        os.utime(path_cache)
+    except OSError:
+        pass
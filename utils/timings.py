@@ -0,0 +1,113 @@
+"""Record where time goes while generating a plugin.
+
+Timings are only recorded when --timings or --timings-json is used. Each stage records
+its wall time, and the number of files and bytes it handled. The time spent on each
+file is also recorded, so the slowest files can be reported.
+"""
+
+from contextlib import contextmanager, nullcontext
+import json
+from pathlib import Path
+import time
+
+
+# Number of slowest files to report.
+NUM_SLOWEST_FILES = 10
+
+
+class Timings:
+    """Wall time, file count, and bytes for each stage of generating a plugin."""
+
+    def __init__(self):
+        # Maps each stage name to {"seconds", "files", "bytes"}, in the order stages start.
+        self.stages = {}
+        # Maps each file's path to the total time spent on it, across all stages.
+        self.file_seconds = {}
+
+    @contextmanager
+    def stage(self, name):
+        """Time a stage that isn't made up of individual files."""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.add(name, time.perf_counter() - start)
+
+    def add(self, name, seconds, num_files=0, num_bytes=0):
+        """Add time, files, and bytes to a stage."""
+        stage = self.stages.setdefault(name, {"seconds": 0.0, "files": 0, "bytes": 0})
+        stage["seconds"] += seconds
+        stage["files"] += num_files
+        stage["bytes"] += num_bytes
+
+    def add_file(self, name, path, seconds, num_bytes):
+        """Add the time spent on one file to a stage."""
+        self.add(name, seconds, 1, num_bytes)
+        self.file_seconds[path] = self.file_seconds.get(path, 0.0) + seconds
+
+    def merge(self, timings_dict):
+        """Add the stages and files from another run, such as a batch worker."""
+        for name, stage in timings_dict["stages"].items():
+            self.add(name, stage["seconds"], stage["files"], stage["bytes"])
+        for path, seconds in timings_dict["files"].items():
+            self.file_seconds[path] = self.file_seconds.get(path, 0.0) + seconds
+
+    def get_slowest_files(self, num_files=NUM_SLOWEST_FILES):
+        """Get the (path, seconds) pairs for the slowest files."""
+        slowest = sorted(self.file_seconds.items(), key=lambda item: item[1], reverse=True)
+        return slowest[:num_files]
+
+    def to_dict(self):
+        """Get all timings, in a form that can be written as JSON."""
+        return {"stages": self.stages, "files": self.file_seconds}
+
+    def show(self, num_files=NUM_SLOWEST_FILES):
+        """Show a table of stage timings, and the slowest files."""
+        total_seconds = sum(stage["seconds"] for stage in self.stages.values())
+
+        print("\nTimings:")
+        print(f"  {'Stage':<20} {'ms':>10} {'Files':>7} {'Bytes':>12}")
+        for name, stage in self.stages.items():
+            ms = stage["seconds"] * 1000
+            print(f"  {name:<20} {ms:>10.3f} {stage['files']:>7} {stage['bytes']:>12,}")
+        print(f"  {'total':<20} {total_seconds * 1000:>10.3f}")
+
+        print("\nSlowest files:")
+        for path, seconds in self.get_slowest_files(num_files):
+            print(f"  {seconds * 1000:>10.3f} ms  {path}")
+
+    def write_json(self, path, num_files=NUM_SLOWEST_FILES):
+        """Write stage timings and the slowest files to a JSON file."""
+        timings_dict = {
+            "stages": self.stages,
+            "total_seconds": sum(stage["seconds"] for stage in self.stages.values()),
+            "slowest_files": [
+                {"path": path, "seconds": seconds}
+                for path, seconds in self.get_slowest_files(num_files)
+            ],
+        }
+        path.write_text(json.dumps(timings_dict, indent=2) + "\n")
+
+
+def timed(timings, name):
+    """Time a stage if timings is a Timings instance, and do nothing if it's None."""
+    if timings:
+        return timings.stage(name)
+    return nullcontext()
+
+
+def get_timings(args):
+    """Get a Timings instance if timings were requested, or None."""
+    if getattr(args, "timings", False) or getattr(args, "timings_json", None):
+        return Timings()
+    return None
+
+
+def report_timings(args, timings):
+    """Show timings, and write them to a JSON file, as requested in args."""
+    if not timings:
+        return
+    if getattr(args, "timings", False):
+        timings.show()
+    if path_json := getattr(args, "timings_json", None):
+        timings.write_json(Path(path_json))